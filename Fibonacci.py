@@ -1,6 +1,11 @@
+from collections import deque
 import pandas as pd
 from typing import Dict, Tuple, Optional, Any
+from padrao import calcular_pivos
+from indicadores import MaximoMovel, MinimoMovel
+from metricas import cronometrado
 
+@cronometrado()
 def detectar_swing_high_low(df: pd.DataFrame, n: int = 20) -> Tuple[float, float]:
     """
     Detecta o último swing high e swing low relevantes usando pivôs locais.
@@ -9,18 +14,13 @@ def detectar_swing_high_low(df: pd.DataFrame, n: int = 20) -> Tuple[float, float
     """
     highs = df['high'].values
     lows = df['low'].values
-    swing_high = None
-    swing_low = None
-    # Swing high: máximo que é maior que n anteriores e n posteriores
-    for i in range(n, len(df) - n):
-        if highs[i] == max(highs[i - n:i + n + 1]):
-            swing_high = highs[i]
-    # Swing low: mínimo que é menor que n anteriores e n posteriores
-    for i in range(n, len(df) - n):
-        if lows[i] == min(lows[i - n:i + n + 1]):
-            swing_low = lows[i]
+    # Swing high: máximo dos n anteriores e n posteriores (idem mínimo para swing low)
+    pivos = calcular_pivos(highs, lows, lookback=n)
+    swing_high = highs[pivos['topos'][-1]] if pivos['topos'] else None
+    swing_low = lows[pivos['fundos'][-1]] if pivos['fundos'] else None
     return swing_low, swing_high
 
+@cronometrado()
 def calcular_fibonacci(
     df: pd.DataFrame,
     n: int = 100,
@@ -39,6 +39,27 @@ def calcular_fibonacci(
         swing_low = ultimos['low'].min()
         swing_high = ultimos['high'].max()
     close = ultimos['close'].iloc[-1]
+    # ATR para tolerância dinâmica (último valor de rolling(14).max() - rolling(14).min())
+    highs_atr = ultimos['high'].values[-14:]
+    lows_atr = ultimos['low'].values[-14:]
+    if len(ultimos) >= 14 and not (pd.isna(highs_atr).any() or pd.isna(lows_atr).any()):
+        atr_val = highs_atr.max() - lows_atr.min()
+    else:
+        atr_val = (ultimos['high'].max() - ultimos['low'].min()) / 14
+    return montar_contexto_fibonacci(swing_low, swing_high, close, atr_val, direcao, incluir_extensoes)
+
+def montar_contexto_fibonacci(
+    swing_low: float,
+    swing_high: float,
+    close: float,
+    atr_val: float,
+    direcao: Optional[str] = None,
+    incluir_extensoes: bool = True
+) -> Dict[str, Any]:
+    """
+    Monta níveis, distâncias e direção a partir dos swings já conhecidos (usado pelo cálculo
+    completo e pelo incremental).
+    """
     # Direção automática
     if direcao is None:
         # Se o último close está mais próximo do high, assume tendência de alta
@@ -83,9 +104,6 @@ def calcular_fibonacci(
             '2.0': swing_low - 1.0 * diff,
             '2.618': swing_low - 1.618 * diff
         } if incluir_extensoes else {}
-    # ATR para tolerância dinâmica
-    atr = ultimos['high'].rolling(window=14).max() - ultimos['low'].rolling(window=14).min()
-    atr_val = atr.iloc[-1] if not atr.isna().iloc[-1] else (ultimos['high'].max() - ultimos['low'].min()) / 14
     # Tendência simples
     tendencia = 'alta' if swing_high > swing_low else 'baixa'
     # Distância do preço para cada nível
@@ -122,4 +140,115 @@ def encontrar_zona_fibonacci(
             continue
         if abs(close - valor) <= tolerancia:
             return nivel, valor
-    return None, None 
\ No newline at end of file
+    return None, None 
+
+# Fibonacci incremental: swings e ATR atualizados em O(1) a cada barra
+class FibonacciIncremental:
+    """
+    Mantém o último swing high/low confirmado e os extremos móveis sobre as barras fechadas;
+    a barra em formação entra só na consulta. contexto() equivale a
+    calcular_fibonacci(df, n, swing_window=swing_window) sobre as mesmas barras.
+    """
+    def __init__(self, n: int = 100, swing_window: int = 20, incluir_extensoes: bool = True):
+        self.n = n
+        self.w = swing_window
+        self.incluir_extensoes = incluir_extensoes
+        janela_pivo = 2 * swing_window + 1
+        self._fechadas = 0
+        self._highs = deque(maxlen=janela_pivo)
+        self._lows = deque(maxlen=janela_pivo)
+        # Janela completa do pivô (confirmação) e janela sem a barra em formação (consulta)
+        self._max_pivo = MaximoMovel(janela_pivo)
+        self._min_pivo = MinimoMovel(janela_pivo)
+        self._max_pivo_aberto = MaximoMovel(janela_pivo - 1)
+        self._min_pivo_aberto = MinimoMovel(janela_pivo - 1)
+        # Extremos das últimas n-1 e 13 barras fechadas (fallback do swing e ATR de 14)
+        self._max_n = MaximoMovel(n - 1)
+        self._min_n = MinimoMovel(n - 1)
+        self._max_atr = MaximoMovel(13)
+        self._min_atr = MinimoMovel(13)
+        self._swing_high = None  # (indice, valor) do último topo confirmado
+        self._swing_low = None
+        self._barra = None  # barra em formação: (tempo, high, low, close)
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame, **kwargs) -> 'FibonacciIncremental':
+        fibo = cls(**kwargs)
+        fibo.semear(df)
+        return fibo
+
+    def semear(self, df: pd.DataFrame):
+        """
+        Alimenta o histórico: todas as barras menos a última são fechadas, a última fica em formação.
+        """
+        highs = df['high'].values
+        lows = df['low'].values
+        closes = df['close'].values
+        for i in range(len(df)):
+            self.atualizar(df.index[i], highs[i], lows[i], closes[i])
+
+    def atualizar(self, tempo, high: float, low: float, close: float):
+        """
+        Nova barra (tempo maior) fecha a anterior; mesmo tempo atualiza a barra em formação.
+        """
+        if self._barra is not None and tempo != self._barra[0]:
+            self._fechar(self._barra[1], self._barra[2])
+        self._barra = (tempo, high, low, close)
+
+    def _fechar(self, high: float, low: float):
+        self._highs.append(high)
+        self._lows.append(low)
+        for extremo in (self._max_pivo, self._max_pivo_aberto, self._max_n, self._max_atr):
+            extremo.atualizar(high)
+        for extremo in (self._min_pivo, self._min_pivo_aberto, self._min_n, self._min_atr):
+            extremo.atualizar(low)
+        self._fechadas += 1
+        # Centro da janela com todas as barras fechadas
+        if len(self._highs) == self._highs.maxlen:
+            centro = self._fechadas - 1 - self.w
+            if self._highs[self.w] == self._max_pivo.valor():
+                self._swing_high = (centro, self._highs[self.w])
+            if self._lows[self.w] == self._min_pivo.valor():
+                self._swing_low = (centro, self._lows[self.w])
+
+    def swings(self) -> Tuple[Optional[float], Optional[float]]:
+        """
+        (swing_low, swing_high) dentro das últimas n barras, como detectar_swing_high_low(df.tail(n)).
+        """
+        if self._barra is None:
+            return None, None
+        _, high, low, _ = self._barra
+        total = self._fechadas + 1
+        inicio = total - min(self.n, total)
+        swing_high = self._swing_high
+        swing_low = self._swing_low
+        # Centro cuja janela termina na barra em formação
+        if len(self._highs) >= 2 * self.w:
+            centro = self._fechadas - self.w
+            valor = self._highs[-self.w] if self.w else high
+            if valor == max(self._max_pivo_aberto.valor(), high):
+                swing_high = (centro, valor)
+            valor = self._lows[-self.w] if self.w else low
+            if valor == min(self._min_pivo_aberto.valor(), low):
+                swing_low = (centro, valor)
+        # A janela do pivô precisa caber inteira nas últimas n barras
+        swing_high = swing_high[1] if swing_high and swing_high[0] - self.w >= inicio else None
+        swing_low = swing_low[1] if swing_low and swing_low[0] - self.w >= inicio else None
+        return swing_low, swing_high
+
+    def contexto(self, direcao: Optional[str] = None) -> Dict[str, Any]:
+        if self._barra is None:
+            raise ValueError('FibonacciIncremental sem barras')
+        _, high, low, close = self._barra
+        swing_low, swing_high = self.swings()
+        max_n = max(self._max_n.valor(), high)
+        min_n = min(self._min_n.valor(), low)
+        if swing_low is None or swing_high is None:
+            swing_low = min_n
+            swing_high = max_n
+        total = min(self._fechadas + 1, self.n)
+        if total >= 14:
+            atr_val = max(self._max_atr.valor(), high) - min(self._min_atr.valor(), low)
+        else:
+            atr_val = (max_n - min_n) / 14
+        return montar_contexto_fibonacci(swing_low, swing_high, close, atr_val, direcao, self.incluir_extensoes)
@@ -0,0 +1,158 @@
+import bisect
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Prioridades (menor = atendida antes)
+PRIORIDADE_ORDEM = 0           # abrir, alterar e fechar posições
+PRIORIDADE_NORMAL = 1          # sessão, saldo, regras, confirmações
+PRIORIDADE_MONITORAMENTO = 2   # polls de posições/P&L
+
+# Limites da documentação da Capital.com: nome -> (tokens por segundo, capacidade)
+LIMITES = {
+    'geral': (10.0, 10),              # 10 requisições/s por usuário
+    'ordem': (10.0, 1),               # 1 ordem a cada 0,1 s
+    'sessao': (1.0, 1),               # 1 POST /session por segundo
+    'posicoes_demo': (1000 / 3600, 1000)  # 1000 POST /positions por hora (conta demo)
+}
+
+# Balde de tokens: recarga contínua até a capacidade
+class BaldeTokens:
+    def __init__(self, taxa: float, capacidade: float):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = float(capacidade)
+        self._ultimo = time.monotonic()
+
+    def _recarregar(self, agora: float):
+        self.tokens = min(self.capacidade, self.tokens + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    def espera(self, agora: float) -> float:
+        """
+        Segundos até haver 1 token (0 se já houver).
+        """
+        self._recarregar(agora)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.taxa
+
+    def consumir(self):
+        self.tokens -= 1
+
+# Fila de admissão das requisições da API, por prioridade e respeitando os baldes de cada endpoint
+class AgendadorRequisicoes:
+    """
+    Quem vai fazer uma requisição chama aguardar(): a chamada bloqueia até a vez dela
+    (prioridade, depois ordem de chegada) e até os baldes do endpoint terem token.
+    Quem está na frente esperando um balde vazio só segura quem usa esse balde: uma ordem
+    parada no limite horário da demo não trava consultas que têm token no balde geral.
+    A requisição em si roda na thread de quem chamou, então várias seguem em paralelo.
+    """
+    def __init__(self, demo: bool = True, limites: Optional[Dict] = None):
+        limites = dict(limites or LIMITES)
+        if not demo:
+            limites.pop('posicoes_demo', None)
+        self.baldes = {nome: BaldeTokens(taxa, capacidade) for nome, (taxa, capacidade) in limites.items()}
+        self._fila = []  # (prioridade, seq, baldes) em ordem de atendimento
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pausado_ate = 0.0
+        self._esperas = {}  # prioridade -> [quantidade, soma, máximo]
+
+    def baldes_do_endpoint(self, metodo: str, caminho: str) -> List[str]:
+        caminho = caminho.split('?')[0].rstrip('/')
+        nomes = ['geral']
+        if metodo == 'POST' and caminho.endswith('/session'):
+            nomes.append('sessao')
+        if caminho.endswith('/positions') or '/positions/' in caminho:
+            if metodo in ('POST', 'PUT', 'DELETE'):
+                nomes.append('ordem')
+            if metodo == 'POST' and caminho.endswith('/positions'):
+                nomes.append('posicoes_demo')
+        return [nome for nome in nomes if nome in self.baldes]
+
+    @staticmethod
+    def prioridade_padrao(metodo: str, caminho: str) -> int:
+        if metodo in ('POST', 'PUT', 'DELETE') and '/positions' in caminho:
+            return PRIORIDADE_ORDEM
+        return PRIORIDADE_NORMAL
+
+    def aguardar(self, metodo: str, caminho: str, prioridade: Optional[int] = None) -> float:
+        """
+        Bloqueia até a requisição poder ser enviada. Retorna o tempo de espera em segundos.
+        """
+        if prioridade is None:
+            prioridade = self.prioridade_padrao(metodo, caminho)
+        nomes = self.baldes_do_endpoint(metodo, caminho)
+        inicio = time.monotonic()
+        with self._cond:
+            senha = (prioridade, next(self._seq), tuple(nomes))
+            bisect.insort(self._fila, senha)
+            while True:
+                espera = self._espera_da_vez(senha, time.monotonic())
+                if espera is None:
+                    # Uma requisição já pronta sai antes: acorda quando ela sair da fila
+                    self._cond.wait()
+                elif espera > 0:
+                    self._cond.wait(espera)
+                else:
+                    for nome in nomes:
+                        self.baldes[nome].consumir()
+                    self._fila.remove(senha)
+                    self._cond.notify_all()
+                    break
+            esperado = time.monotonic() - inicio
+            estatistica = self._esperas.setdefault(prioridade, [0, 0.0, 0.0])
+            estatistica[0] += 1
+            estatistica[1] += esperado
+            estatistica[2] = max(estatistica[2], esperado)
+        return esperado
+
+    def _espera_da_vez(self, senha, agora: float) -> Optional[float]:
+        """
+        Segundos até `senha` poder sair (0 = agora) ou até reavaliar. Quem está na frente
+        esperando um balde que ela também usa tem a preferência pelo token; None se alguém
+        na frente já está pronto para sair.
+        """
+        pausa = self._pausado_ate - agora
+        ocupados = set()  # baldes vazios que alguém na frente está esperando
+        for outra in self._fila:
+            esperas = {nome: self.baldes[nome].espera(agora) for nome in outra[2]}
+            if outra == senha:
+                disputados = ocupados.intersection(esperas)
+                if disputados:
+                    # Reavalia quando o balde disputado recarregar (a da frente pode nem precisar mais)
+                    return max([pausa] + [esperas[nome] for nome in disputados])
+                return max([pausa] + list(esperas.values()))
+            vazios = {nome for nome, espera in esperas.items() if espera > 0}
+            if not vazios and pausa <= 0:
+                return None
+            ocupados |= vazios
+        return None
+
+    def pausar(self, segundos: float):
+        """
+        Segura todas as requisições por `segundos` (ex.: resposta 429 do servidor).
+        """
+        with self._cond:
+            self._pausado_ate = max(self._pausado_ate, time.monotonic() + segundos)
+            self._cond.notify_all()
+
+    def estatisticas(self) -> Dict:
+        """
+        Profundidade da fila e esperas (quantidade, média e máxima em segundos) por prioridade.
+        """
+        with self._cond:
+            return {
+                'na_fila': len(self._fila),
+                'esperas': {
+                    prioridade: {
+                        'quantidade': quantidade,
+                        'media': soma / quantidade if quantidade else 0.0,
+                        'maxima': maxima
+                    }
+                    for prioridade, (quantidade, soma, maxima) in self._esperas.items()
+                }
+            }
@@ -0,0 +1,210 @@
+import pandas as pd
+from typing import Dict, Optional, Tuple
+from Fibonacci import calcular_fibonacci, encontrar_zona_fibonacci
+from padrao import detectar_padroes
+from indicadores import EMA, MaximoMovel, MinimoMovel
+from metricas import cronometrado
+
+RR_FIXO = 2.0  # Risk:Reward fixo
+ATR_MULT_STOP = 2.0  # Stop = ATR * 2
+
+@cronometrado()
+def analisar_tendencia(df: pd.DataFrame) -> str:
+    """
+    Analisa a tendência do mercado com base em médias móveis e volatilidade.
+    """
+    close = df['close']
+    ema50 = close.ewm(span=50, min_periods=50).mean()
+    ema200 = close.ewm(span=200, min_periods=200).mean()
+    return classificar_tendencia(close.iloc[-1], ema50.iloc[-1], ema200.iloc[-1])
+
+def classificar_tendencia(close: float, ema50: float, ema200: float) -> str:
+    if close > ema50 > ema200:
+        return 'alta'
+    elif close < ema50 < ema200:
+        return 'baixa'
+    else:
+        return 'lateralizado'
+
+@cronometrado()
+def encontrar_suporte_resistencia(df: pd.DataFrame, n=100):
+    """
+    Encontra suportes e resistências simples nos últimos n candles.
+    """
+    ultimos = df.tail(n)
+    suporte = ultimos['low'].min()
+    resistencia = ultimos['high'].max()
+    return suporte, resistencia
+
+def analisar_ponto_entrada(df: pd.DataFrame, tendencia: str, suporte: float, resistencia: float):
+    """
+    Analisa possíveis pontos de entrada com base na tendência e nos níveis.
+    """
+    close = df['close'].iloc[-1]
+    mensagem = f"Tendência: {tendencia}\n"
+    if tendencia == 'lateralizado':
+        mensagem += f"Mercado lateralizado. Suporte em {suporte:.5f}, resistência em {resistencia:.5f}.\n"
+        if abs(close - suporte) < (resistencia - suporte) * 0.1:
+
+            mensagem += "[SUPORTE] Preço próximo ao suporte. Avalie pressão compradora para possível compra.\n"
+        elif abs(close - resistencia) < (resistencia - suporte) * 0.1:
+            mensagem += "[RESISTÊNCIA] Preço próximo à resistência. Avalie pressão vendedora para possível venda.\n"
+    elif tendencia == 'alta':
+        mensagem += f"Mercado em alta. Suporte relevante em {suporte:.5f}.\n"
+        if abs(close - suporte) < (resistencia - suporte) * 0.1:
+            mensagem += "[SUPORTE] Preço recuando para suporte. Avalie força compradora para possível compra.\n"
+    elif tendencia == 'baixa':
+        mensagem += f"Mercado em baixa. Resistência relevante em {resistencia:.5f}.\n"
+        if abs(close - resistencia) < (resistencia - suporte) * 0.1:
+            mensagem += "[RESISTÊNCIA] Preço subindo para resistência. Avalie força vendedora para possível venda.\n"
+    return mensagem
+
+# Indicadores do par em streaming: O(1) por barra em vez de recalcular o histórico
+class IndicadoresPar:
+    """
+    Mesmos resultados de analisar_tendencia(df) e encontrar_suporte_resistencia(df, n) sobre
+    as últimas `janela` barras (o tamanho do df que a análise recebe), mantidos barra a barra.
+    Barras fechadas atualizam o estado; a barra em formação (mesmo tempo da última) só entra
+    nas consultas.
+    """
+    def __init__(self, janela: int, n_sr: int = 100):
+        self.ema50 = EMA(span=50, min_periods=50, janela=janela)
+        self.ema200 = EMA(span=200, min_periods=200, janela=janela)
+        self._max_sr = MaximoMovel(n_sr - 1)
+        self._min_sr = MinimoMovel(n_sr - 1)
+        self._barra = None  # barra em formação: (tempo, high, low, close)
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame, **kwargs) -> 'IndicadoresPar':
+        indicadores = cls(**kwargs)
+        indicadores.sincronizar(df)
+        return indicadores
+
+    def sincronizar(self, df: pd.DataFrame) -> bool:
+        """
+        Passa as barras de df a partir da última vista (ela de novo: pode ter fechado com outros
+        valores). Retorna False se df não contém a última barra vista (lacuna): recrie o estado.
+        """
+        desde = 0
+        if self._barra is not None:
+            desde = int(df.index.searchsorted(self._barra[0]))
+            if desde >= len(df) or df.index[desde] != self._barra[0]:
+                return False
+        highs = df['high'].values
+        lows = df['low'].values
+        closes = df['close'].values
+        for i in range(desde, len(df)):
+            self.atualizar(df.index[i], highs[i], lows[i], closes[i])
+        return True
+
+    def atualizar(self, tempo, high: float, low: float, close: float):
+        if self._barra is not None and tempo != self._barra[0]:
+            _, high_f, low_f, close_f = self._barra
+            self.ema50.atualizar(close_f)
+            self.ema200.atualizar(close_f)
+            self._max_sr.atualizar(high_f)
+            self._min_sr.atualizar(low_f)
+        self._barra = (tempo, high, low, close)
+
+    def tendencia(self) -> str:
+        _, _, _, close = self._barra
+        return classificar_tendencia(close, self.ema50.valor(close), self.ema200.valor(close))
+
+    def suporte_resistencia(self) -> Tuple[float, float]:
+        _, high, low, _ = self._barra
+        return self._min_sr.valor(low), self._max_sr.valor(high)
+
+# Função para decidir se é entrada forte (exemplo simplificado)
+def detectar_entrada_forte(mensagem, fibo_ctx, tendencia, suporte, resistencia, close):
+    # Exemplo: tendência definida + preço muito próximo do suporte/resistência + confluência Fibonacci
+    if tendencia == 'alta' and abs(close - suporte) < (resistencia - suporte) * 0.1:
+        if fibo_ctx['direcao'] == 'alta' and abs(close - fibo_ctx['retracements']['0.382']) < fibo_ctx['atr']:
+            return 'BUY'
+    if tendencia == 'baixa' and abs(close - resistencia) < (resistencia - suporte) * 0.1:
+        if fibo_ctx['direcao'] == 'baixa' and abs(close - fibo_ctx['retracements']['0.618']) < fibo_ctx['atr']:
+            return 'SELL'
+    return None
+
+def calcular_stop_take(direcao: str, close: float, atr: float, suporte: float, resistencia: float):
+    """
+    Stop e take combinando ATR e suporte/resistência.
+    """
+    if direcao == 'BUY':
+        stop_atr = close - ATR_MULT_STOP * atr
+        stop = max(suporte, stop_atr)
+        take_rr = close + RR_FIXO * (close - stop)
+        take = min(resistencia, take_rr)
+    else:
+        stop_atr = close + ATR_MULT_STOP * atr
+        stop = min(resistencia, stop_atr)
+        take_rr = close - RR_FIXO * (stop - close)
+        take = max(suporte, take_rr)
+    return stop, take
+
+@cronometrado()
+def analisar_par(par: str, df_m15: pd.DataFrame, df_h4: Optional[pd.DataFrame] = None,
+                 indicadores: Optional[Dict] = None) -> Dict:
+    """
+    Executa toda a análise de um par (tendência, S/R, Fibonacci, entrada, padrões) sem I/O.
+    Retorna o contexto da análise; 'direcao' é None quando não há entrada forte.
+    'forca' ordena sinais entre pares: entrada forte + padrão + macro H4 + proximidade do nível Fibonacci.
+    `indicadores` traz 'tendencia', 'tendencia_macro', 'suporte' e 'resistencia' já mantidos
+    barra a barra (IndicadoresPar); sem ele são recalculados do histórico.
+    """
+    if indicadores is not None:
+        tendencia_macro = indicadores['tendencia_macro']
+        tendencia = indicadores['tendencia']
+        suporte, resistencia = indicadores['suporte'], indicadores['resistencia']
+    else:
+        tendencia_macro = None
+        if df_h4 is not None and len(df_h4) >= 50:
+            tendencia_macro = analisar_tendencia(df_h4)
+        tendencia = analisar_tendencia(df_m15)
+        suporte, resistencia = encontrar_suporte_resistencia(df_m15, n=100)
+    mensagem = analisar_ponto_entrada(df_m15, tendencia, suporte, resistencia)
+    fibo_ctx = calcular_fibonacci(df_m15, n=200, incluir_extensoes=True)
+    nivel_prox, valor_prox = encontrar_zona_fibonacci(
+        fibo_ctx['close'],
+        {**fibo_ctx['retracements'], **fibo_ctx['extensoes']},
+        atr=fibo_ctx['atr']
+    )
+    close = df_m15['close'].iloc[-1]
+    atr = fibo_ctx['atr']
+    direcao = detectar_entrada_forte(mensagem, fibo_ctx, tendencia, suporte, resistencia, close)
+    resultado = {
+        'par': par,
+        'direcao': direcao,
+        'close': close,
+        'atr': atr,
+        'tendencia': tendencia,
+        'tendencia_macro': tendencia_macro,
+        'suporte': suporte,
+        'resistencia': resistencia,
+        'mensagem': mensagem,
+        'fibo_ctx': fibo_ctx,
+        'nivel_fibo': (nivel_prox, valor_prox),
+        'padrao': None,
+        'padrao_confirmado': False,
+        'forca': 0.0
+    }
+    if not direcao:
+        return resultado
+    stop, take = calcular_stop_take(direcao, close, atr, suporte, resistencia)
+    resultado['stop'] = stop
+    resultado['take'] = take
+    # --- Padrões gráficos: risco cheio ou reduzido (só o primeiro importa) ---
+    padroes = detectar_padroes(df_m15, modo='primeiro')
+    if padroes:
+        padrao = padroes[0]
+        resultado['padrao'] = padrao
+        if (direcao == 'BUY' and padrao['direcao'] in ['Alta', 'Indefinida']) or (direcao == 'SELL' and padrao['direcao'] in ['Baixa', 'Indefinida']):
+            resultado['padrao_confirmado'] = True
+    forca = 1.0
+    if resultado['padrao_confirmado']:
+        forca += 1.0
+    if (direcao == 'BUY' and tendencia_macro == 'alta') or (direcao == 'SELL' and tendencia_macro == 'baixa'):
+        forca += 0.5
+    if nivel_prox and atr:
+        forca += max(0.0, 1.0 - abs(close - valor_prox) / atr)
+    resultado['forca'] = forca
+    return resultado
@@ -0,0 +1,102 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+from barras import COLUNAS
+
+# Registro gravado em disco: tempo (ns desde epoch) + OHLCV
+DTYPE_BARRA = np.dtype([('tempo', '<i8')] + [(coluna, '<f8') for coluna in COLUNAS])
+
+def nome_intervalo(intervalo) -> str:
+    # Interval do tvDatafeed (enum) ou string já pronta
+    return getattr(intervalo, 'name', str(intervalo))
+
+# Arquivo histórico local: um arquivo binário append-only por (símbolo, intervalo)
+class ArquivoBarras:
+    """
+    Cada arquivo é uma sequência de registros DTYPE_BARRA em ordem de tempo, só com barras
+    fechadas. A leitura usa memmap: abrir é instantâneo e só as páginas usadas são lidas.
+    Um registro incompleto no fim (queda durante a escrita) é ignorado.
+    """
+    def __init__(self, diretorio: str = 'dados'):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+        self._lock = threading.Lock()
+        self._ultimos = {}  # caminho -> último tempo gravado (ns)
+
+    def caminho(self, par: str, intervalo) -> str:
+        return os.path.join(self.diretorio, f'{par}_{nome_intervalo(intervalo)}.bin')
+
+    def _mapear(self, caminho: str) -> np.ndarray:
+        if not os.path.exists(caminho):
+            return np.empty(0, dtype=DTYPE_BARRA)
+        registros = os.path.getsize(caminho) // DTYPE_BARRA.itemsize
+        if registros == 0:
+            return np.empty(0, dtype=DTYPE_BARRA)
+        return np.memmap(caminho, dtype=DTYPE_BARRA, mode='r', shape=(registros,))
+
+    def registros(self, par: str, intervalo) -> np.ndarray:
+        """
+        Todos os registros do par/intervalo (memmap somente leitura).
+        """
+        return self._mapear(self.caminho(par, intervalo))
+
+    def ultimo_tempo(self, par: str, intervalo) -> Optional[np.datetime64]:
+        caminho = self.caminho(par, intervalo)
+        with self._lock:
+            if caminho not in self._ultimos:
+                dados = self._mapear(caminho)
+                self._ultimos[caminho] = int(dados['tempo'][-1]) if len(dados) else None
+            ultimo = self._ultimos[caminho]
+        return None if ultimo is None else np.datetime64(ultimo, 'ns')
+
+    def carregar(self, par: str, intervalo, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (tempos datetime64[ns], valores float64 [n, 5]) das últimas n barras (todas se n=None).
+        """
+        dados = self.registros(par, intervalo)
+        if n is not None:
+            dados = dados[-n:] if n > 0 else dados[:0]
+        tempos = dados['tempo'].astype('datetime64[ns]')
+        valores = np.column_stack([dados[coluna] for coluna in COLUNAS]) if len(dados) else np.empty((0, len(COLUNAS)))
+        return tempos, valores
+
+    def carregar_dataframe(self, par: str, intervalo, inicio=None, fim=None) -> pd.DataFrame:
+        """
+        DataFrame (formato do TvDatafeed, sem a coluna symbol) entre inicio e fim, para análise offline.
+        """
+        dados = self.registros(par, intervalo)
+        tempos = dados['tempo']
+        a = 0 if inicio is None else int(np.searchsorted(tempos, pd.Timestamp(inicio).value, side='left'))
+        b = len(dados) if fim is None else int(np.searchsorted(tempos, pd.Timestamp(fim).value, side='right'))
+        trecho = dados[a:b]
+        indice = pd.DatetimeIndex(trecho['tempo'].astype('datetime64[ns]'), name='datetime')
+        return pd.DataFrame({coluna: np.asarray(trecho[coluna]) for coluna in COLUNAS}, index=indice)
+
+    def anexar(self, par: str, intervalo, tempos: np.ndarray, valores: np.ndarray) -> int:
+        """
+        Grava as barras mais novas que a última já arquivada. Retorna quantas foram gravadas.
+        """
+        caminho = self.caminho(par, intervalo)
+        tempos = np.asarray(tempos).astype('datetime64[ns]').astype('<i8')
+        ultimo = self.ultimo_tempo(par, intervalo)
+        if ultimo is not None:
+            novos = tempos > ultimo.astype('<i8')
+            tempos = tempos[novos]
+            valores = valores[novos]
+        if len(tempos) == 0:
+            return 0
+        registros = np.empty(len(tempos), dtype=DTYPE_BARRA)
+        registros['tempo'] = tempos
+        for i, coluna in enumerate(COLUNAS):
+            registros[coluna] = valores[:, i]
+        with self._lock:
+            with open(caminho, 'ab') as f:
+                # Descarta registro incompleto de uma escrita interrompida antes de anexar
+                tamanho = f.tell()
+                if tamanho % DTYPE_BARRA.itemsize:
+                    f.truncate(tamanho - tamanho % DTYPE_BARRA.itemsize)
+                f.write(registros.tobytes())
+            self._ultimos[caminho] = int(tempos[-1])
+        return len(registros)
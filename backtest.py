@@ -0,0 +1,184 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from tvDatafeed import Interval
+from analise import detectar_entrada_forte, calcular_stop_take
+from arquivo import ArquivoBarras
+from Fibonacci import FibonacciIncremental
+from padrao import detectar_padroes
+from pares import PARES_PADRAO
+
+JANELA_ANALISE = 700  # barras M15 que o lucelo.main analisa a cada ciclo
+MIN_BARRAS = 200      # abaixo disso o lucelo.main não analisa
+
+def ema_em_janela(close: np.ndarray, span: int, min_periods: int, janela: int) -> np.ndarray:
+    """
+    Para cada t, o valor de close[t-janela+1:t+1].ewm(span, min_periods).mean() no último ponto,
+    vetorizado: a soma ponderada de toda a série menos a parte que ficou fora da janela.
+    """
+    beta = 1 - 2 / (span + 1)
+    n = len(close)
+    t = np.arange(n)
+    # ewm(adjust=True) = S_t / D_t, com D_t = (1 - beta^(t+1)) / (1 - beta)
+    d = (1 - beta ** (t + 1)) / (1 - beta)
+    s = pd.Series(close).ewm(span=span, adjust=True).mean().to_numpy() * d
+    w = np.minimum(t + 1, janela)
+    fora = t - w  # último índice fora da janela (-1 = nenhum)
+    s_fora = np.where(fora >= 0, s[np.maximum(fora, 0)], 0.0)
+    d_fora = np.where(fora >= 0, d[np.maximum(fora, 0)], 0.0)
+    peso = beta ** w
+    ema = (s - peso * s_fora) / (d - peso * d_fora)
+    ema[w < min_periods] = np.nan
+    return ema
+
+def preparar_sinais(df: pd.DataFrame, janela: int = JANELA_ANALISE) -> Dict[str, np.ndarray]:
+    """
+    Pré-cálculo vetorizado de tendência e suporte/resistência por barra, com a mesma janela do
+    lucelo.main, e a máscara das barras candidatas (tendência + preço perto do S/R).
+    """
+    close = df['close'].to_numpy(dtype=np.float64)
+    ema50 = ema_em_janela(close, 50, 50, janela)
+    ema200 = ema_em_janela(close, 200, 200, janela)
+    alta = (close > ema50) & (ema50 > ema200)
+    baixa = (close < ema50) & (ema50 < ema200)
+    suporte = df['low'].rolling(100, min_periods=1).min().to_numpy()
+    resistencia = df['high'].rolling(100, min_periods=1).max().to_numpy()
+    faixa = (resistencia - suporte) * 0.1
+    candidata_buy = alta & (np.abs(close - suporte) < faixa)
+    candidata_sell = baixa & (np.abs(close - resistencia) < faixa)
+    tendencia = np.where(alta, 'alta', np.where(baixa, 'baixa', 'lateralizado'))
+    return {
+        'tendencia': tendencia,
+        'suporte': suporte,
+        'resistencia': resistencia,
+        'candidata': candidata_buy | candidata_sell
+    }
+
+def backtest_par(par: str, df: pd.DataFrame, capital: float = 10000.0, janela: int = JANELA_ANALISE) -> Dict:
+    """
+    Reproduz a decisão do lucelo.main barra a barra (avaliação no fechamento de cada barra M15):
+    tendência EMA50/200, S/R de 100 barras, Fibonacci (n=200), detectar_entrada_forte, padrão
+    gráfico (risco 1% com padrão, 0,5% sem) e stop/take de calcular_stop_take. Uma posição por
+    vez, entrada no close do sinal; se stop e take caem na mesma barra, conta o stop.
+    """
+    inicio = time.perf_counter()
+    n = len(df)
+    highs = df['high'].to_numpy(dtype=np.float64)
+    lows = df['low'].to_numpy(dtype=np.float64)
+    closes = df['close'].to_numpy(dtype=np.float64)
+    pre = preparar_sinais(df, janela)
+    fibo = FibonacciIncremental(n=200, swing_window=20, incluir_extensoes=True)
+    equity = capital
+    pico = capital
+    max_drawdown = 0.0
+    trades: List[Dict] = []
+    posicao: Optional[Dict] = None
+    for t in range(n):
+        fibo.atualizar(t, highs[t], lows[t], closes[t])
+        if posicao is not None:
+            # Saída: stop antes do take quando os dois cabem na barra
+            if posicao['direcao'] == 'BUY':
+                saida = posicao['stop'] if lows[t] <= posicao['stop'] else (posicao['take'] if highs[t] >= posicao['take'] else None)
+            else:
+                saida = posicao['stop'] if highs[t] >= posicao['stop'] else (posicao['take'] if lows[t] <= posicao['take'] else None)
+            if saida is not None:
+                sinal = 1 if posicao['direcao'] == 'BUY' else -1
+                resultado = sinal * (saida - posicao['entrada']) * posicao['tamanho']
+                equity += resultado
+                pico = max(pico, equity)
+                max_drawdown = max(max_drawdown, (pico - equity) / pico if pico else 0.0)
+                posicao.update({'saida': saida, 'barra_saida': t, 'tempo_saida': df.index[t], 'resultado': resultado})
+                trades.append(posicao)
+                posicao = None
+            continue
+        if t + 1 < MIN_BARRAS or not pre['candidata'][t]:
+            continue
+        fibo_ctx = fibo.contexto()
+        suporte = pre['suporte'][t]
+        resistencia = pre['resistencia'][t]
+        close = closes[t]
+        direcao = detectar_entrada_forte(None, fibo_ctx, pre['tendencia'][t], suporte, resistencia, close)
+        if not direcao:
+            continue
+        stop, take = calcular_stop_take(direcao, close, fibo_ctx['atr'], suporte, resistencia)
+        risco_preco = abs(close - stop)
+        if risco_preco <= 0:
+            continue
+        padroes = detectar_padroes(df.iloc[max(0, t + 1 - janela):t + 1], modo='primeiro')
+        padrao_confirmado = bool(padroes) and (
+            (direcao == 'BUY' and padroes[0]['direcao'] in ['Alta', 'Indefinida']) or
+            (direcao == 'SELL' and padroes[0]['direcao'] in ['Baixa', 'Indefinida'])
+        )
+        risco_percent = 1.0 if padrao_confirmado else 0.5
+        posicao = {
+            'par': par,
+            'direcao': direcao,
+            'barra_entrada': t,
+            'tempo_entrada': df.index[t],
+            'entrada': close,
+            'stop': stop,
+            'take': take,
+            'padrao': padroes[0]['tipo'] if padroes else None,
+            'risco_percent': risco_percent,
+            'tamanho': equity * risco_percent / 100 / risco_preco
+        }
+    duracao = time.perf_counter() - inicio
+    ganhos = sum(tr['resultado'] for tr in trades if tr['resultado'] > 0)
+    perdas = -sum(tr['resultado'] for tr in trades if tr['resultado'] < 0)
+    return {
+        'par': par,
+        'barras': n,
+        'trades': trades,
+        'num_trades': len(trades),
+        'taxa_acerto': sum(1 for tr in trades if tr['resultado'] > 0) / len(trades) if trades else 0.0,
+        'profit_factor': ganhos / perdas if perdas else float('inf') if ganhos else 0.0,
+        'retorno_percent': (equity / capital - 1) * 100,
+        'max_drawdown_percent': max_drawdown * 100,
+        'posicao_aberta': posicao,
+        'duracao': duracao,
+        'barras_por_segundo': n / duracao if duracao else 0.0
+    }
+
+def _backtest_do_arquivo(par: str, diretorio: str, intervalo, inicio, fim, capital: float) -> Dict:
+    # Executado no processo filho: lê o histórico direto do disco (memmap)
+    df = ArquivoBarras(diretorio).carregar_dataframe(par, intervalo, inicio=inicio, fim=fim)
+    return backtest_par(par, df, capital=capital)
+
+def executar_backtest(pares: List[str], diretorio: str = 'dados', intervalo=Interval.in_15_minute,
+                      inicio=None, fim=None, capital: float = 10000.0, max_processos: Optional[int] = None) -> Dict:
+    """
+    Backtest de vários pares em paralelo (um processo por par). Retorna os resultados por par
+    e a vazão total em barras por segundo.
+    """
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_processos or os.cpu_count()) as pool:
+        futuros = {par: pool.submit(_backtest_do_arquivo, par, diretorio, intervalo, inicio, fim, capital) for par in pares}
+        resultados = {par: futuro.result() for par, futuro in futuros.items()}
+    duracao = time.perf_counter() - t0
+    barras = sum(r['barras'] for r in resultados.values())
+    return {
+        'resultados': resultados,
+        'barras': barras,
+        'duracao': duracao,
+        'barras_por_segundo': barras / duracao if duracao else 0.0
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backtest da estratégia do Lucelo sobre o histórico local')
+    parser.add_argument('pares', nargs='*', default=PARES_PADRAO)
+    parser.add_argument('--dados', default='dados', help='diretório do ArquivoBarras')
+    parser.add_argument('--inicio', default=None)
+    parser.add_argument('--fim', default=None)
+    parser.add_argument('--capital', type=float, default=10000.0)
+    parser.add_argument('--processos', type=int, default=None)
+    args = parser.parse_args()
+    relatorio = executar_backtest(args.pares, args.dados, inicio=args.inicio, fim=args.fim,
+                                  capital=args.capital, max_processos=args.processos)
+    for par, r in relatorio['resultados'].items():
+        print(f"[{par}] {r['barras']} barras | Trades: {r['num_trades']} | Acerto: {r['taxa_acerto']*100:.1f}% | "
+              f"PF: {r['profit_factor']:.2f} | Retorno: {r['retorno_percent']:+.2f}% | DD máx: {r['max_drawdown_percent']:.2f}%")
+    print(f"[BACKTEST] {relatorio['barras']} barras em {relatorio['duracao']:.2f}s ({relatorio['barras_por_segundo']:,.0f} barras/s)")
@@ -0,0 +1,210 @@
+import re
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+from logs import obter_logger
+
+COLUNAS = ['open', 'high', 'low', 'close', 'volume']
+log = obter_logger('BARRAS')
+_UNIDADES = {'': 60, 'H': 3600, 'D': 86400, 'W': 7 * 86400, 'M': 30 * 86400}
+
+def segundos_intervalo(intervalo) -> int:
+    """
+    Duração em segundos de um Interval do tvDatafeed ('1', '15', '4H', '1D', '1W', '1M').
+    """
+    valor = str(getattr(intervalo, 'value', intervalo))
+    m = re.fullmatch(r'(\d+)([HDWM]?)', valor)
+    if not m:
+        raise ValueError(f'Intervalo desconhecido: {intervalo}')
+    return int(m.group(1)) * _UNIDADES[m.group(2)]
+
+# Buffer circular de barras OHLCV de um (símbolo, intervalo)
+class SerieBarras:
+    """
+    Buffer circular espelhado: cada barra é gravada em duas posições (i e i + capacidade),
+    então as últimas barras estão sempre contíguas na memória e podem ser expostas
+    como DataFrame sem cópia.
+    """
+    def __init__(self, capacidade: int = 1000):
+        self.capacidade = capacidade
+        self._tempos = np.empty(2 * capacidade, dtype='datetime64[ns]')
+        self._valores = np.empty((2 * capacidade, len(COLUNAS)), dtype=np.float64)
+        self._total = 0  # barras já gravadas desde o início
+
+    def __len__(self):
+        return min(self._total, self.capacidade)
+
+    def limpar(self):
+        """
+        Esvazia a série (ex.: lacuna que nem o backfill cobre); quem tem referência a ela continua valendo.
+        """
+        self._total = 0
+
+    def ultimo_tempo(self) -> Optional[np.datetime64]:
+        if self._total == 0:
+            return None
+        return self._tempos[(self._total - 1) % self.capacidade]
+
+    def _gravar(self, slot: int, tempo, valores):
+        self._tempos[slot] = tempo
+        self._tempos[slot + self.capacidade] = tempo
+        self._valores[slot] = valores
+        self._valores[slot + self.capacidade] = valores
+
+    def anexar(self, tempo, valores) -> bool:
+        """
+        Anexa uma barra. Se o tempo for igual ao da última, atualiza a barra em formação.
+        Barras mais antigas que a última são ignoradas. Retorna True se algo mudou.
+        """
+        tempo = np.datetime64(tempo, 'ns')
+        ultimo = self.ultimo_tempo()
+        if ultimo is not None and tempo < ultimo:
+            return False
+        if ultimo is not None and tempo == ultimo:
+            slot = (self._total - 1) % self.capacidade
+            if np.array_equal(self._valores[slot], valores):
+                return False
+        else:
+            slot = self._total % self.capacidade
+            self._total += 1
+        self._gravar(slot, tempo, valores)
+        return True
+
+    def mesclar(self, df: pd.DataFrame) -> int:
+        """
+        Mescla as barras de um DataFrame (formato do TvDatafeed) no buffer.
+        Retorna quantas barras foram anexadas ou atualizadas.
+        """
+        if df is None or len(df) == 0:
+            return 0
+        tempos = df.index.values.astype('datetime64[ns]')
+        valores = df.reindex(columns=COLUNAS).to_numpy(dtype=np.float64, na_value=np.nan)
+        ultimo = self.ultimo_tempo()
+        inicio = 0 if ultimo is None else int(np.searchsorted(tempos, ultimo, side='left'))
+        alteradas = 0
+        for i in range(inicio, len(tempos)):
+            if self.anexar(tempos[i], valores[i]):
+                alteradas += 1
+        return alteradas
+
+    def arrays(self, n: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retorna (tempos, valores) das últimas n barras como views (sem cópia).
+        """
+        tamanho = len(self)
+        n = tamanho if n is None else min(n, tamanho)
+        fim = (self._total - 1) % self.capacidade + self.capacidade + 1 if self._total else 0
+        return self._tempos[fim - n:fim], self._valores[fim - n:fim]
+
+    def dataframe(self, n: Optional[int] = None) -> pd.DataFrame:
+        """
+        DataFrame das últimas n barras apontando para o buffer (sem cópia).
+        A view reflete o buffer: use-a dentro do ciclo de análise e não guarde referência.
+        """
+        tempos, valores = self.arrays(n)
+        indice = pd.DatetimeIndex(tempos, name='datetime', copy=False)
+        return pd.DataFrame(valores, index=indice, columns=COLUNAS, copy=False)
+
+# Cache de barras por (símbolo, intervalo) com backfill único e atualização incremental
+class CacheBarras:
+    """
+    Com um ArquivoBarras, a série começa do histórico em disco e só a lacuna desde a última
+    barra gravada é buscada; as barras fechadas novas são gravadas a cada atualização.
+    """
+    def __init__(self, tv=None, exchange: str = 'FX', capacidade: int = 1000, barras_incremento: int = 5, arquivo=None):
+        self.tv = tv
+        self.exchange = exchange
+        self.capacidade = capacidade
+        self.barras_incremento = barras_incremento  # barras buscadas por atualização
+        self.arquivo = arquivo
+        self._series: Dict[Tuple[str, object], SerieBarras] = {}
+        self._lock = threading.Lock()
+
+    def serie(self, par: str, intervalo, capacidade: Optional[int] = None) -> SerieBarras:
+        chave = (par, intervalo)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = SerieBarras(max(self.capacidade, capacidade or 0))
+                self._series[chave] = serie
+            return serie
+
+    def atualizar(self, par: str, intervalo, n_bars: int, tv=None) -> int:
+        """
+        Faz o backfill completo na primeira chamada e depois busca só as barras mais recentes.
+        Se as barras novas não encostarem no buffer (lacuna), refaz o backfill.
+        tv permite usar outra conexão (ex.: pool de conexões da central de dados).
+        """
+        tv = tv or self.tv
+        serie = self.serie(par, intervalo, capacidade=n_bars)
+        self.carregar_do_arquivo(par, intervalo, n_bars)
+        if len(serie) == 0:
+            df = tv.get_hist(symbol=par, exchange=self.exchange, interval=intervalo, n_bars=n_bars)
+            alteradas = serie.mesclar(df)
+        else:
+            df = tv.get_hist(symbol=par, exchange=self.exchange, interval=intervalo, n_bars=self._barras_faltando(serie, intervalo, n_bars))
+            if df is None or len(df) == 0:
+                return 0
+            if np.datetime64(df.index[0], 'ns') > serie.ultimo_tempo():
+                # Lacuna maior que o incremento: backfill para não deixar buraco
+                df = tv.get_hist(symbol=par, exchange=self.exchange, interval=intervalo, n_bars=n_bars)
+                if df is not None and len(df) and np.datetime64(df.index[0], 'ns') > serie.ultimo_tempo():
+                    # Nem o backfill encosta na última barra: recomeça a série em vez de anexar com buraco
+                    log.warning(f"{par} {getattr(intervalo, 'value', intervalo)}: lacuna maior que {n_bars} barras desde "
+                                f"{serie.ultimo_tempo()}; série recomeçada em {df.index[0]} (o arquivo fica com o buraco)")
+                    serie.limpar()
+            alteradas = serie.mesclar(df)
+        if alteradas and self.arquivo is not None:
+            self._persistir(par, intervalo, serie)
+        return alteradas
+
+    def gravar(self, par: str, intervalo):
+        """
+        Grava no arquivo as barras fechadas de uma série montada fora de atualizar() (reamostragem).
+        """
+        if self.arquivo is not None:
+            self._persistir(par, intervalo, self.serie(par, intervalo))
+
+    def carregar_do_arquivo(self, par: str, intervalo, n_bars: int) -> int:
+        """
+        Partida a quente sem rede: preenche a série vazia com o histórico em disco.
+        """
+        serie = self.serie(par, intervalo, capacidade=n_bars)
+        if len(serie) == 0 and self.arquivo is not None:
+            self._carregar_arquivo(par, intervalo, serie)
+        return len(serie)
+
+    def _barras_faltando(self, serie: SerieBarras, intervalo, n_bars: int) -> int:
+        # Barras desde a última conhecida pelo relógio (cobre o gap após um reinício)
+        try:
+            passo = segundos_intervalo(intervalo)
+        except ValueError:
+            return self.barras_incremento
+        # Relógio local, o mesmo dos tempos das barras do tvDatafeed (datetime64('now') seria UTC)
+        agora = pd.Timestamp.now().to_datetime64().astype('datetime64[s]')
+        decorrido = (agora - serie.ultimo_tempo().astype('datetime64[s]')).astype(int)
+        faltando = int(decorrido // passo) + 2
+        return min(max(self.barras_incremento, faltando), max(n_bars, self.barras_incremento))
+
+    def _carregar_arquivo(self, par: str, intervalo, serie: SerieBarras):
+        tempos, valores = self.arquivo.carregar(par, intervalo, n=serie.capacidade)
+        for i in range(len(tempos)):
+            serie.anexar(tempos[i], valores[i])
+
+    def _persistir(self, par: str, intervalo, serie: SerieBarras):
+        # Só barras fechadas: a última ainda pode mudar
+        tempos, valores = serie.arrays()
+        if len(tempos) > 1:
+            self.arquivo.anexar(par, intervalo, tempos[:-1], valores[:-1])
+
+    def obter(self, par: str, intervalo, n_bars: int, atualizar: bool = True) -> Optional[pd.DataFrame]:
+        """
+        Retorna as últimas n_bars do par/intervalo como DataFrame (view do buffer).
+        """
+        if atualizar:
+            self.atualizar(par, intervalo, n_bars)
+        serie = self.serie(par, intervalo, capacidade=n_bars)
+        if len(serie) == 0:
+            return None
+        return serie.dataframe(n_bars)
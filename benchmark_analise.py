@@ -0,0 +1,155 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional
+
+# Benchmark das funções quentes da análise sobre OHLC sintético (offline, sem TradingView nem corretora)
+TAMANHOS = [700, 10_000, 100_000, 1_000_000]
+ARQUIVO_BASE = 'benchmark_analise_base.json'
+TOLERANCIA = 0.25  # regressão: mais de 25% acima da base (tempo ou memória)
+
+# Regimes de volatilidade: (volatilidade por barra, deriva por barra, pavio relativo ao corpo)
+REGIMES = {
+    'calmo': (0.0005, 0.0, 0.5),
+    'normal': (0.002, 0.0, 1.0),
+    'volatil': (0.008, 0.0, 2.0),
+    'tendencia': (0.002, 0.0004, 1.0)
+}
+
+def gerar_ohlc(n: int, regime: str = 'normal', semente: int = 42, preco_inicial: float = 1.1) -> pd.DataFrame:
+    """
+    Barras M15 sintéticas e determinísticas (mesma semente, mesmas barras): close em passeio
+    aleatório geométrico, open = close anterior, high/low com pavios aleatórios.
+    """
+    volatilidade, deriva, pavio = REGIMES[regime]
+    rng = np.random.default_rng(semente)
+    retornos = rng.normal(deriva, volatilidade, n)
+    close = preco_inicial * np.exp(np.cumsum(retornos))
+    open_ = np.concatenate(([preco_inicial], close[:-1]))
+    corpo_topo = np.maximum(open_, close)
+    corpo_base = np.minimum(open_, close)
+    escala = pavio * volatilidade * close
+    high = corpo_topo + np.abs(rng.normal(0.0, 1.0, n)) * escala
+    low = corpo_base - np.abs(rng.normal(0.0, 1.0, n)) * escala
+    volume = rng.integers(100, 10_000, n).astype(np.float64)
+    indice = pd.date_range('2024-01-01', periods=n, freq='15min')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=indice)
+
+def _desenhar_velas(df: pd.DataFrame, quantidade: int = 200):
+    # desenhar_vela é por vela: mede as últimas `quantidade` (custo não depende do histórico)
+    from thedesigner import desenhar_vela
+    ultimas = df.tail(quantidade)
+    for o, h, l, c in zip(ultimas['open'].to_numpy(), ultimas['high'].to_numpy(),
+                          ultimas['low'].to_numpy(), ultimas['close'].to_numpy()):
+        desenhar_vela(o, h, l, c)
+
+def _casos() -> Dict[str, Callable[[pd.DataFrame], object]]:
+    from padrao import detectar_padroes, encontrar_pivos
+    from Fibonacci import calcular_fibonacci, detectar_swing_high_low
+    from analise import analisar_tendencia  # lucelo.analisar_tendencia aponta para cá
+    return {
+        'padrao.detectar_padroes': detectar_padroes,
+        'padrao.encontrar_pivos': encontrar_pivos,
+        'Fibonacci.calcular_fibonacci': lambda df: calcular_fibonacci(df, n=200),
+        'Fibonacci.detectar_swing_high_low': detectar_swing_high_low,
+        'lucelo.analisar_tendencia': analisar_tendencia,
+        'thedesigner.desenhar_vela': _desenhar_velas
+    }
+
+def medir(funcao: Callable, df: pd.DataFrame, repeticoes: int) -> Dict:
+    """
+    Tempo: mediana e mínimo de `repeticoes` execuções (ms). Memória: pico do tracemalloc
+    numa execução separada (o rastreamento deixa a execução mais lenta).
+    """
+    funcao(df)  # aquecimento (imports, caches)
+    tempos = []
+    for _ in range(repeticoes):
+        gc.collect()
+        t0 = time.perf_counter()
+        funcao(df)
+        tempos.append((time.perf_counter() - t0) * 1000)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcao(df)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'mediana_ms': float(np.median(tempos)), 'min_ms': min(tempos), 'pico_kb': pico / 1024}
+
+def executar(tamanhos: List[int], regimes: List[str], funcoes: Optional[List[str]] = None,
+             repeticoes: int = 5, semente: int = 42) -> Dict[str, Dict]:
+    """
+    Retorna {'funcao|regime|n': {'mediana_ms', 'min_ms', 'pico_kb'}}.
+    """
+    casos = _casos()
+    resultados = {}
+    for n in tamanhos:
+        for regime in regimes:
+            df = gerar_ohlc(n, regime, semente)
+            for nome, funcao in casos.items():
+                if funcoes and nome not in funcoes:
+                    continue
+                # Séries grandes: menos repetições para o conjunto caber em poucos minutos
+                vezes = repeticoes if n <= 100_000 else max(1, repeticoes // 3)
+                resultados[f'{nome}|{regime}|{n}'] = medir(funcao, df, vezes)
+                r = resultados[f'{nome}|{regime}|{n}']
+                print(f"[BENCHMARK] {nome:<34} {regime:<10} n={n:<8} {r['mediana_ms']:10.3f} ms  pico={r['pico_kb']:10.1f} KB")
+    return resultados
+
+def comparar(resultados: Dict[str, Dict], base: Dict[str, Dict], tolerancia: float = TOLERANCIA) -> List[str]:
+    """
+    Linhas de regressão (tempo mediano ou pico de memória acima da base + tolerância).
+    Casos sem base não contam.
+    """
+    regressoes = []
+    for chave, atual in sorted(resultados.items()):
+        anterior = base.get(chave)
+        if anterior is None:
+            continue
+        for metrica in ('mediana_ms', 'pico_kb'):
+            # Abaixo de 0,05 ms / 1 KB o ruído domina: não compara
+            piso = 0.05 if metrica == 'mediana_ms' else 1.0
+            if anterior[metrica] >= piso and atual[metrica] > anterior[metrica] * (1 + tolerancia):
+                regressoes.append(f"{chave} {metrica}: {anterior[metrica]:.3f} -> {atual[metrica]:.3f} "
+                                  f"(+{(atual[metrica] / anterior[metrica] - 1) * 100:.0f}%)")
+    return regressoes
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark das funções de análise sobre OHLC sintético')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS)
+    parser.add_argument('--regimes', nargs='+', default=list(REGIMES), choices=list(REGIMES))
+    parser.add_argument('--funcoes', nargs='+', help='só estas (ex.: padrao.detectar_padroes)')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--base', default=ARQUIVO_BASE, help='arquivo da base de comparação')
+    parser.add_argument('--salvar-base', action='store_true', help='grava os resultados como nova base')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    args = parser.parse_args()
+    resultados = executar(args.tamanhos, args.regimes, args.funcoes, args.repeticoes, args.semente)
+    if args.salvar_base:
+        base = {}
+        if os.path.exists(args.base):
+            with open(args.base, 'r') as f:
+                base = json.load(f)
+        base.update(resultados)  # mantém casos que não rodaram desta vez
+        with open(args.base, 'w') as f:
+            json.dump(base, f, indent=2, sort_keys=True)
+        print(f"[BENCHMARK] Base salva em {args.base} ({len(resultados)} casos)")
+    elif os.path.exists(args.base):
+        with open(args.base, 'r') as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerancia)
+        if regressoes:
+            print(f"[BENCHMARK] {len(regressoes)} regressão(ões) acima de {args.tolerancia * 100:.0f}%:")
+            for linha in regressoes:
+                print(f"  {linha}")
+            sys.exit(1)
+        print(f"[BENCHMARK] Sem regressões em relação a {args.base}")
+    else:
+        print(f"[BENCHMARK] Sem base em {args.base}; rode com --salvar-base para criar")
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict
+from capital_api import CapitalAPI
+from latencia import Histograma
+from servidor_simulado import ServidorSimulado
+
+# Benchmark do caminho de execução contra o servidor_simulado.py (nada sai para a rede)
+EPICS = ['EURUSD', 'GBPUSD', 'USDJPY', 'EURJPY', 'GBPJPY', 'BTCUSD', 'ETHUSD']
+
+def criar_api(servidor: ServidorSimulado, pasta: str) -> CapitalAPI:
+    config = {'api_key': 'simulada', 'email': 'bench@local', 'password': 'simulada',
+              'base_url': servidor.base_url, 'stream_url': servidor.stream_url}
+    api = CapitalAPI(config=config)
+    api.sessao.arquivo = os.path.join(pasta, 'sessao.json')  # não toca no .capital_sessao.json real
+    return api
+
+def cronometrar(funcao, repeticoes: int) -> Histograma:
+    histograma = Histograma()
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        histograma.adicionar((time.perf_counter() - t0) * 1000)
+    return histograma
+
+def cenario_login(servidor, pasta, repeticoes) -> Dict:
+    api = criar_api(servidor, pasta)
+    # Respeita 1 POST /session por segundo (o agendador espera, e essa espera entra na conta)
+    resumo = cronometrar(api.criar_sessao, min(repeticoes, 3)).resumo()
+    return {'login': resumo}
+
+def cenario_contexto(servidor, pasta, repeticoes) -> Dict:
+    api = criar_api(servidor, pasta)
+    api.autenticar()
+    frio = Histograma()
+    for epic in EPICS[:min(repeticoes, len(EPICS))]:
+        api.metadados.invalidar('saldo')
+        t0 = time.perf_counter()
+        api.buscar_contexto_ordem(epic)
+        frio.adicionar((time.perf_counter() - t0) * 1000)
+    api.metadados.prefetch_regras(EPICS)
+    api.metadados.saldo()
+    api.cache_posicoes().aguardar_atualizacao(5)
+    quente = cronometrar(lambda: api.consultar_contexto_ordem('EURUSD'), repeticoes * 10)
+    api.cache_posicoes().parar()
+    return {'contexto_frio': frio.resumo(), 'contexto_quente': quente.resumo()}
+
+def cenario_rajada(servidor, pasta, repeticoes) -> Dict:
+    from ordens import DespachoOrdens
+    api = criar_api(servidor, pasta)
+    api.autenticar()
+    despacho = DespachoOrdens(api)
+    latencia = Histograma()
+    fila = Histograma()
+    t0 = time.perf_counter()
+    futuros = [despacho.enviar(EPICS[i % len(EPICS)], 'BUY' if i % 2 else 'SELL', 0.01) for i in range(repeticoes)]
+    for futuro in futuros:
+        resultado = futuro.result(timeout=60)
+        tempos = resultado['tempos']
+        latencia.adicionar((tempos['confirmacao_fim'] - tempos['fila_inicio']) * 1000)
+        fila.adicionar((tempos['envio_inicio'] - tempos['fila_inicio']) * 1000)
+    duracao = time.perf_counter() - t0
+    # Fecha o que abriu (prioridade de fechamento na mesma fila)
+    fechamentos = [despacho.fechar(f.result()['deal_id']) for f in futuros if f.result()['deal_id']]
+    for futuro in fechamentos:
+        futuro.result(timeout=60)
+    despacho.parar()
+    return {'ordem_ate_confirmacao': latencia.resumo(), 'ordem_na_fila': fila.resumo(),
+            'ordens_por_segundo': repeticoes / duracao}
+
+def cenario_monitores(servidor, pasta, repeticoes) -> Dict:
+    api = criar_api(servidor, pasta)
+    api.autenticar()
+    for epic in EPICS:
+        api.enviar_ordem(epic, 'BUY', 0.01)
+    cache = api.cache_posicoes()
+    cache.aguardar_atualizacao(5)
+    antes = servidor.corretora.contadores['requisicoes']
+    leituras = Histograma()
+    parar = threading.Event()
+
+    def monitor(epic):
+        while not parar.is_set():
+            t0 = time.perf_counter()
+            cache.por_epic(epic)
+            leituras.adicionar((time.perf_counter() - t0) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=monitor, args=(EPICS[i % len(EPICS)],), daemon=True) for i in range(repeticoes)]
+    for t in threads:
+        t.start()
+    time.sleep(3)
+    parar.set()
+    for t in threads:
+        t.join()
+    cache.parar()
+    for p in api.listar_posicoes_abertas():
+        api.fechar_posicao(p['dealId'])
+    return {'leitura_monitor': leituras.resumo(), 'monitores': repeticoes,
+            'requisicoes_em_3s': servidor.corretora.contadores['requisicoes'] - antes}
+
+def cenario_setup(servidor, pasta, repeticoes) -> Dict:
+    from setup import CapitalSetup
+    api = criar_api(servidor, pasta)
+    setup = CapitalSetup(api)
+    setup.iniciar()
+    api.metadados.prefetch_regras(EPICS)
+    confirmadas = {}
+    todas = threading.Event()
+    epics = EPICS[:min(repeticoes, len(EPICS))]
+
+    def ouvinte(evento):
+        if evento['tipo'] == 'confirmada':
+            confirmadas[evento['epic']] = time.perf_counter()
+            if len(confirmadas) == len(epics):
+                todas.set()
+
+    setup.rastreador.adicionar_ouvinte(ouvinte)
+    retorno = Histograma()
+    t0 = time.perf_counter()
+    for epic in epics:
+        t = time.perf_counter()
+        setup.entrar_operacao(epic, 'BUY', 0.0)
+        retorno.adicionar((time.perf_counter() - t) * 1000)
+    todas.wait(30)
+    confirmacao = Histograma()
+    for instante in confirmadas.values():
+        confirmacao.adicionar((instante - t0) * 1000)
+    setup.rastreador.parar()
+    for p in api.listar_posicoes_abertas():
+        api.fechar_posicao(p['dealId'])
+    setup.despacho.parar()
+    return {'entrar_operacao_retorno': retorno.resumo(), 'entrada_ate_confirmada': confirmacao.resumo()}
+
+def sinal_sintetico(par: str, direcao: str, close: float) -> Dict:
+    # Sinal no formato de analise.analisar_par, com stop/take a 0,5%/1% e tempos de busca/análise fictícios
+    agora = time.time()
+    lado = 1 if direcao == 'BUY' else -1
+    niveis = {'0.382': close * (1 - lado * 0.002), '0.618': close * (1 - lado * 0.004)}
+    fibo_ctx = {'swing_high': close * 1.01, 'swing_low': close * 0.99, 'tendencia': 'alta' if lado > 0 else 'baixa',
+                'direcao': 'alta' if lado > 0 else 'baixa', 'atr': close * 0.001, 'close': close,
+                'retracements': niveis, 'extensoes': {}, 'distancias': {n: abs(close - v) for n, v in niveis.items()}}
+    return {'par': par, 'direcao': direcao, 'close': close, 'stop': close * (1 - lado * 0.005),
+            'take': close * (1 + lado * 0.01), 'forca': 2.0, 'mensagem': f"Sinal sintético {direcao}",
+            'fibo_ctx': fibo_ctx, 'nivel_fibo': ('0.382', niveis['0.382']), 'padrao': None, 'padrao_confirmado': False,
+            'tempos': {'busca': (agora - 0.2, agora - 0.1), 'analise': (agora - 0.1, agora), 'ultima_barra': agora}}
+
+def cenario_sinal(servidor, pasta, repeticoes) -> Dict:
+    # Caminho do lucelo do sinal até a ordem confirmada: despachar_sinal + DespachoOrdens + rastreador
+    import lucelo
+    from latencia import RegistroLatencia
+    from setup import CapitalSetup
+    api = criar_api(servidor, pasta)
+    setup = CapitalSetup(api).iniciar()
+    api.metadados.prefetch_regras(EPICS)
+    latencias = RegistroLatencia(arquivo=None)
+    confirmadas = {}
+    todas = threading.Event()
+    epics = EPICS[:min(repeticoes, len(EPICS))]
+
+    def ouvinte(evento):
+        if evento['tipo'] in ('confirmada', 'rejeitada'):
+            confirmadas[evento['epic']] = time.perf_counter()
+            if len(confirmadas) == len(epics):
+                todas.set()
+
+    setup.rastreador.adicionar_ouvinte(lucelo.ao_evento_operacao)
+    setup.rastreador.adicionar_ouvinte(ouvinte)
+    retorno = Histograma()
+    inicios = {}
+    for i, epic in enumerate(epics):
+        bid, _ = servidor.corretora.mercado.cotacao(epic)
+        sinal = sinal_sintetico(epic, 'BUY' if i % 2 else 'SELL', bid)
+        inicios[epic] = time.perf_counter()
+        lucelo.despachar_sinal(sinal, setup, setup.rastreador, latencias)
+        retorno.adicionar((time.perf_counter() - inicios[epic]) * 1000)
+    todas.wait(30)
+    confirmacao = Histograma()
+    for epic, instante in confirmadas.items():
+        confirmacao.adicionar((instante - inicios[epic]) * 1000)
+    setup.rastreador.parar()
+    for p in api.listar_posicoes_abertas():
+        api.fechar_posicao(p['dealId'])
+    setup.despacho.parar()
+    etapas = latencias.resumo('*').get('*', {})
+    resultado = {'despachar_sinal_retorno': retorno.resumo(), 'sinal_ate_confirmada': confirmacao.resumo()}
+    for etapa in ('dimensionamento', 'fila_envio', 'envio', 'confirmacao'):
+        if f'ordem.{etapa}' in etapas:
+            resultado[f'rastro_{etapa}'] = etapas[f'ordem.{etapa}']
+    return resultado
+
+def cenario_streaming(servidor, pasta, repeticoes) -> Dict:
+    api = criar_api(servidor, pasta)
+    api.autenticar()
+    atraso = Histograma()
+    recebidas = []
+
+    def ao_receber_cotacao(cotacao):
+        recebidas.append(1)
+        atraso.adicionar(time.time() * 1000 - cotacao['timestamp'])
+
+    streaming = api.conectar_streaming(ao_receber_cotacao=ao_receber_cotacao)
+    streaming.assinar_cotacoes(EPICS)
+    streaming.iniciar()
+    streaming.aguardar_conexao(10)
+    time.sleep(max(1, repeticoes // 10))
+    streaming.parar()
+    return {'cotacao_atraso': atraso.resumo(), 'cotacoes_por_segundo': len(recebidas) / max(1, repeticoes // 10)}
+
+CENARIOS = {
+    'login': cenario_login,
+    'contexto': cenario_contexto,
+    'rajada': cenario_rajada,
+    'monitores': cenario_monitores,
+    'setup': cenario_setup,
+    'sinal': cenario_sinal,
+    'streaming': cenario_streaming
+}
+
+def imprimir(resultados: Dict):
+    for cenario, metricas in resultados.items():
+        print(f"[BENCHMARK] {cenario}:")
+        for nome, valor in metricas.items():
+            if isinstance(valor, dict):
+                print(f"  {nome:<26} n={valor['n']:<5} p50={valor['p50']:8.2f} ms  p95={valor['p95']:8.2f} ms  p99={valor['p99']:8.2f} ms")
+            else:
+                print(f"  {nome:<26} {valor:.2f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark do cliente Capital.com contra o servidor simulado')
+    parser.add_argument('cenarios', nargs='*', help=f"padrão: todos ({', '.join(CENARIOS)})")
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--latencia', type=float, default=40.0, help='latência média do servidor (ms)')
+    parser.add_argument('--jitter', type=float, default=10.0)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--json', help='grava os resultados neste arquivo')
+    args = parser.parse_args()
+    desconhecidos = set(args.cenarios) - set(CENARIOS)
+    if desconhecidos:
+        parser.error(f"cenário desconhecido: {', '.join(sorted(desconhecidos))}")
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for nome in args.cenarios or list(CENARIOS):
+            # Servidor novo por cenário: limites e contadores zerados
+            servidor = ServidorSimulado(latencia_ms=args.latencia, jitter_ms=args.jitter, semente=args.semente).iniciar()
+            try:
+                resultados[nome] = CENARIOS[nome](servidor, pasta, args.repeticoes)
+            finally:
+                servidor.parar()
+    imprimir(resultados)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(resultados, f, indent=2)
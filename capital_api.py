@@ -1,8 +1,22 @@
 import requests
 import json
 import os
+import threading
+import time
+import websocket
+from concurrent.futures import ThreadPoolExecutor
+from agendador import AgendadorRequisicoes, PRIORIDADE_MONITORAMENTO
+from sessao import GerenciadorSessao
+from metadados import CacheMetadados
+from metricas import medir
+from logs import obter_logger
 
 CONFIG_FILE = 'capital_config.json'
+BASE_URL = 'https://demo-api-capital.backend-capital.com'  # para conta demo
+STREAM_URL = 'wss://api-streaming-capital.backend-capital.com/connect'
+MAX_EPICS_STREAMING = 40  # limite documentado do WebSocket da Capital.com
+log = obter_logger('API')
+log_streaming = obter_logger('STREAMING')
 
 # Função para ler config segura
 def ler_config():
@@ -11,88 +25,262 @@ def ler_config():
     with open(CONFIG_FILE, 'r') as f:
         return json.load(f)
 
+# Extração dos campos de interesse das respostas
+def extrair_confirmacao(data):
+    status = data.get('status', 'UNKNOWN')
+    # Tentar extrair lucro/prejuízo e preço atual
+    profit = None
+    price = None
+    # Verifica se há deals ou affectedDeals
+    deals = data.get('affectedDeals') or data.get('deals')
+    if deals and isinstance(deals, list) and len(deals) > 0:
+        deal_info = deals[0]
+        profit = deal_info.get('profitAndLoss') or deal_info.get('profit')
+        price = deal_info.get('level') or deal_info.get('openLevel')
+    return {
+        'status': status,
+        'profit': profit,
+        'price': price,
+        'detalhes': data
+    }
+
+def resumir_posicao(pos):
+    # Suporte a ambos formatos: dict direto ou dict com 'position'
+    p = pos.get('position', pos)
+    # Pega o P&L em tempo real ('upl'), se não houver, tenta 'profitAndLoss'
+    pnl = p.get('upl')
+    if pnl is None:
+        pnl = p.get('profitAndLoss')
+    return {
+        'status': 'OPEN',
+        'profit': pnl,
+        'price': p.get('level'),
+        'detalhes': pos
+    }
+
+def extrair_posicao(data, deal_id=None, epic=None):
+    positions = data.get('positions', [])
+    for pos in positions:
+        p = pos.get('position', pos)
+        if (deal_id and p.get('dealId') == deal_id) or (epic and (p.get('epic') == epic or pos.get('epic') == epic)):
+            return resumir_posicao(pos)
+    return {'status': 'NOT_FOUND'}
+
+def indexar_posicoes(data):
+    """
+    Índices das posições abertas: dealId/dealReference -> resumo e epic -> [resumos].
+    """
+    por_deal = {}
+    por_epic = {}
+    for pos in data.get('positions', []):
+        p = pos.get('position', pos)
+        resumo = resumir_posicao(pos)
+        for chave in (p.get('dealId'), p.get('dealReference')):
+            if chave:
+                por_deal[chave] = resumo
+        epic = p.get('epic') or pos.get('epic') or pos.get('market', {}).get('epic')
+        if epic:
+            por_epic.setdefault(epic, []).append(resumo)
+    return por_deal, por_epic
+
+def extrair_lista_posicoes(data):
+    positions = data.get('positions', [])
+    resultado = []
+    for pos in positions:
+        # Alguns campos podem estar em subdicionários dependendo do formato
+        p = pos.get('position', pos)
+        m = pos.get('market', {})
+        resultado.append({
+            'dealId': p.get('dealId'),
+            'epic': p.get('epic') or m.get('epic'),
+            'direcao': p.get('direction'),
+            'preco_entrada': p.get('level'),
+            'preco_atual': m.get('bid') or m.get('offer'),
+            'lucro_prejuizo': p.get('upl') or p.get('profitAndLoss'),
+            'detalhes': pos
+        })
+    return resultado
+
+def tempo_retry_after(valor, tentativa):
+    # Retry-After em segundos quando vier; senão backoff exponencial a partir de 1 s
+    try:
+        return max(0.1, float(valor))
+    except (TypeError, ValueError):
+        return float(2 ** tentativa)
+
+def rotulo_endpoint(metodo, caminho):
+    # Nome da métrica sem ids nem query: 'GET /api/v1/positions', 'GET /api/v1/confirms'
+    partes = caminho.split('?')[0].split('/')[:4]
+    return f"capital_api.{metodo} {'/'.join(partes)}"
+
+def montar_ordem(epic, direction, size, order_type='MARKET', stop=None, limit=None):
+    data = {
+        "epic": epic,
+        "direction": direction,
+        "size": size,
+        "orderType": order_type,
+        "currencyCode": "USD"
+    }
+    if stop is not None:
+        data["stopLevel"] = stop
+    if limit is not None:
+        data["limitLevel"] = limit
+    return data
+
 # Classe de integração Capital.com
 class CapitalAPI:
-    def __init__(self):
-        config = ler_config()
+    def __init__(self, timeout=10, config=None):
+        config = config or ler_config()
         self.api_key = config['api_key']
         self.email = config['email']
         self.password = config['password']
-        self.base_url = 'https://demo-api-capital.backend-capital.com'  # para conta demo
+        # Endereços trocáveis (ex.: servidor_simulado.py) por variável de ambiente ou pela config
+        self.base_url = os.environ.get('CAPITAL_BASE_URL') or config.get('base_url') or BASE_URL
+        self.stream_url = os.environ.get('CAPITAL_STREAM_URL') or config.get('stream_url') or STREAM_URL
+        self.timeout = timeout  # segundos por requisição
+        # Sessão keep-alive com pool de conexões (várias threads podem usar a API)
         self.session = requests.Session()
+        adaptador = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=20)
+        self.session.mount('https://', adaptador)
+        self.session.mount('http://', adaptador)
         self.cst = None
         self.x_security_token = None
+        # Consultas independentes em paralelo (ex.: contexto da ordem), cada uma com sua conexão do pool
+        self._paralelo = ThreadPoolExecutor(max_workers=6)
+        self._cache_posicoes = None
+        # Regras dos epics e saldo com validade (leituras do caminho da ordem sem esperar a rede)
+        self.metadados = CacheMetadados(self)
+        self._lock_cache = threading.Lock()
+        # Fila com os limites de requisição da Capital.com (ordens na frente dos polls)
+        self.agendador = AgendadorRequisicoes(demo='demo' in self.base_url)
+        self.max_tentativas_429 = 3
+        # Tokens reaproveitados entre restarts, ping em ociosidade e novo login em 401
+        self.sessao = GerenciadorSessao(self)
 
-    def autenticar(self):
-        url = f'{self.base_url}/api/v1/session'
-        headers = {
-            'X-CAP-API-KEY': self.api_key,
-            'Content-Type': 'application/json'
-        }
+    def headers(self, autenticado=True, json_body=False):
+        """
+        Cabeçalhos de todas as chamadas: API key e, após autenticar, CST e X-SECURITY-TOKEN.
+        """
+        headers = {'X-CAP-API-KEY': self.api_key}
+        if autenticado:
+            # Token ausente não vai como None
+            if self.cst:
+                headers['CST'] = self.cst
+            if self.x_security_token:
+                headers['X-SECURITY-TOKEN'] = self.x_security_token
+        if json_body:
+            headers['Content-Type'] = 'application/json'
+        return headers
+
+    def _requisitar(self, metodo, caminho, autenticado=True, json_body=None, timeout=None, prioridade=None):
+        # Tempo visto por quem chamou: espera no agendador, renovação de sessão e novas tentativas
+        with medir(rotulo_endpoint(metodo, caminho)) as medicao:
+            resp = self._requisitar_com_retentativas(metodo, caminho, autenticado, json_body, timeout, prioridade)
+            medicao.erro = resp.status_code >= 400
+            return resp
+
+    def _requisitar_com_retentativas(self, metodo, caminho, autenticado, json_body, timeout, prioridade):
+        tentativas_429 = 0
+        reautenticou = False
+        while True:
+            if autenticado:
+                self.sessao.garantir()
+            cst_usado = self.cst
+            self.agendador.aguardar(metodo, caminho, prioridade)
+            resp = self.session.request(
+                metodo,
+                f'{self.base_url}{caminho}',
+                headers=self.headers(autenticado=autenticado, json_body=json_body is not None),
+                json=json_body,
+                timeout=timeout or self.timeout
+            )
+            if resp.status_code == 401 and autenticado and not reautenticou:
+                # Sessão expirada: renova (uma vez) e repete a mesma requisição
+                reautenticou = True
+                self.sessao.reautenticar(cst_usado)
+                continue
+            if resp.status_code == 429 and tentativas_429 < self.max_tentativas_429:
+                # Limite estourado mesmo assim (ex.: outra instância na mesma conta): segura a fila e tenta de novo
+                espera = tempo_retry_after(resp.headers.get('Retry-After'), tentativas_429)
+                log.warning(f"429 em {metodo} {caminho}, nova tentativa em {espera:.1f}s")
+                self.agendador.pausar(espera)
+                tentativas_429 += 1
+                continue
+            if autenticado and resp.status_code < 400:
+                self.sessao.registrar_uso()
+            return resp
+
+    def criar_sessao(self):
+        """
+        POST /session: sempre um login novo. Use autenticar() para reaproveitar a sessão.
+        """
         data = {
             'identifier': self.email,
             'password': self.password
         }
-        resp = self.session.post(url, headers=headers, json=data)
+        resp = self._requisitar('POST', '/api/v1/session', autenticado=False, json_body=data)
         if resp.status_code == 200:
             self.cst = resp.headers.get('CST')
             self.x_security_token = resp.headers.get('X-SECURITY-TOKEN')
-            print('Autenticado com sucesso na Capital.com!')
+            log.info('Autenticado com sucesso na Capital.com!')
         else:
             raise Exception(f'Erro ao autenticar: {resp.text}')
 
+    def autenticar(self):
+        """
+        Garante uma sessão válida: reaproveita tokens salvos se ainda valerem, senão faz login.
+        """
+        self.sessao.garantir()
+
     def saldo(self):
-        url = f'{self.base_url}/api/v1/accounts'
-        headers = {
-            'X-CAP-API-KEY': self.api_key,
-            'CST': self.cst,
-            'X-SECURITY-TOKEN': self.x_security_token
-        }
-        resp = self.session.get(url, headers=headers)
+        resp = self._requisitar('GET', '/api/v1/accounts')
         if resp.status_code == 200:
             data = resp.json()
             return data
         else:
             raise Exception(f'Erro ao consultar saldo: {resp.text}')
 
-    # Estrutura para envio de ordens (a implementar)
     def enviar_ordem(self, epic, direction, size, order_type='MARKET', stop=None, limit=None):
-        url = f"{self.base_url}/api/v1/positions"
-        headers = {
-            'X-CAP-API-KEY': self.api_key,
-            'CST': self.cst,
-            'X-SECURITY-TOKEN': self.x_security_token,
-            'Content-Type': 'application/json'
-        }
-        data = {
-            "epic": epic,
-            "direction": direction,
-            "size": size,
-            "orderType": order_type,
-            "currencyCode": "USD"
-        }
+        data = montar_ordem(epic, direction, size, order_type, stop, limit)
+        resp = self._requisitar('POST', '/api/v1/positions', json_body=data)
+        if resp.status_code in (200, 201):
+            return resp.json()
+        else:
+            log.error(f"Erro ao enviar ordem: {resp.status_code} - {resp.text}")
+            return None
+
+    def fechar_posicao(self, deal_id):
+        """
+        DELETE /positions/{dealId}: fecha a posição. Retorna a resposta (com dealReference) ou None.
+        """
+        resp = self._requisitar('DELETE', f'/api/v1/positions/{deal_id}')
+        if resp.status_code in (200, 201):
+            return resp.json()
+        else:
+            log.error(f"Erro ao fechar posição: {resp.status_code} - {resp.text}")
+            return None
+
+    def alterar_posicao(self, deal_id, stop=None, limit=None):
+        """
+        PUT /positions/{dealId}: altera stop e/ou take de uma posição aberta.
+        """
+        data = {}
         if stop is not None:
-            data["stopLevel"] = stop
+            data['stopLevel'] = stop
         if limit is not None:
-            data["limitLevel"] = limit
-        resp = self.session.post(url, headers=headers, json=data)
+            data['limitLevel'] = limit
+        resp = self._requisitar('PUT', f'/api/v1/positions/{deal_id}', json_body=data)
         if resp.status_code in (200, 201):
             return resp.json()
         else:
-            print(f"Erro ao enviar ordem: {resp.status_code} - {resp.text}")
+            log.error(f"Erro ao alterar posição: {resp.status_code} - {resp.text}")
             return None
 
     def consultar_regras_epic(self, epic):
         """
         Consulta as regras de negociação (minDealSize, etc) para um epic.
         """
-        url = f'{self.base_url}/api/v1/markets/{epic}'
-        headers = {
-            'X-CAP-API-KEY': self.api_key,
-            'CST': self.cst,
-            'X-SECURITY-TOKEN': self.x_security_token
-        }
-        resp = self.session.get(url, headers=headers)
+        resp = self._requisitar('GET', f'/api/v1/markets/{epic}')
         if resp.status_code == 200:
             data = resp.json()
             instrument = data.get('instrument', {})
@@ -100,65 +288,58 @@ class CapitalAPI:
         else:
             raise Exception(f'Erro ao consultar regras do epic: {resp.status_code} - {resp.text}')
 
+    def consultar_regras_epics(self, epics):
+        """
+        Regras de vários epics numa chamada só (máx. 50). Retorna {epic: instrument}.
+        """
+        resp = self._requisitar('GET', f"/api/v1/markets?epics={','.join(epics)}")
+        if resp.status_code != 200:
+            raise Exception(f'Erro ao consultar regras dos epics: {resp.status_code} - {resp.text}')
+        data = resp.json()
+        regras = {}
+        for mercado in data.get('marketDetails') or data.get('markets') or []:
+            instrument = mercado.get('instrument', mercado)
+            epic = instrument.get('epic') or mercado.get('epic')
+            if epic:
+                regras[epic] = instrument
+        return regras
+
     def consultar_ordem(self, deal_id):
         """
         Consulta o status de uma ordem pelo dealReference (deal_id).
         Retorna status, lucro/prejuízo atual e preço atual, se disponíveis.
         """
-        url = f"{self.base_url}/api/v1/confirms/{deal_id}"
-        headers = {
-            'X-CAP-API-KEY': self.api_key,
-            'CST': self.cst,
-            'X-SECURITY-TOKEN': self.x_security_token
-        }
-        resp = self.session.get(url, headers=headers)
+        resp = self._requisitar('GET', f'/api/v1/confirms/{deal_id}')
         if resp.status_code == 200:
-            data = resp.json()
-            status = data.get('status', 'UNKNOWN')
-            # Tentar extrair lucro/prejuízo e preço atual
-            profit = None
-            price = None
-            # Verifica se há deals ou affectedDeals
-            deals = data.get('affectedDeals') or data.get('deals')
-            if deals and isinstance(deals, list) and len(deals) > 0:
-                deal_info = deals[0]
-                profit = deal_info.get('profitAndLoss') or deal_info.get('profit')
-                price = deal_info.get('level') or deal_info.get('openLevel')
-            return {
-                'status': status,
-                'profit': profit,
-                'price': price,
-                'detalhes': data
-            }
+            return extrair_confirmacao(resp.json())
         else:
             return {'status': 'UNKNOWN', 'erro': resp.text}
 
+    def baixar_posicoes(self):
+        """
+        Resposta bruta de GET /positions (usada pelo cache de posições).
+        """
+        resp = self._requisitar('GET', '/api/v1/positions', prioridade=PRIORIDADE_MONITORAMENTO)
+        if resp.status_code == 200:
+            return resp.json()
+        raise Exception(f'Erro ao listar posições abertas: {resp.status_code} - {resp.text}')
+
+    def cache_posicoes(self):
+        """
+        Cache compartilhado das posições abertas (um único poller), criado e iniciado no primeiro uso.
+        Monitores devem ler daqui em vez de chamar consultar_posicao_aberta.
+        """
+        with self._lock_cache:
+            if self._cache_posicoes is None:
+                from posicoes import CachePosicoes
+                self._cache_posicoes = CachePosicoes(self)
+                self._cache_posicoes.iniciar()
+        return self._cache_posicoes
+
     def consultar_posicao_aberta(self, deal_id=None, epic=None):
-        url = f"{self.base_url}/api/v1/positions"
-        headers = {
-            'X-CAP-API-KEY': self.api_key,
-            'CST': self.cst,
-            'X-SECURITY-TOKEN': self.x_security_token
-        }
-        resp = self.session.get(url, headers=headers)
+        resp = self._requisitar('GET', '/api/v1/positions', prioridade=PRIORIDADE_MONITORAMENTO)
         if resp.status_code == 200:
-            data = resp.json()
-            positions = data.get('positions', [])
-            for pos in positions:
-                # Suporte a ambos formatos: dict direto ou dict com 'position'
-                p = pos.get('position', pos)
-                if (deal_id and p.get('dealId') == deal_id) or (epic and (p.get('epic') == epic or pos.get('epic') == epic)):
-                    # Pega o P&L em tempo real ('upl'), se não houver, tenta 'profitAndLoss'
-                    pnl = p.get('upl')
-                    if pnl is None:
-                        pnl = p.get('profitAndLoss')
-                    return {
-                        'status': 'OPEN',
-                        'profit': pnl,
-                        'price': p.get('level'),
-                        'detalhes': pos
-                    }
-            return {'status': 'NOT_FOUND'}
+            return extrair_posicao(resp.json(), deal_id=deal_id, epic=epic)
         else:
             return {'status': 'UNKNOWN', 'erro': resp.text}
 
@@ -166,34 +347,218 @@ class CapitalAPI:
         """
         Retorna uma lista de todas as posições abertas com P&L em tempo real, epic, direção, preço de entrada e preço atual.
         """
-        url = f"{self.base_url}/api/v1/positions"
-        headers = {
-            'X-CAP-API-KEY': self.api_key,
-            'CST': self.cst,
-            'X-SECURITY-TOKEN': self.x_security_token
-        }
-        resp = self.session.get(url, headers=headers)
+        resp = self._requisitar('GET', '/api/v1/positions', prioridade=PRIORIDADE_MONITORAMENTO)
         if resp.status_code == 200:
-            data = resp.json()
-            positions = data.get('positions', [])
-            resultado = []
-            for pos in positions:
-                # Alguns campos podem estar em subdicionários dependendo do formato
-                p = pos.get('position', pos)
-                m = pos.get('market', {})
-                resultado.append({
-                    'dealId': p.get('dealId'),
-                    'epic': p.get('epic') or m.get('epic'),
-                    'direcao': p.get('direction'),
-                    'preco_entrada': p.get('level'),
-                    'preco_atual': m.get('bid') or m.get('offer'),
-                    'lucro_prejuizo': p.get('upl') or p.get('profitAndLoss'),
-                    'detalhes': pos
-                })
-            return resultado
+            return extrair_lista_posicoes(resp.json())
         else:
             raise Exception(f'Erro ao listar posições abertas: {resp.status_code} - {resp.text}')
 
+    def buscar_contexto_ordem(self, epic):
+        """
+        Saldo, regras do epic e posições abertas direto da API, as três chamadas em paralelo.
+        """
+        saldo = self._paralelo.submit(self.saldo)
+        regras = self._paralelo.submit(self.consultar_regras_epic, epic)
+        posicoes = self._paralelo.submit(self.listar_posicoes_abertas)
+        return {'saldo': saldo.result(), 'regras': regras.result(), 'posicoes': posicoes.result()}
+
+    def consultar_contexto_ordem(self, epic):
+        """
+        Saldo, regras do epic e posições abertas para dimensionar uma ordem.
+        Retorna {'saldo': ..., 'regras': ..., 'posicoes': ...}. Com os caches aquecidos não
+        acessa a rede; senão busca tudo em paralelo (o tempo é o da chamada mais lenta).
+        """
+        saldo = self.metadados.saldo(bloquear=False)
+        regras = self.metadados.regras(epic, bloquear=False)
+        if saldo is not None and regras is not None:
+            return {'saldo': saldo, 'regras': regras, 'posicoes': self.cache_posicoes().listar()}
+        contexto = self.buscar_contexto_ordem(epic)
+        self.metadados.guardar('saldo', contexto['saldo'], self.metadados.ttl_saldo)
+        self.metadados.guardar(('regras', epic), contexto['regras'], self.metadados.ttl_regras)
+        return contexto
+
+    def conectar_streaming(self, ao_receber_cotacao=None, ao_receber_barra=None):
+        """
+        Cria o cliente WebSocket de cotações usando os tokens desta sessão.
+        Chame iniciar() no objeto retornado para abrir a conexão.
+        """
+        return CapitalStreaming(self, ao_receber_cotacao=ao_receber_cotacao, ao_receber_barra=ao_receber_barra)
+
+# Cliente WebSocket de cotações e barras OHLC (push) da Capital.com
+class CapitalStreaming:
+    def __init__(self, api, url=None, ping_segundos=300, ao_receber_cotacao=None, ao_receber_barra=None):
+        self.api = api
+        self.url = url or getattr(api, 'stream_url', STREAM_URL)
+        self.ping_segundos = ping_segundos  # sessão expira com 10 minutos sem ping
+        self.ao_receber_cotacao = ao_receber_cotacao
+        self.ao_receber_barra = ao_receber_barra
+        # Últimos valores recebidos, para quem prefere consultar em vez de callback
+        self.cotacoes = {}  # epic -> payload do 'quote'
+        self.barras = {}    # (epic, resolution) -> payload do 'ohlc.event'
+        self._epics_cotacao = set()
+        self._epics_ohlc = {}  # (resolution, tipo) -> set(epics)
+        self._lock = threading.Lock()
+        self._correlation = 0
+        self._ws = None
+        self._conectado = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._thread_ping = None
+
+    # --- Ciclo de vida ---
+    def iniciar(self):
+        self._stop_event.clear()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        if self._thread_ping is None or not self._thread_ping.is_alive():
+            self._thread_ping = threading.Thread(target=self._run_ping, daemon=True)
+            self._thread_ping.start()
+
+    def parar(self):
+        self._stop_event.set()
+        if self._ws is not None:
+            self._ws.close()
+
+    def aguardar_conexao(self, timeout=None):
+        return self._conectado.wait(timeout)
+
+    def _run(self):
+        # A sessão REST pode ainda estar abrindo em background: sem CST as assinaturas são recusadas
+        while not self.api.cst and not self._stop_event.wait(1):
+            pass
+        espera = 1
+        while not self._stop_event.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            inicio = time.time()
+            self._ws.run_forever()
+            self._conectado.clear()
+            if self._stop_event.is_set():
+                break
+            # Reconexão com backoff exponencial (reinicia se a conexão durou bastante)
+            if time.time() - inicio > 60:
+                espera = 1
+            log_streaming.warning(f'Conexão perdida, reconectando em {espera}s...')
+            self._stop_event.wait(espera)
+            espera = min(espera * 2, 60)
+
+    def _run_ping(self):
+        while not self._stop_event.wait(self.ping_segundos):
+            if self._conectado.is_set():
+                self._enviar('ping')
+
+    # --- Assinaturas ---
+    def epics_cotacao(self) -> set:
+        """
+        Epics com cotação assinada (cópia).
+        """
+        with self._lock:
+            return set(self._epics_cotacao)
+
+    def assinar_cotacoes(self, epics):
+        with self._lock:
+            novos = set(epics) - self._epics_cotacao
+            self._validar_limite(novos)
+            self._epics_cotacao |= novos
+        if novos and self._conectado.is_set():
+            self._enviar('marketData.subscribe', {'epics': sorted(novos)})
+
+    def cancelar_cotacoes(self, epics):
+        with self._lock:
+            removidos = set(epics) & self._epics_cotacao
+            self._epics_cotacao -= removidos
+        if removidos and self._conectado.is_set():
+            self._enviar('marketData.unsubscribe', {'epics': sorted(removidos)})
+
+    def assinar_barras(self, epics, resolution='MINUTE', tipo='classic'):
+        chave = (resolution, tipo)
+        with self._lock:
+            atuais = self._epics_ohlc.setdefault(chave, set())
+            novos = set(epics) - atuais
+            self._validar_limite(novos)
+            atuais |= novos
+        if novos and self._conectado.is_set():
+            self._enviar('OHLCMarketData.subscribe', {'epics': sorted(novos), 'resolutions': [resolution], 'type': tipo})
+
+    def cancelar_barras(self, epics, resolution='MINUTE', tipo='classic'):
+        chave = (resolution, tipo)
+        with self._lock:
+            atuais = self._epics_ohlc.get(chave, set())
+            removidos = set(epics) & atuais
+            atuais -= removidos
+        if removidos and self._conectado.is_set():
+            self._enviar('OHLCMarketData.unsubscribe', {'epics': sorted(removidos), 'resolutions': [resolution], 'types': [tipo]})
+
+    def _epics_assinados(self):
+        epics = set(self._epics_cotacao)
+        for conjunto in self._epics_ohlc.values():
+            epics |= conjunto
+        return epics
+
+    def _validar_limite(self, novos):
+        total = len(self._epics_assinados() | novos)
+        if total > MAX_EPICS_STREAMING:
+            raise Exception(f'Limite de {MAX_EPICS_STREAMING} epics no streaming excedido ({total})')
+
+    # --- Mensagens ---
+    def _enviar(self, destination, payload=None):
+        with self._lock:
+            self._correlation += 1
+            mensagem = {
+                'destination': destination,
+                'correlationId': str(self._correlation),
+                'cst': self.api.cst,
+                'securityToken': self.api.x_security_token
+            }
+        if payload is not None:
+            mensagem['payload'] = payload
+        try:
+            self._ws.send(json.dumps(mensagem))
+        except Exception as e:
+            log_streaming.error(f'Erro ao enviar {destination}: {e}')
+
+    def _on_open(self, ws):
+        self._conectado.set()
+        log_streaming.info('Conectado ao WebSocket da Capital.com!')
+        # Reassina tudo após (re)conexão
+        with self._lock:
+            epics_cotacao = sorted(self._epics_cotacao)
+            ohlc = [(chave, sorted(epics)) for chave, epics in self._epics_ohlc.items() if epics]
+        if epics_cotacao:
+            self._enviar('marketData.subscribe', {'epics': epics_cotacao})
+        for (resolution, tipo), epics in ohlc:
+            self._enviar('OHLCMarketData.subscribe', {'epics': epics, 'resolutions': [resolution], 'type': tipo})
+
+    def _on_message(self, ws, mensagem):
+        try:
+            data = json.loads(mensagem)
+        except ValueError:
+            return
+        destination = data.get('destination')
+        payload = data.get('payload') or {}
+        if destination == 'quote':
+            self.cotacoes[payload.get('epic')] = payload
+            if self.ao_receber_cotacao:
+                self.ao_receber_cotacao(payload)
+        elif destination == 'ohlc.event':
+            self.barras[(payload.get('epic'), payload.get('resolution'))] = payload
+            if self.ao_receber_barra:
+                self.ao_receber_barra(payload)
+        elif data.get('status') not in (None, 'OK'):
+            log_streaming.warning(f'Resposta com erro em {destination}: {data}')
+
+    def _on_error(self, ws, erro):
+        log_streaming.error(f'Erro no WebSocket: {erro}')
+
+    def _on_close(self, ws, status, mensagem):
+        self._conectado.clear()
+
 if __name__ == '__main__':
     api = CapitalAPI()
     api.autenticar()
@@ -0,0 +1,298 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from tvDatafeed import TvDatafeed, Interval
+from barras import CacheBarras
+from reamostragem import Reamostrador, Sessao, derivavel
+from pares import SESSAO_PADRAO, SESSOES, SYMBOL_TO_EPIC
+from logs import obter_logger
+
+log = obter_logger('CENTRAL')
+BASE = Interval.in_1_minute  # única série baixada continuamente por par
+BARRAS_BASE = 1500  # M1 mantidas por par: cobrem a barra D1 em formação inteira (1440)
+EPIC_TO_SYMBOL = {epic: simbolo for simbolo, epic in SYMBOL_TO_EPIC.items()}
+IDADE_BASE = 5.0  # M1 buscadas há menos que isso servem (ex.: M15 e H4 do mesmo ciclo)
+
+# Assinatura de um consumidor: fila própria + par fixo ou função que devolve o par ativo
+class Assinatura:
+    def __init__(self, central, intervalo, n_bars: int, periodo: float, par: Optional[str] = None,
+                 seguir_par: Optional[Callable[[], str]] = None, tamanho_fila: int = 100,
+                 fila: Optional[queue.Queue] = None):
+        self.central = central
+        self.intervalo = intervalo
+        self.n_bars = n_bars
+        self.periodo = periodo  # segundos entre atualizações desejadas
+        self.par_fixo = par
+        self.seguir_par = seguir_par
+        # Fila compartilhada: um consumidor de vários pares lê tudo num lugar só (evento traz 'par')
+        self.fila = fila if fila is not None else queue.Queue(maxsize=tamanho_fila)
+
+    def par(self) -> str:
+        return self.seguir_par() if self.seguir_par else self.par_fixo
+
+    def publicar(self, evento: Dict):
+        # Consumidor lento: descarta o evento mais antigo, o mais recente é o que importa
+        while True:
+            try:
+                self.fila.put_nowait(evento)
+                return
+            except queue.Full:
+                try:
+                    self.fila.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def proximo(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        try:
+            return self.fila.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def cancelar(self):
+        self.central.cancelar(self)
+
+# Central única de dados de mercado: dona das conexões, distribui eventos por filas
+class CentralDados:
+    """
+    Uma única thread busca cada (par, intervalo) uma vez por período, mesmo que vários
+    consumidores assinem o mesmo par, e publica eventos 'barra' e 'cotacao' nas filas
+    de quem assinou. Assinaturas com seguir_par acompanham a troca de par ativo.
+    conexoes > 1 abre um pool de TvDatafeed para buscas de pares diferentes em paralelo.
+    arquivo (ArquivoBarras) dá partida a quente do disco e grava as barras fechadas.
+    Com reamostrar, M5/M15/H1/H4/D1 são baixados uma vez e daí em diante montados das M1
+    (reamostragem.py): uma busca de M1 por par atende todos os tempos gráficos.
+    """
+    def __init__(self, tv=None, exchange: str = 'FX', streaming=None, tick: float = 0.5, conexoes: int = 1, arquivo=None,
+                 reamostrar: bool = True):
+        self.tv = tv
+        self.cache = CacheBarras(tv, exchange=exchange, arquivo=arquivo, capacidade=BARRAS_BASE)
+        self.reamostrar = reamostrar
+        self._reamostradores = {}  # par -> Reamostrador
+        self.streaming = streaming  # CapitalStreaming opcional para cotações em push
+        self.tick = tick
+        # Pool criado sob demanda: nenhuma conexão é aberta antes da primeira busca
+        self.max_conexoes = max(1, conexoes)
+        self._conexoes = queue.Queue()
+        self._criadas = 0
+        if tv is not None:
+            self._conexoes.put(tv)
+            self._criadas = 1
+        self._assinaturas = []
+        self._ultima_busca = {}   # (par, intervalo) -> timestamp da última atualização
+        self._lock = threading.RLock()  # protege assinaturas e o dicionário de locks
+        self._locks_series = {}   # (par, intervalo) -> Lock: uma busca por série por vez
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        if self.streaming is not None:
+            self.streaming.ao_receber_cotacao = self._ao_receber_cotacao
+
+    def iniciar(self):
+        self._stop_event.clear()
+        if not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        if self.streaming is not None:
+            self.streaming.iniciar()
+
+    def parar(self):
+        self._stop_event.set()
+        if self.streaming is not None:
+            self.streaming.parar()
+
+    def assinar(self, intervalo, n_bars: int = 2, periodo: float = 1.0, par: Optional[str] = None,
+                seguir_par: Optional[Callable[[], str]] = None, fila: Optional[queue.Queue] = None) -> Assinatura:
+        assinatura = Assinatura(self, intervalo, n_bars, periodo, par=par, seguir_par=seguir_par, fila=fila)
+        with self._lock:
+            self._assinaturas.append(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura):
+        with self._lock:
+            if assinatura in self._assinaturas:
+                self._assinaturas.remove(assinatura)
+
+    @contextmanager
+    def _conexao(self):
+        # Cada TvDatafeed atende uma busca por vez
+        try:
+            tv = self._conexoes.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                criar = self._criadas < self.max_conexoes
+                if criar:
+                    self._criadas += 1
+            tv = TvDatafeed() if criar else self._conexoes.get()
+        try:
+            yield tv
+        finally:
+            self._conexoes.put(tv)
+
+    def _lock_serie(self, par: str, intervalo) -> threading.Lock:
+        with self._lock:
+            return self._locks_series.setdefault((par, intervalo), threading.Lock())
+
+    def _atualizar(self, par: str, intervalo, n_bars: int) -> int:
+        with self._conexao() as tv:
+            alteradas = self.cache.atualizar(par, intervalo, n_bars, tv=tv)
+        self._ultima_busca[(par, intervalo)] = time.time()
+        return alteradas
+
+    def _reamostrador(self, par: str) -> Reamostrador:
+        with self._lock:
+            reamostrador = self._reamostradores.get(par)
+            if reamostrador is None:
+                fuso, abertura = SESSOES.get(par, SESSAO_PADRAO)
+                reamostrador = self._reamostradores[par] = Reamostrador(Sessao(fuso, abertura))
+            return reamostrador
+
+    def _reamostravel(self, intervalo) -> bool:
+        return self.reamostrar and intervalo != BASE and derivavel(intervalo)
+
+    def _atualizar_base(self, par: str, reamostrador: Reamostrador):
+        # Uma busca incremental de M1 e a reamostragem de todos os tempos gráficos do par
+        with self._lock_serie(par, BASE):
+            decorrido = time.time() - self._ultima_busca.get((par, BASE), 0)
+            if self._ultima_busca.get((par, BASE)) and decorrido > BARRAS_BASE * 60:
+                # Parado mais tempo do que a busca incremental cobre: as M1 teriam lacuna
+                reamostrador.descartar()
+                return
+            if decorrido >= IDADE_BASE:
+                self._atualizar(par, BASE, BARRAS_BASE)
+            alteradas = reamostrador.sincronizar(self.cache.serie(par, BASE))
+        for intervalo, quantidade in alteradas.items():
+            if quantidade:
+                self.cache.gravar(par, intervalo)
+
+    def _semear(self, par: str, intervalo):
+        # Série recém-baixada da rede: tenta passar a montá-la a partir das M1
+        with self._lock_serie(par, BASE):
+            if time.time() - self._ultima_busca.get((par, BASE), 0) >= IDADE_BASE:
+                self._atualizar(par, BASE, BARRAS_BASE)
+            base = self.cache.serie(par, BASE)
+            if self._reamostrador(par).registrar(intervalo, self.cache.serie(par, intervalo), base):
+                return
+        log.info(f"{par} {getattr(intervalo, 'value', intervalo)}: barras fora do alinhamento da sessão ou M1 insuficientes; seguindo pela rede",
+                 extra={'chave_limite': ('semear', par, str(intervalo)), 'intervalo': 3600})
+
+    def _atualizar_serie(self, par: str, intervalo, n_bars: int) -> int:
+        """
+        Atualiza uma série (com o lock dela): tempos gráficos já semeados vêm das M1; a primeira
+        vez, e o que não dá para derivar, vem da rede. Retorna quantas barras mudaram.
+        """
+        if not self._reamostravel(intervalo):
+            # A base é baixada com folga para cobrir a barra em formação dos tempos gráficos maiores
+            return self._atualizar(par, intervalo, max(n_bars, BARRAS_BASE) if intervalo == BASE and self.reamostrar else n_bars)
+        reamostrador = self._reamostrador(par)
+        if reamostrador.registrado(intervalo):
+            self._atualizar_base(par, reamostrador)
+            if reamostrador.registrado(intervalo):
+                self._ultima_busca[(par, intervalo)] = time.time()
+                return reamostrador.alteradas(intervalo)
+        alteradas = self._atualizar(par, intervalo, n_bars)
+        self._semear(par, intervalo)
+        reamostrador.alteradas(intervalo)  # já contadas na busca
+        return alteradas
+
+    def obter(self, par: str, intervalo, n_bars: int, atualizar: bool = True):
+        """
+        Acesso síncrono (ex.: loop principal do lucelo). Retorna view do cache:
+        use no mesmo ciclo, sem guardar referência.
+        atualizar=False não acessa a rede: só o que já está no cache ou no arquivo local.
+        """
+        with self._lock_serie(par, intervalo):
+            if atualizar:
+                self._atualizar_serie(par, intervalo, n_bars)
+            else:
+                self.cache.carregar_do_arquivo(par, intervalo, n_bars)
+            serie = self.cache.serie(par, intervalo, capacidade=n_bars)
+            if len(serie) == 0:
+                return None
+            return serie.dataframe(n_bars)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._lock:
+                assinaturas = list(self._assinaturas)
+            # Agrupa assinantes por (par, intervalo): uma busca atende todos
+            grupos = {}
+            for assinatura in assinaturas:
+                try:
+                    par = assinatura.par()
+                except Exception:
+                    continue
+                grupos.setdefault((par, assinatura.intervalo), []).append(assinatura)
+            agora = time.time()
+            for (par, intervalo), membros in grupos.items():
+                periodo = min(a.periodo for a in membros)
+                if agora - self._ultima_busca.get((par, intervalo), 0) < periodo:
+                    continue
+                n_bars = max(a.n_bars for a in membros)
+                try:
+                    with self._lock_serie(par, intervalo):
+                        alteradas = self._atualizar_serie(par, intervalo, n_bars)
+                        serie = self.cache.serie(par, intervalo)
+                        if alteradas == 0 or len(serie) == 0:
+                            continue
+                        # Cópia pequena: o evento atravessa threads e o buffer continua mudando
+                        df = serie.dataframe(n_bars).copy()
+                except Exception as e:
+                    for assinatura in membros:
+                        assinatura.publicar({'tipo': 'erro', 'par': par, 'intervalo': intervalo, 'erro': str(e)})
+                    continue
+                ao_vivo = self.cotacoes_ao_vivo(par)
+                for assinatura in membros:
+                    assinatura.publicar({
+                        'tipo': 'barra',
+                        'par': par,
+                        'intervalo': intervalo,
+                        'df': df.tail(assinatura.n_bars),
+                        'timestamp': agora,
+                        'cotacoes_ao_vivo': ao_vivo
+                    })
+            try:
+                self._sincronizar_streaming(grupos)
+            except Exception as e:
+                # Ex.: limite de epics do WebSocket; as barras continuam chegando pelo polling
+                log.warning(f"Falha ao sincronizar as assinaturas do streaming: {e}",
+                            extra={'chave_limite': ('streaming', str(e)), 'intervalo': 300})
+            self._stop_event.wait(self.tick)
+
+    def cotacoes_ao_vivo(self, par: str) -> bool:
+        """
+        True se as cotações do par estão chegando pelo streaming (conectado e com o epic assinado).
+        """
+        if self.streaming is None or not self.streaming.aguardar_conexao(0):
+            return False
+        return SYMBOL_TO_EPIC.get(par, par) in self.streaming.epics_cotacao()
+
+    def _sincronizar_streaming(self, grupos):
+        if self.streaming is None:
+            return
+        # Símbolos do TradingView -> epics da Capital.com
+        epics = {SYMBOL_TO_EPIC.get(par, par) for par, _ in grupos}
+        atuais = self.streaming.epics_cotacao()
+        if atuais - epics:
+            self.streaming.cancelar_cotacoes(atuais - epics)
+        if epics - atuais:
+            self.streaming.assinar_cotacoes(epics - atuais)
+
+    def _ao_receber_cotacao(self, payload):
+        epic = payload.get('epic')
+        par = EPIC_TO_SYMBOL.get(epic, epic)
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            try:
+                if assinatura.par() != par:
+                    continue
+            except Exception:
+                continue
+            assinatura.publicar({
+                'tipo': 'cotacao',
+                'par': par,
+                'bid': payload.get('bid'),
+                'ofr': payload.get('ofr'),
+                'timestamp': payload.get('timestamp')
+            })
@@ -1,7 +1,10 @@
-import time
-from tvDatafeed import TvDatafeed, Interval
+from tvDatafeed import Interval
 import pandas as pd
-from typing import Optional
+from typing import Callable, Optional
+from central import CentralDados
+from logs import obter_logger
+
+log = obter_logger('CHAPELEIRO')
 
 # Função para exibir com cor no terminal
 def colorir(texto, cor):
@@ -13,25 +16,87 @@ def colorir(texto, cor):
     }
     return f"{cores.get(cor, '')}{texto}{cores['reset']}"
 
-def analisar_pressao(par: str, timeframe: Interval = Interval.in_1_minute, n_bars: int = 30, delay: int = 5):
+# Soma dos movimentos de preço de um par (positiva: pressão compradora; negativa: vendedora)
+class Pressao:
+    """
+    Uma fonte de preço por vez ('cotacao' do streaming ou 'barra' do TradingView): o bid e o
+    close das barras têm uma diferença entre si que, alternando, viraria pressão falsa. Trocar
+    de fonte recomeça a referência sem somar nada.
+    """
+    def __init__(self):
+        self.ultimo_preco: Optional[float] = None
+        self.fonte: Optional[str] = None
+        self.soma = 0.0
+
+    def reiniciar(self):
+        self.ultimo_preco = None
+        self.fonte = None
+        self.soma = 0.0
+
+    def atualizar(self, preco: Optional[float], anterior: Optional[float] = None, fonte: Optional[str] = None) -> Optional[float]:
+        """
+        Soma a variação desde o último preço e a retorna. `anterior` serve de referência na
+        primeira atualização (ex.: close da barra anterior); sem referência retorna None.
+        """
+        if fonte != self.fonte:
+            self.fonte = fonte
+            self.ultimo_preco = None
+        if self.ultimo_preco is None:
+            self.ultimo_preco = anterior
+        if preco is None or self.ultimo_preco is None:
+            self.ultimo_preco = preco
+            return None
+        variacao = preco - self.ultimo_preco
+        self.ultimo_preco = preco
+        self.soma += variacao
+        return variacao
+
+def analisar_pressao(par: str, timeframe: Interval = Interval.in_1_minute, n_bars: int = 30, delay: int = 5,
+                     central: Optional[CentralDados] = None, seguir_par: Optional[Callable[[], str]] = None):
     """
     Monitora o preço em tempo real, mostra variação, soma dos movimentos e pressão compradora/vendedora.
+    Consome os eventos da central de dados; com seguir_par acompanha a troca de par ativo.
     """
-    tv = TvDatafeed()
-    ultimo_preco: Optional[float] = None
-    soma_movimentos = 0.0
-    print(f"Chapeleiro monitorando {par} em tempo real! (aperte Ctrl+C para parar)")
+    if central is None:
+        central = CentralDados()
+        central.iniciar()
+    assinatura = central.assinar(timeframe, n_bars=n_bars, periodo=delay, par=par, seguir_par=seguir_par)
+    par_monitorado = None
+    pressao = Pressao()
+    log.info(f"Chapeleiro monitorando {assinatura.par()} em tempo real! (aperte Ctrl+C para parar)")
     while True:
+        evento = assinatura.proximo(timeout=delay * 6)
+        if evento is None:
+            log.info("Sem dados suficientes, tentando novamente...")
+            continue
+        if evento['tipo'] == 'erro':
+            log.warning(f"Erro no Chapeleiro: {evento['erro']}")
+            continue
         try:
-            df = tv.get_hist(symbol=par, exchange='FX', interval=timeframe, n_bars=n_bars)
-            if df is None or len(df) < 2:
-                print("Sem dados suficientes, tentando novamente...")
-                time.sleep(delay)
+            if evento['par'] != par_monitorado:
+                # Par ativo mudou: a soma de pressão recomeça
+                par_monitorado = evento['par']
+                pressao.reiniciar()
+                log.info(f"Chapeleiro monitorando {par_monitorado} em tempo real!")
+            anterior = None
+            if evento['tipo'] == 'cotacao':
+                preco_atual = evento['bid']
+                hora = pd.Timestamp(evento['timestamp'], unit='ms').strftime('%H:%M UTC')
+            elif evento.get('cotacoes_ao_vivo'):
+                # Com o streaming conectado a pressão vem só das cotações
+                continue
+            else:
+                df = evento['df']
+                if len(df) < 2:
+                    log.info("Sem dados suficientes, tentando novamente...")
+                    continue
+                preco_atual = df['close'].iloc[-1]
+                anterior = df['close'].iloc[-2]
+                hora = df.index[-1].strftime('%H:%M UTC-3')
+            variacao = pressao.atualizar(preco_atual, anterior, fonte=evento['tipo'])
+            if variacao is None:
                 continue
-            preco_atual = df['close'].iloc[-1]
-            preco_anterior = df['close'].iloc[-2]
-            variacao = preco_atual - preco_anterior
-            soma_movimentos += variacao
+            soma_movimentos = pressao.soma
             cor = 'amarelo'
             if variacao > 0:
                 cor = 'verde'
@@ -39,10 +104,7 @@ def analisar_pressao(par: str, timeframe: Interval = Interval.in_1_minute, n_bar
                 cor = 'vermelho'
             direcao = '⬆️' if variacao > 0 else ('⬇️' if variacao < 0 else '➡️')
             texto = f"{preco_atual:,.5f} USD {direcao} ({variacao:+.5f}) | Soma: {soma_movimentos:+.2f}"
-            print(colorir(texto, cor))
-            # Exibir horário do candle
-            hora = df.index[-1].strftime('%H:%M UTC-3')
-            print(f"Mercado {'aberto' if df.index[-1] else 'fechado'} horário {hora}")
+            # Preço e horário do candle numa linha só: uma entrada na fila por atualização
+            log.info(f"{colorir(texto, cor)} | Mercado aberto horário {hora}")
         except Exception as e:
-            print(f"Erro no Chapeleiro: {e}")
-        time.sleep(delay) 
\ No newline at end of file
+            log.warning(f"Erro no Chapeleiro: {e}")
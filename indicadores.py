@@ -0,0 +1,93 @@
+import math
+from collections import deque
+
+# Indicadores em streaming: uma barra por vez, O(1) por atualização.
+# Convenção: atualizar() recebe barras fechadas; valor(...) pode receber a barra em
+# formação para consulta, sem alterar o estado.
+
+# Máximo das últimas `janela` entradas com deque monotônico: O(1) amortizado
+class MaximoMovel:
+    maximo = True
+
+    def __init__(self, janela: int):
+        self.janela = janela
+        self._deque = deque()  # (indice, valor), valores monotônicos
+        self._indice = -1
+
+    def atualizar(self, valor: float):
+        self._indice += 1
+        if self.janela <= 0:
+            return
+        if self.maximo:
+            while self._deque and self._deque[-1][1] <= valor:
+                self._deque.pop()
+        else:
+            while self._deque and self._deque[-1][1] >= valor:
+                self._deque.pop()
+        self._deque.append((self._indice, valor))
+        while self._deque[0][0] <= self._indice - self.janela:
+            self._deque.popleft()
+
+    def valor(self, parcial: float = None) -> float:
+        """
+        Extremo da janela; com `parcial`, inclui também esse valor (barra em formação).
+        """
+        if not self._deque:
+            extremo = -math.inf if self.maximo else math.inf
+        else:
+            extremo = self._deque[0][1]
+        if parcial is None:
+            return extremo
+        return max(extremo, parcial) if self.maximo else min(extremo, parcial)
+
+# Mínimo das últimas `janela` entradas
+class MinimoMovel(MaximoMovel):
+    maximo = False
+
+# Média móvel exponencial equivalente a Series.ewm(span, min_periods).mean() (adjust=True)
+class EMA:
+    """
+    Com `janela`, equivale ao ewm sobre só as últimas `janela` barras (o DataFrame que a
+    análise recebe): a barra consultada em valor(parcial) ocupa a última posição e o termo
+    que sai da janela é descontado da soma ponderada (mesma conta de backtest.ema_em_janela).
+    """
+    def __init__(self, span: int, min_periods: int = 0, janela: int = None):
+        self.span = span
+        self.min_periods = min_periods
+        self.janela = janela
+        self.beta = 1 - 2 / (span + 1)
+        self._num = 0.0
+        self._den = 0.0
+        self._contagem = 0
+        self._valores = deque() if janela else None  # janela - 1 barras fechadas
+        self._peso_saida = self.beta ** (janela - 1) if janela else 0.0
+
+    def atualizar(self, valor: float):
+        # NaN só decai os pesos, como o ewm do pandas com ignore_na=False
+        self._num *= self.beta
+        self._den *= self.beta
+        if valor == valor:
+            self._num += valor
+            self._den += 1.0
+            self._contagem += 1
+        if self._valores is not None:
+            self._valores.append(valor)
+            if len(self._valores) >= self.janela:
+                saiu = self._valores.popleft()
+                if saiu == saiu:
+                    self._num -= self._peso_saida * saiu
+                    self._den -= self._peso_saida
+                    self._contagem -= 1
+
+    def valor(self, parcial: float = None) -> float:
+        num, den, contagem = self._num, self._den, self._contagem
+        if parcial is not None:
+            num *= self.beta
+            den *= self.beta
+            if parcial == parcial:
+                num += parcial
+                den += 1.0
+                contagem += 1
+        if contagem == 0 or contagem < self.min_periods:
+            return math.nan
+        return num / den
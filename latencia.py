@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+from logs import obter_logger, gravar_linha
+
+log = obter_logger('LATÊNCIA')
+
+# Histograma de latências (ms) com as últimas `max_amostras` amostras
+class Histograma:
+    def __init__(self, max_amostras: int = 10000):
+        self._amostras = deque(maxlen=max_amostras)
+
+    def adicionar(self, valor: float):
+        self._amostras.append(valor)
+
+    def __len__(self):
+        return len(self._amostras)
+
+    def percentil(self, p: float) -> float:
+        # Nearest-rank: o menor valor com pelo menos p% das amostras abaixo ou iguais
+        amostras = sorted(self._amostras)
+        if not amostras:
+            return float('nan')
+        indice = max(0, min(len(amostras) - 1, int(-(-p * len(amostras) // 100)) - 1))
+        return amostras[indice]
+
+    def resumo(self) -> Dict:
+        return {
+            'n': len(self._amostras),
+            'p50': self.percentil(50),
+            'p95': self.percentil(95),
+            'p99': self.percentil(99),
+            'max': max(self._amostras) if self._amostras else float('nan')
+        }
+
+# Rastro de um sinal (ou da análise de um par): etapas com instante de início e duração
+class Rastro:
+    def __init__(self, registro, par: str, tipo: str = 'ciclo'):
+        self.registro = registro
+        self.id = uuid.uuid4().hex[:12]
+        self.par = par
+        self.tipo = tipo
+        self.inicio = time.time()
+        self.etapas = []  # {'etapa', 'inicio' (epoch s), 'duracao_ms'}
+        self.concluido = False
+
+    @contextmanager
+    def etapa(self, nome: str):
+        inicio = time.time()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas.append({'etapa': nome, 'inicio': inicio, 'duracao_ms': (time.perf_counter() - t0) * 1000})
+
+    def adicionar(self, nome: str, inicio: float, fim: float):
+        """
+        Etapa medida em outro lugar (outra thread ou processo), com instantes epoch em segundos.
+        """
+        self.etapas.append({'etapa': nome, 'inicio': inicio, 'duracao_ms': (fim - inicio) * 1000})
+
+    def concluir(self, **extras):
+        if not self.concluido:
+            self.concluido = True
+            self.registro.registrar(self, extras)
+
+# Registro central: histogramas por (par, etapa) e exportação JSON lines
+class RegistroLatencia:
+    """
+    Cada rastro concluído alimenta os histogramas do par e do agregado '*' e vira uma linha
+    JSON em `arquivo` (None desliga a exportação). 'total' vai do início do rastro ao fim
+    da última etapa.
+    """
+    def __init__(self, arquivo: Optional[str] = 'latencia.jsonl', max_amostras: int = 10000):
+        self.arquivo = arquivo
+        self.max_amostras = max_amostras
+        self._histogramas = {}  # (par, etapa) -> Histograma
+        self._lock = threading.Lock()
+
+    def rastro(self, par: str, tipo: str = 'ciclo') -> Rastro:
+        return Rastro(self, par, tipo)
+
+    def _histograma(self, par: str, etapa: str) -> Histograma:
+        chave = (par, etapa)
+        if chave not in self._histogramas:
+            self._histogramas[chave] = Histograma(self.max_amostras)
+        return self._histogramas[chave]
+
+    def registrar(self, rastro: Rastro, extras: Optional[Dict] = None):
+        fim = max((e['inicio'] + e['duracao_ms'] / 1000 for e in rastro.etapas), default=rastro.inicio)
+        total_ms = (fim - rastro.inicio) * 1000
+        linha = {
+            'id': rastro.id,
+            'tipo': rastro.tipo,
+            'par': rastro.par,
+            'inicio': rastro.inicio,
+            'etapas': rastro.etapas,
+            'total_ms': total_ms
+        }
+        linha.update(extras or {})
+        with self._lock:
+            for par in (rastro.par, '*'):
+                for etapa in rastro.etapas:
+                    self._histograma(par, f"{rastro.tipo}.{etapa['etapa']}").adicionar(etapa['duracao_ms'])
+                self._histograma(par, f'{rastro.tipo}.total').adicionar(total_ms)
+        if self.arquivo:
+            # A escrita fica com a thread dos logs: análise e envio de ordens não esperam o disco
+            gravar_linha(self.arquivo, json.dumps(linha, default=str))
+
+    def resumo(self, par: Optional[str] = None) -> Dict:
+        """
+        {par: {etapa: {'n', 'p50', 'p95', 'p99', 'max'}}} em ms; `par` filtra um só.
+        """
+        resultado = {}
+        with self._lock:  # o histograma não pode mudar enquanto é ordenado
+            for (p, etapa), histograma in sorted(self._histogramas.items()):
+                if par is None or p == par:
+                    resultado.setdefault(p, {})[etapa] = histograma.resumo()
+        return resultado
+
+    def imprimir_resumo(self, par: str = '*'):
+        # Um registro só por par (uma entrada na fila de logs)
+        for p, etapas in self.resumo(par).items():
+            linhas = [f"{p}:"]
+            for etapa, r in etapas.items():
+                linhas.append(f"  {etapa:<28} n={r['n']:<5} p50={r['p50']:8.1f} ms  p95={r['p95']:8.1f} ms  p99={r['p99']:8.1f} ms")
+            log.info('\n'.join(linhas), extra={'dados': etapas})
@@ -0,0 +1,229 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Logs sem bloquear: quem loga só enfileira; uma thread formata e escreve (console e JSON lines)
+RAIZ = 'lucelo'
+NIVEL_PADRAO = 'INFO'
+MAX_FILA = 10000  # fila cheia (stdout travado): descarta e conta, nunca bloqueia o chamador
+INTERVALO_REPETICAO = 5.0  # mesma mensagem repetida dentro disso é suprimida
+ARQUIVOS = 'arquivos'  # logger das linhas cruas de gravar_linha() (ex.: latencia.jsonl)
+
+# Supressão de mensagens repetitivas, na thread de quem loga (antes de enfileirar)
+class FiltroRepeticao(logging.Filter):
+    """
+    Mesmo (logger, nível, texto) dentro de `intervalo` segundos é descartado; a próxima que
+    passar leva '(+N repetidas)'. Mensagens que mudam a cada chamada (P&L, preço) podem
+    agrupar por uma chave própria: log.info(..., extra={'chave_limite': ('pnl', epic), 'intervalo': 30}).
+    """
+    def __init__(self, intervalo: float = INTERVALO_REPETICAO):
+        super().__init__()
+        self.intervalo = intervalo
+        self._ultimas = {}  # chave -> [instante da última emitida, suprimidas desde então]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if hasattr(record, 'arquivo'):
+            return True  # linhas de arquivo (gravar_linha) nunca são suprimidas
+        chave = getattr(record, 'chave_limite', None)
+        chave = (record.name, record.levelno, chave if chave is not None else record.getMessage())
+        intervalo = getattr(record, 'intervalo', self.intervalo)
+        agora = time.monotonic()
+        with self._lock:
+            estado = self._ultimas.get(chave)
+            if estado is not None and agora - estado[0] < intervalo:
+                estado[1] += 1
+                return False
+            suprimidas = estado[1] if estado is not None else 0
+            self._ultimas[chave] = [agora, 0]
+            if len(self._ultimas) > 5000:
+                # Esquece chaves antigas para o dicionário não crescer sem limite (se todas forem
+                # recentes, esquece tudo: o pior caso é deixar passar uma repetição)
+                self._ultimas = {k: v for k, v in self._ultimas.items() if agora - v[0] < 60}
+                if len(self._ultimas) > 2500:
+                    self._ultimas = {}
+        if suprimidas:
+            record.suprimidas = suprimidas
+        return True
+
+# QueueHandler que nunca bloqueia e deixa a formatação para a thread de escrita
+class HandlerFila(QueueHandler):
+    def __init__(self, fila: queue.Queue):
+        super().__init__(fila)
+        self.descartadas = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Só resolve os args agora (podem mudar depois); o resto fica para a thread de escrita
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartadas += 1
+
+# Console: '[TAG] mensagem', como os prints de antes
+class FormatoConsole(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        tag = record.name.split('.', 1)[1] if '.' in record.name else record.name
+        texto = record.getMessage()
+        if getattr(record, 'suprimidas', 0):
+            texto += f" (+{record.suprimidas} repetidas)"
+        prefixo = f"[{tag}] " if tag else ''
+        if record.levelno >= logging.WARNING:
+            prefixo += f"{record.levelname}: "
+        linha = prefixo + texto
+        if record.exc_text:
+            linha += '\n' + record.exc_text
+        return linha
+
+# Arquivo: uma linha JSON por registro (campos extras em 'dados')
+class FormatoJSON(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        linha = {
+            'ts': record.created,
+            'nivel': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+            'origem': f'{record.module}:{record.lineno}'
+        }
+        for campo in ('dados', 'suprimidas'):
+            if hasattr(record, campo):
+                linha[campo] = getattr(record, campo)
+        if record.exc_text:
+            linha['excecao'] = record.exc_text
+        return json.dumps(linha, default=str, ensure_ascii=False)
+
+# Console resolvido a cada escrita: o Live do rich troca sys.stdout enquanto está ativo
+class HandlerConsole(logging.StreamHandler):
+    def emit(self, record: logging.LogRecord):
+        self.stream = sys.stdout
+        super().emit(record)
+
+# Linhas cruas para arquivos próprios: o registro diz o arquivo (extra 'arquivo')
+class HandlerLinhas(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self._arquivos = {}  # caminho -> arquivo aberto (fica aberto entre as linhas)
+
+    def emit(self, record: logging.LogRecord):
+        caminho = getattr(record, 'arquivo', None)
+        if caminho is None:
+            return
+        try:
+            arquivo = self._arquivos.get(caminho)
+            if arquivo is None:
+                arquivo = self._arquivos[caminho] = open(caminho, 'a', encoding='utf-8')
+            arquivo.write(record.getMessage() + '\n')
+            arquivo.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        for arquivo in self._arquivos.values():
+            arquivo.close()
+        self._arquivos.clear()
+        super().close()
+
+def _nao_e_linha(record: logging.LogRecord) -> bool:
+    return not hasattr(record, 'arquivo')
+
+_linhas = HandlerLinhas()  # um só, reaproveitado quando os logs são reconfigurados
+_listener: Optional[QueueListener] = None
+_handler_fila: Optional[HandlerFila] = None
+_config = {}  # argumentos da última configuração (refeita no filho de um fork)
+_lock = threading.Lock()
+
+def configurar_logs(nivel: Optional[str] = None, arquivo_json: Optional[str] = None, console: bool = True,
+                    intervalo_repeticao: float = INTERVALO_REPETICAO):
+    """
+    (Re)configura os logs do processo. Sem argumentos usa LUCELO_LOG_NIVEL e LUCELO_LOG_JSON.
+    Pode ser chamada de novo (ex.: lucelo.main ligando o arquivo JSON); a fila anterior é
+    esvaziada antes da troca.
+    """
+    global _listener, _handler_fila
+    nivel = (nivel or os.environ.get('LUCELO_LOG_NIVEL') or NIVEL_PADRAO).upper()
+    arquivo_json = arquivo_json or os.environ.get('LUCELO_LOG_JSON')
+    _config.update(nivel=nivel, arquivo_json=arquivo_json, console=console, intervalo_repeticao=intervalo_repeticao)
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+        raiz = logging.getLogger(RAIZ)
+        for handler in list(raiz.handlers):
+            raiz.removeHandler(handler)
+        fila = queue.Queue(maxsize=MAX_FILA)
+        _handler_fila = HandlerFila(fila)
+        _handler_fila.addFilter(FiltroRepeticao(intervalo_repeticao))
+        raiz.addHandler(_handler_fila)
+        raiz.setLevel(nivel)
+        raiz.propagate = False
+        saidas = [_linhas]
+        if console:
+            saida = HandlerConsole()
+            saida.setFormatter(FormatoConsole())
+            saida.addFilter(_nao_e_linha)
+            saidas.append(saida)
+        if arquivo_json:
+            saida = logging.FileHandler(arquivo_json, encoding='utf-8')
+            saida.setFormatter(FormatoJSON())
+            saida.addFilter(_nao_e_linha)
+            saidas.append(saida)
+        _listener = QueueListener(fila, *saidas, respect_handler_level=True)
+        _listener.start()
+
+def obter_logger(tag: str) -> logging.Logger:
+    """
+    Logger com a tag que aparece entre colchetes no console (ex.: 'SETUP').
+    Configura com os padrões na primeira vez, se ninguém configurou antes.
+    """
+    if _listener is None:
+        configurar_logs()
+    return logging.getLogger(f'{RAIZ}.{tag}')
+
+def gravar_linha(caminho: str, linha: str):
+    """
+    Anexa `linha` ao arquivo `caminho` pela fila de logs: quem chama não espera o disco.
+    """
+    gravador = obter_logger(ARQUIVOS)
+    if gravador.level != logging.DEBUG:
+        gravador.setLevel(logging.DEBUG)  # independe do nível configurado para o console
+    gravador.info(linha, extra={'arquivo': caminho})
+
+def descartadas() -> int:
+    return _handler_fila.descartadas if _handler_fila is not None else 0
+
+def encerrar_logs():
+    # Escreve o que ainda está na fila (chamado na saída do processo)
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        _linhas.close()
+
+def _apos_fork():
+    # No filho de um fork a thread de escrita não existe e a fila/locks herdados podem estar
+    # travados: recomeça com fila e listener próprios (se o pai tinha logs configurados)
+    global _lock, _listener, _handler_fila
+    configurado = _listener is not None
+    _lock = threading.Lock()
+    _listener = None
+    _handler_fila = None
+    if configurado:
+        configurar_logs(**_config)
+
+atexit.register(encerrar_logs)
+os.register_at_fork(after_in_child=_apos_fork)
@@ -1,32 +1,25 @@
+from partida import RelatorioPartida
+import os
 import time
-from tvDatafeed import TvDatafeed, Interval
-import pandas as pd
-from Fibonacci import calcular_fibonacci, encontrar_zona_fibonacci
-from chapeleiro import analisar_pressao
-from thedesigner import mostrar_vela_em_tempo_real
 import threading
-from setup import executar_entrada, capital_setup
-from paciencia import Paciencia
-from paulo_sizing import calcular_position_sizing
 import json
-from padrao import detectar_padroes
+from pares import SYMBOL_TO_EPIC, PARES_PADRAO
+from metricas import metricas, medir, PerfilAmostragem, PORTA_METRICAS
+from logs import obter_logger, configurar_logs, descartadas
 
-# Mapeamento símbolo -> epic real Capital.com (apenas para envio de ordem)
-SYMBOL_TO_EPIC = {
-    'EURUSD': 'EURUSD',
-    'GBPUSD': 'GBPUSD',
-    'USDJPY': 'USDJPY',
-    'EURJPY': 'EURJPY',
-    'GBPJPY': 'GBPJPY',
-    'BTCUSD': 'BTCUSD',
-    'ETHUSD': 'ETHUSD',
-    # Adicione outros conforme necessário
-}
+# Dependências pesadas (pandas, tvDatafeed, rich, padrões, corretora) só são importadas em main():
+# importar o lucelo é instantâneo e uma falha nelas não impede o resto de subir.
+relatorio_partida = RelatorioPartida()
+log = obter_logger('LUCHELO')
+log_varredura = obter_logger('VARREDURA')
 
-# Pares padrão para análise (usados para TradingView e análise)
-PARES_PADRAO = [
-    'EURUSD', 'GBPUSD', 'USDJPY', 'EURJPY', 'GBPJPY', 'BTCUSD', 'ETHUSD'
-]
+def __getattr__(nome):
+    # Compatibilidade: funções de análise que moraram aqui continuam acessíveis via lucelo
+    if nome in ('analisar_tendencia', 'encontrar_suporte_resistencia', 'analisar_ponto_entrada',
+                'detectar_entrada_forte', 'calcular_stop_take', 'RR_FIXO', 'ATR_MULT_STOP'):
+        import analise
+        return getattr(analise, nome)
+    raise AttributeError(f"module 'lucelo' has no attribute '{nome}'")
 
 # Controle de par atual e entrada executada
 par_atual_idx = 0
@@ -34,9 +27,6 @@ par_atual = PARES_PADRAO[par_atual_idx]
 entrada_executada = threading.Event()
 par_lock = threading.Lock()
 
-RR_FIXO = 2.0  # Risk:Reward fixo
-ATR_MULT_STOP = 2.0  # Stop = ATR * 2
-
 def get_par_atual():
     with par_lock:
         return PARES_PADRAO[par_atual_idx]
@@ -49,214 +39,254 @@ def trocar_par():
     global par_atual_idx
     with par_lock:
         par_atual_idx = (par_atual_idx + 1) % len(PARES_PADRAO)
-        print(f'[LUCHELO] Trocando para o próximo par: {PARES_PADRAO[par_atual_idx]}')
+        log.info(f'Trocando para o próximo par: {PARES_PADRAO[par_atual_idx]}')
     entrada_executada.clear()
 
+def definir_par(par):
+    # Par ativo passa a ser o do sinal escolhido (Chapeleiro/TheDesigner seguem)
+    global par_atual_idx
+    with par_lock:
+        par_atual_idx = PARES_PADRAO.index(par)
+
 def get_entrada_executada():
     return entrada_executada.is_set()
 
-def analisar_tendencia(df: pd.DataFrame) -> str:
-    """
-    Analisa a tendência do mercado com base em médias móveis e volatilidade.
-    """
-    close = df['close']
-    ema50 = close.ewm(span=50, min_periods=50).mean()
-    ema200 = close.ewm(span=200, min_periods=200).mean()
-    if close.iloc[-1] > ema50.iloc[-1] > ema200.iloc[-1]:
-        return 'alta'
-    elif close.iloc[-1] < ema50.iloc[-1] < ema200.iloc[-1]:
-        return 'baixa'
-    else:
-        return 'lateralizado'
-
-def encontrar_suporte_resistencia(df: pd.DataFrame, n=100):
-    """
-    Encontra suportes e resistências simples nos últimos n candles.
-    """
-    ultimos = df.tail(n)
-    suporte = ultimos['low'].min()
-    resistencia = ultimos['high'].max()
-    return suporte, resistencia
-
-def analisar_ponto_entrada(df: pd.DataFrame, tendencia: str, suporte: float, resistencia: float):
-    """
-    Analisa possíveis pontos de entrada com base na tendência e nos níveis.
-    """
-    close = df['close'].iloc[-1]
-    mensagem = f"Tendência: {tendencia}\n"
-    if tendencia == 'lateralizado':
-        mensagem += f"Mercado lateralizado. Suporte em {suporte:.5f}, resistência em {resistencia:.5f}.\n"
-        if abs(close - suporte) < (resistencia - suporte) * 0.1:
-
-            mensagem += "[SUPORTE] Preço próximo ao suporte. Avalie pressão compradora para possível compra.\n"
-        elif abs(close - resistencia) < (resistencia - suporte) * 0.1:
-            mensagem += "[RESISTÊNCIA] Preço próximo à resistência. Avalie pressão vendedora para possível venda.\n"
-    elif tendencia == 'alta':
-        mensagem += f"Mercado em alta. Suporte relevante em {suporte:.5f}.\n"
-        if abs(close - suporte) < (resistencia - suporte) * 0.1:
-            mensagem += "[SUPORTE] Preço recuando para suporte. Avalie força compradora para possível compra.\n"
-    elif tendencia == 'baixa':
-        mensagem += f"Mercado em baixa. Resistência relevante em {resistencia:.5f}.\n"
-        if abs(close - resistencia) < (resistencia - suporte) * 0.1:
-            mensagem += "[RESISTÊNCIA] Preço subindo para resistência. Avalie força vendedora para possível venda.\n"
-    return mensagem
-
-def exibir_fibonacci_info(fibo_ctx):
-    print("\n--- [FIBONACCI] ---")
-    print(f"Swing High: {fibo_ctx['swing_high']:.5f} | Swing Low: {fibo_ctx['swing_low']:.5f}")
-    print(f"Tendência detectada: {fibo_ctx['tendencia']} | Direção: {fibo_ctx['direcao']}")
-    print(f"ATR (vol): {fibo_ctx['atr']:.5f}")
-    print(f"Preço atual: {fibo_ctx['close']:.5f}")
-    print("Níveis de retração:")
+def exibir_fibonacci_info(fibo_ctx, par=None):
+    # Bloco inteiro num registro só: uma entrada na fila de logs em vez de ~15 escritas no stdout
+    linhas = [
+        f"{par + ' ' if par else ''}Swing High: {fibo_ctx['swing_high']:.5f} | Swing Low: {fibo_ctx['swing_low']:.5f}",
+        f"Tendência detectada: {fibo_ctx['tendencia']} | Direção: {fibo_ctx['direcao']}",
+        f"ATR (vol): {fibo_ctx['atr']:.5f}",
+        f"Preço atual: {fibo_ctx['close']:.5f}",
+        "Níveis de retração:"
+    ]
     for nivel, valor in fibo_ctx['retracements'].items():
-        print(f"  {nivel}: {valor:.5f} | Distância: {fibo_ctx['distancias'][nivel]:.5f}")
+        linhas.append(f"  {nivel}: {valor:.5f} | Distância: {fibo_ctx['distancias'][nivel]:.5f}")
     if fibo_ctx['extensoes']:
-        print("Níveis de extensão:")
+        linhas.append("Níveis de extensão:")
         for nivel, valor in fibo_ctx['extensoes'].items():
-            print(f"  {nivel}: {valor:.5f} | Distância: {fibo_ctx['distancias'][nivel]:.5f}")
+            linhas.append(f"  {nivel}: {valor:.5f} | Distância: {fibo_ctx['distancias'][nivel]:.5f}")
+    obter_logger('FIBONACCI').info('\n'.join(linhas), extra={'dados': {'par': par, **fibo_ctx}})
 
-def monitorar_pnl_apos_ordem(deal_id):
-    print(f'[LUCHELO] Monitorando P&L da operação {deal_id}...')
-    while True:
-        pos = capital_setup.api.consultar_posicao_aberta(deal_id=deal_id)
-        if not pos or pos.get('status') != 'OPEN':
-            print('[LUCHELO] Operação encerrada.')
-            break
-        pnl = pos.get('profit')
-        if pnl is not None:
-            print(f'[LUCHELO] Lucro/Prejuízo tempo real: {pnl}')
-        else:
-            print(f'[LUCHELO] Lucro/Prejuízo tempo real: --')
-        time.sleep(10)
+def ao_evento_operacao(evento):
+    # Chamado pelo rastreador de operações (thread própria); o loop de análise segue livre
+    if evento['tipo'] == 'pnl':
+        pnl = evento['profit']
+        log.info(f"[{evento['epic']}] Lucro/Prejuízo tempo real: {pnl if pnl is not None else '--'}",
+                 extra={'chave_limite': ('pnl', evento['epic']), 'intervalo': 30})
+    if evento['tipo'] in ('confirmada', 'rejeitada') and evento['dados'].get('rastro') is not None:
+        # Fecha o rastro de latência do sinal com a fila de envio, o envio e a chamada /confirms
+        rastro = evento['dados']['rastro']
+        if 'envio_inicio' in evento:
+            rastro.adicionar('fila_envio', evento['fila_inicio'], evento['envio_inicio'])
+            rastro.adicionar('envio', evento['envio_inicio'], evento['envio_fim'])
+        if 'confirmacao_inicio' in evento:
+            rastro.adicionar('confirmacao', evento['confirmacao_inicio'], evento['confirmacao_fim'])
+        rastro.concluir(status=evento['tipo'], deal_id=evento['deal_id'], ultima_barra=evento['dados'].get('ultima_barra'))
+    if evento['tipo'] in ('encerrada', 'rejeitada'):
+        log.info(f"Operação {evento['deal_id'] or evento['referencia']} ({evento['epic']}) {evento['tipo']}.")
+        par = evento['dados'].get('par')
+        if par == get_par_atual():
+            entrada_executada.clear()
 
-# Função para decidir se é entrada forte (exemplo simplificado)
-def detectar_entrada_forte(mensagem, fibo_ctx, tendencia, suporte, resistencia, close):
-    # Exemplo: tendência definida + preço muito próximo do suporte/resistência + confluência Fibonacci
-    if tendencia == 'alta' and abs(close - suporte) < (resistencia - suporte) * 0.1:
-        if fibo_ctx['direcao'] == 'alta' and abs(close - fibo_ctx['retracements']['38.2%']) < fibo_ctx['atr']:
-            return 'BUY'
-    if tendencia == 'baixa' and abs(close - resistencia) < (resistencia - suporte) * 0.1:
-        if fibo_ctx['direcao'] == 'baixa' and abs(close - fibo_ctx['retracements']['61.8%']) < fibo_ctx['atr']:
-            return 'SELL'
-    return None
+def despachar_sinal(sinal, capital_setup, rastreador, latencias):
+    """
+    Dimensiona a ordem do sinal e a coloca na fila do DespachoOrdens, sem esperar envio nem
+    confirmação: o rastreador de operações segue a ordem a partir daí.
+    """
+    par = sinal['par']
+    log_par = obter_logger(par)
+    log_par.info(f"Sinal (força {sinal['forca']:.2f})\n{sinal['mensagem']}")
+    fibo_ctx = sinal['fibo_ctx']
+    exibir_fibonacci_info(fibo_ctx, par)
+    nivel_prox, valor_prox = sinal['nivel_fibo']
+    if nivel_prox:
+        obter_logger('FIBO').info(f"Confluência: Preço muito próximo do nível de Fibonacci {nivel_prox} ({valor_prox:.5f})!")
+    else:
+        obter_logger('FIBO').info("Nenhuma confluência forte de preço com níveis de Fibonacci no momento.")
+    direcao = sinal['direcao']
+    close = sinal['close']
+    stop = sinal['stop']
+    take = sinal['take']
+    epic = SYMBOL_TO_EPIC.get(par, par)
+    # --- Padrões gráficos: risco cheio ou reduzido ---
+    padrao_confirmado = sinal['padrao_confirmado']
+    if sinal['padrao']:
+        padrao = sinal['padrao']
+        obter_logger('PADRÃO').info(f"Padrão detectado: {padrao['tipo']} | Direção: {padrao['direcao']} | Pontos-chave: {padrao['pontos']}")
+    # Rastro de latência do sinal até a ordem: etapas já medidas na varredura + as daqui
+    rastro = latencias.rastro(par, 'ordem')
+    rastro.inicio = sinal['tempos']['busca'][0]
+    rastro.adicionar('busca', *sinal['tempos']['busca'])
+    rastro.adicionar('analise', *sinal['tempos']['analise'])
+    # --- Gestão de capital dinâmica ---
+    inicio_dimensionamento = time.time()
+    rastro.adicionar('selecao', sinal['tempos']['analise'][1], inicio_dimensionamento)
+    with medir('lucelo.dimensionamento') as medicao:
+        try:
+            # Saldo, regras do epic e posições: do cache (ou em paralelo, se frio)
+            from paulo_sizing import calcular_position_sizing
+            contexto = capital_setup.api.consultar_contexto_ordem(epic)
+            saldo = contexto['saldo']['accounts'][0]['balance']['balance']
+            regras = contexto['regras']
+            lote_min = regras.get('minDealSize', 0.01)
+            valor_pip = regras.get('pipValue', 0.10)  # fallback 0.10 se não houver
+            stop_pips = abs(close - stop) / regras.get('pip', 0.0001)  # fallback pip 0.0001
+            risco_percent = 1.0 if padrao_confirmado else 0.5
+            resultado_lote = calcular_position_sizing(
+                par=par,
+                banca=saldo,
+                risco_percent=risco_percent,
+                stop_pips=stop_pips,
+                valor_pip=valor_pip,
+                lote_min=lote_min,
+                lote_max=100.0
+            )
+            lote = resultado_lote['tamanho_sugerido']
+            detalhes = ''.join(f"\n  - {detalhe}" for detalhe in resultado_lote['detalhes'])
+            obter_logger('GESTÃO DE RISCO').info(f"Saldo: ${saldo:.2f} | Stop: {stop_pips:.2f} pips | Valor do pip: ${valor_pip:.4f} | Lote calculado: {lote}{detalhes}")
+        except Exception as e:
+            obter_logger('GESTÃO DE RISCO').error(f"Falha ao calcular lote dinâmico: {e}")
+            medicao.erro = True
+            lote = 0.01  # fallback
+    rastro.adicionar('dimensionamento', inicio_dimensionamento, time.time())
+    if padrao_confirmado:
+        log.info(f"ENTRADA FORTE + PADRÃO GRÁFICO DETECTADO! Enviando ordem automática: {direcao} para {par} (epic: {epic}) ao preço {close} | Stop: {stop:.5f} | Take: {take:.5f} | Lote: {lote} (risco cheio)")
+    else:
+        log.info(f"ENTRADA FORTE SEM PADRÃO GRÁFICO! Enviando ordem automática: {direcao} para {par} (epic: {epic}) ao preço {close} | Stop: {stop:.5f} | Take: {take:.5f} | Lote: {lote} (risco reduzido)")
+    with medir('lucelo.envio'):
+        futuro = capital_setup.despacho.enviar(epic, direcao, lote, stop=stop, limit=take)
+        if par == get_par_atual():
+            entrada_executada.set()
+        # Sem bloquear: o rastreador recebe a confirmação do despacho e segue a operação
+        rastreador.acompanhar_pedido(futuro, epic=epic, direcao=direcao, par=par, stop=stop, take=take, lote=lote,
+                                     rastro=rastro, ultima_barra=sinal['tempos']['ultima_barra'])
+    log.info(f"Ordem de {par} na fila de envio ({capital_setup.despacho.pendentes()} na fila).")
 
 def main():
     global par_atual_idx
-    print("=== Lucelo: Analista Profissional de Forex ===")
-    print("Pares disponíveis para análise:")
-    for i, par in enumerate(PARES_PADRAO):
-        print(f"{i+1}. {par}")
-    # Iniciar automaticamente com BTCUSD
+    # Logs em fila (thread própria); LUCELO_LOG_JSON=arquivo grava também em JSON lines
+    configurar_logs()
+    log.info("=== Lucelo: Analista Profissional de Forex ===\nPares em varredura contínua:\n" +
+             '\n'.join(f"{i+1}. {par}" for i, par in enumerate(PARES_PADRAO)))
+    # Par exibido inicialmente (a análise cobre todos os pares a cada ciclo)
     if 'BTCUSD' in PARES_PADRAO:
         par_atual_idx = PARES_PADRAO.index('BTCUSD')
     else:
         par_atual_idx = 0
-    print(f"[LUCHELO] Iniciando análise automática pelo par: {PARES_PADRAO[par_atual_idx]}")
-    # Iniciar Chapeleiro, TheDesigner e Paciencia automaticamente
-    thread_chapeleiro = threading.Thread(target=analisar_pressao, args=(get_par_atual(),), daemon=True)
+    log.info(f"Iniciando exibição pelo par: {PARES_PADRAO[par_atual_idx]}")
+    # Métricas por função/etapa em http://127.0.0.1:9464/metrics (LUCELO_METRICAS_PORTA=0 desliga);
+    # LUCELO_PERFIL=1 liga o profiler por amostragem (pilhas em /perfil)
+    porta_metricas = int(os.environ.get('LUCELO_METRICAS_PORTA', PORTA_METRICAS))
+    # Envio automático de ordens só com LUCELO_OPERAR=1: por padrão os sinais são só exibidos
+    operar = os.environ.get('LUCELO_OPERAR') == '1'
+    if porta_metricas:
+        metricas.servir(porta_metricas)
+    if os.environ.get('LUCELO_PERFIL'):
+        metricas.perfil = PerfilAmostragem(intervalo=float(os.environ.get('LUCELO_PERFIL_INTERVALO', 0.01))).iniciar()
+    with relatorio_partida.medir('imports de análise e dados'):
+        import pandas as pd
+        from central import CentralDados
+        from arquivo import ArquivoBarras
+        from varredura import Varredura
+    # Corretora: sessão aberta em background (tokens do disco quando válidos), sem travar a análise
+    def iniciar_corretora():
+        try:
+            from setup import obter_setup
+            with relatorio_partida.medir('sessão da corretora pronta'):
+                capital_setup = obter_setup().iniciar()
+            # Regras de todos os epics de uma vez: o caminho da ordem não consulta a API
+            with relatorio_partida.medir('regras dos epics em cache'):
+                capital_setup.api.metadados.prefetch_regras(SYMBOL_TO_EPIC.values())
+        except Exception as e:
+            log.warning(f"Corretora indisponível por enquanto: {e}")
+    threading.Thread(target=iniciar_corretora, daemon=True).start()
+    # Operações abertas são acompanhadas em background (várias ao mesmo tempo, uma por par)
+    from setup import obter_setup
+    rastreador = obter_setup().rastreador
+    rastreador.adicionar_ouvinte(ao_evento_operacao)
+    # Cotações em push pelo WebSocket da Capital.com (conecta quando a sessão abrir);
+    # LUCELO_STREAMING=0 desliga e a central fica só com o polling
+    streaming = None
+    if os.environ.get('LUCELO_STREAMING', '1') != '0':
+        streaming = obter_setup().api.conectar_streaming()
+    # Central única de dados: pool de conexões, eventos distribuídos por filas,
+    # histórico local em disco (reinício só busca a lacuna desde a última barra gravada)
+    central = CentralDados(exchange='FX', streaming=streaming, conexoes=4, arquivo=ArquivoBarras('dados'))
+    central.iniciar()
+    # Latência por etapa (busca, análise, dimensionamento, envio, confirmação) por par
+    from latencia import RegistroLatencia
+    latencias = RegistroLatencia('latencia.jsonl')
+    varredura = Varredura(central, PARES_PADRAO, latencias=latencias)
+    # Primeira análise direto do histórico em disco, sem esperar a rede (só exibe, não opera)
+    ciclo = varredura.executar_ciclo(atualizar=False)
+    if ciclo['resultados']:
+        relatorio_partida.marcar('primeira análise (histórico local)')
+        log_varredura.info(f"Partida a quente: {len(ciclo['resultados'])}/{len(PARES_PADRAO)} pares analisados do disco em {ciclo['duracao']:.2f}s | {len(ciclo['sinais'])} sinal(is)" +
+                           ''.join(f"\n[{sinal['par']}] Sinal no histórico local: {sinal['direcao']} (força {sinal['forca']:.2f}) - aguardando dados atuais para operar"
+                                   for sinal in ciclo['sinais']))
+    # Interface (UI) sobe depois da primeira análise
+    from chapeleiro import analisar_pressao
+    from thedesigner import PainelSimbolos
+    from paciencia import Paciencia
+    # Iniciar Chapeleiro, TheDesigner e Paciencia automaticamente (seguindo o par ativo)
+    thread_chapeleiro = threading.Thread(target=analisar_pressao, args=(get_par_atual(),), kwargs={'central': central, 'seguir_par': get_par_atual}, daemon=True)
     thread_chapeleiro.start()
-    thread_thedesigner = threading.Thread(target=mostrar_vela_em_tempo_real, args=(get_par_atual(),), daemon=True)
-    thread_thedesigner.start()
+    # TheDesigner: painel de todos os pares (vela, pressão, P&L), par ativo em destaque
+    painel = PainelSimbolos(central, PARES_PADRAO, posicoes=obter_setup().api.cache_posicoes(),
+                            epics=SYMBOL_TO_EPIC, seguir_par=get_par_atual)
+    painel.iniciar()
+    # Paciencia agora só alterna o par exibido; a varredura analisa todos os pares
     paciencia = Paciencia(get_entrada_executada, trocar_par, get_par_atual, get_proximo_par, tempo_minutos=15)
     paciencia.start()
-    tv = TvDatafeed()
+    relatorio_partida.marcar('interface iniciada')
+    partida_impressa = False
+    ciclos = 0
     while True:
         try:
-            par = get_par_atual()
-            # Buscar candles em M15 para análise principal
-            df_m15 = tv.get_hist(symbol=par, exchange='FX', interval=Interval.in_15_minute, n_bars=700)
-            # Buscar H4 para contexto macro
-            df_h4 = tv.get_hist(symbol=par, exchange='FX', interval=Interval.in_4_hour, n_bars=200)
-            if df_m15 is None or len(df_m15) < 200:
-                print("[LUCHELO] Erro ao buscar candles M15. Tentando novamente em 1 minuto...")
+            with medir('lucelo.ciclo'):
+                ciclo = varredura.executar_ciclo()
+            ciclos += 1
+            if ciclos % 30 == 0:
+                latencias.imprimir_resumo()
+                metricas.imprimir_resumo()
+            if not partida_impressa and ciclo['resultados']:
+                relatorio_partida.marcar('primeira análise com dados atuais')
+                relatorio_partida.imprimir()
+                partida_impressa = True
+            # Resumo do ciclo num registro só (uma entrada na fila de logs)
+            linhas = [f"{pd.Timestamp.now()} | {len(ciclo['resultados'])}/{len(PARES_PADRAO)} pares analisados em {ciclo['duracao']:.2f}s | {len(ciclo['sinais'])} sinal(is)"]
+            for par, resultado in ciclo['resultados'].items():
+                macro = f" | Macro H4: {resultado['tendencia_macro']}" if resultado['tendencia_macro'] else ''
+                linhas.append(f"[{par}] Tendência: {resultado['tendencia']}{macro} | Sinal: {resultado['direcao'] or '-'}")
+            for par, erro in ciclo['erros'].items():
+                linhas.append(f"[{par}] {erro}")
+            log_varredura.info('\n'.join(linhas), extra={'dados': {'duracao': ciclo['duracao'], 'erros': ciclo['erros'],
+                                                                   'descartadas': descartadas()}})
+            # Pares com operação em andamento ficam de fora até ela encerrar
+            sinais = [s for s in ciclo['sinais'] if not rastreador.em_operacao(SYMBOL_TO_EPIC.get(s['par'], s['par']))]
+            if not sinais:
                 time.sleep(60)
                 continue
-            # Tendência macro (opcional)
-            if df_h4 is not None and len(df_h4) >= 50:
-                tendencia_macro = analisar_tendencia(df_h4)
-                print(f"[MACRO H4] Tendência macro: {tendencia_macro}")
-            tendencia = analisar_tendencia(df_m15)
-            suporte, resistencia = encontrar_suporte_resistencia(df_m15, n=100)
-            mensagem = analisar_ponto_entrada(df_m15, tendencia, suporte, resistencia)
-            print(f"\n[{par}] {pd.Timestamp.now()}\n{mensagem}")
-            # --- Fibonacci ---
-            fibo_ctx = calcular_fibonacci(df_m15, n=200, incluir_extensoes=True)
-            exibir_fibonacci_info(fibo_ctx)
-            # Checar confluência preço x níveis de Fibonacci (retracement + extensões)
-            nivel_prox, valor_prox = encontrar_zona_fibonacci(
-                fibo_ctx['close'],
-                {**fibo_ctx['retracements'], **fibo_ctx['extensoes']},
-                atr=fibo_ctx['atr']
-            )
-            if nivel_prox:
-                print(f"[FIBO] Confluência: Preço muito próximo do nível de Fibonacci {nivel_prox} ({valor_prox:.5f})!")
-            else:
-                print("[FIBO] Nenhuma confluência forte de preço com níveis de Fibonacci no momento.")
-            # --- Entrada automática ---
-            close = df_m15['close'].iloc[-1]
-            atr = fibo_ctx['atr']
-            direcao = detectar_entrada_forte(mensagem, fibo_ctx, tendencia, suporte, resistencia, close)
-            if direcao:
-                # Cálculo do stop e take combinando ATR e suporte/resistência
-                if direcao == 'BUY':
-                    stop_atr = close - ATR_MULT_STOP * atr
-                    stop = max(suporte, stop_atr)
-                    take_rr = close + RR_FIXO * (close - stop)
-                    take = min(resistencia, take_rr)
-                else:
-                    stop_atr = close + ATR_MULT_STOP * atr
-                    stop = min(resistencia, stop_atr)
-                    take_rr = close - RR_FIXO * (stop - close)
-                    take = max(suporte, take_rr)
-                epic = SYMBOL_TO_EPIC.get(par, par)
-                # --- Padrões gráficos: risco cheio ou reduzido ---
-                padroes = detectar_padroes(df_m15)
-                padrao_confirmado = False
-                if padroes:
-                    padrao = padroes[0]
-                    print(f"[PADRÃO] Padrão detectado: {padrao['tipo']} | Direção: {padrao['direcao']} | Pontos-chave: {padrao['pontos']}")
-                    if (direcao == 'BUY' and padrao['direcao'] in ['Alta', 'Indefinida']) or (direcao == 'SELL' and padrao['direcao'] in ['Baixa', 'Indefinida']):
-                        padrao_confirmado = True
-                # --- Gestão de capital dinâmica ---
+            if not operar:
+                log.info('Envio automático desligado (LUCELO_OPERAR=1 liga): ' +
+                         ', '.join(f"{s['par']} {s['direcao']} (força {s['forca']:.2f})" for s in sinais))
+                time.sleep(60)
+                continue
+            # --- Entrada automática: todos os sinais do ciclo, do mais forte ao mais fraco ---
+            # As ordens entram na fila do despacho e saem em sequência, no ritmo da corretora
+            definir_par(sinais[0]['par'])
+            capital_setup = obter_setup()
+            for sinal in sinais:
                 try:
-                    saldo_api = capital_setup.api.saldo()
-                    saldo = saldo_api['accounts'][0]['balance']['balance']
-                    regras = capital_setup.api.consultar_regras_epic(epic)
-                    lote_min = regras.get('minDealSize', 0.01)
-                    valor_pip = regras.get('pipValue', 0.10)  # fallback 0.10 se não houver
-                    stop_pips = abs(close - stop) / regras.get('pip', 0.0001)  # fallback pip 0.0001
-                    risco_percent = 1.0 if padrao_confirmado else 0.5
-                    resultado_lote = calcular_position_sizing(
-                        par=par,
-                        banca=saldo,
-                        risco_percent=risco_percent,
-                        stop_pips=stop_pips,
-                        valor_pip=valor_pip,
-                        lote_min=lote_min,
-                        lote_max=100.0
-                    )
-                    lote = resultado_lote['tamanho_sugerido']
-                    print(f"[GESTÃO DE RISCO] Saldo: ${saldo:.2f} | Stop: {stop_pips:.2f} pips | Valor do pip: ${valor_pip:.4f} | Lote calculado: {lote}")
-                    for detalhe in resultado_lote['detalhes']:
-                        print(f"  - {detalhe}")
+                    despachar_sinal(sinal, capital_setup, rastreador, latencias)
                 except Exception as e:
-                    print(f"[ERRO GESTÃO DE RISCO] Falha ao calcular lote dinâmico: {e}")
-                    lote = 0.01  # fallback
-                if padrao_confirmado:
-                    print(f"[LUCHELO] ENTRADA FORTE + PADRÃO GRÁFICO DETECTADO! Enviando ordem automática: {direcao} para {par} (epic: {epic}) ao preço {close} | Stop: {stop:.5f} | Take: {take:.5f} | Lote: {lote} (risco cheio)")
-                else:
-                    print(f"[LUCHELO] ENTRADA FORTE SEM PADRÃO GRÁFICO! Enviando ordem automática: {direcao} para {par} (epic: {epic}) ao preço {close} | Stop: {stop:.5f} | Take: {take:.5f} | Lote: {lote} (risco reduzido)")
-                resposta = capital_setup.api.enviar_ordem(epic, direcao, lote, stop=stop, limit=take)
-                print(f"[LUCHELO] Ordem enviada! Resposta: {resposta}")
-                deal_id = resposta.get('dealId') or resposta.get('dealReference')
-                if deal_id:
-                    entrada_executada.set()
-                    monitorar_pnl_apos_ordem(deal_id)
-                else:
-                    print('[LUCHELO] Não foi possível obter o dealId da ordem!')
+                    obter_logger(sinal['par']).exception(f"Erro ao despachar o sinal: {e}")
         except Exception as e:
-            print(f"[LUCHELO] Erro na análise: {e}")
+            log.exception(f"Erro na análise: {e}")
         time.sleep(60)  # Analisa a cada minuto
 
+relatorio_partida.marcar('import lucelo')
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
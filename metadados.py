@@ -0,0 +1,117 @@
+import copy
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+from logs import obter_logger
+
+MAX_EPICS_POR_CONSULTA = 50  # limite de /api/v1/markets?epics=
+log = obter_logger('METADADOS')
+
+# Cache com validade por chave para dados que mudam pouco (regras dos epics, saldo)
+class CacheMetadados:
+    """
+    Leituras nunca esperam a rede se houver algum valor: vencido o TTL, devolve o valor
+    atual e agenda a atualização numa thread de fundo (uma por chave por vez).
+    Sem valor nenhum, bloquear=True busca na hora; bloquear=False devolve None e agenda.
+    """
+    def __init__(self, api, ttl_regras: float = 3600.0, ttl_saldo: float = 60.0):
+        self.api = api
+        self.ttl_regras = ttl_regras
+        self.ttl_saldo = ttl_saldo
+        self._valores = {}  # chave -> (valor, expira_em)
+        self._pendentes = set()
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def guardar(self, chave, valor, ttl: float):
+        with self._lock:
+            self._valores[chave] = (valor, time.time() + ttl)
+
+    def invalidar(self, chave):
+        with self._lock:
+            if chave in self._valores:
+                valor, _ = self._valores[chave]
+                self._valores[chave] = (valor, 0.0)
+
+    def _obter(self, chave, carregar: Callable, ttl: float, bloquear: bool):
+        with self._lock:
+            item = self._valores.get(chave)
+        if item is not None:
+            valor, expira_em = item
+            if time.time() >= expira_em:
+                self._agendar(chave, carregar, ttl)
+            return valor
+        if not bloquear:
+            self._agendar(chave, carregar, ttl)
+            return None
+        valor = carregar()
+        self.guardar(chave, valor, ttl)
+        return valor
+
+    def _agendar(self, chave, carregar: Callable, ttl: float):
+        with self._lock:
+            if chave in self._pendentes:
+                return
+            self._pendentes.add(chave)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._fila.put((chave, carregar, ttl))
+
+    def _run(self):
+        while True:
+            chave, carregar, ttl = self._fila.get()
+            try:
+                self.guardar(chave, carregar(), ttl)
+            except Exception as e:
+                log.warning(f"Erro ao atualizar {chave}: {e}")
+            finally:
+                with self._lock:
+                    self._pendentes.discard(chave)
+
+    def regras(self, epic: str, bloquear: bool = True) -> Optional[Dict]:
+        """
+        Mesmo conteúdo de CapitalAPI.consultar_regras_epic.
+        """
+        return self._obter(('regras', epic), lambda: self.api.consultar_regras_epic(epic), self.ttl_regras, bloquear)
+
+    def saldo(self, bloquear: bool = True) -> Optional[Dict]:
+        """
+        Mesmo conteúdo de CapitalAPI.saldo.
+        """
+        return self._obter('saldo', self.api.saldo, self.ttl_saldo, bloquear)
+
+    def prefetch_regras(self, epics: Iterable[str]) -> int:
+        """
+        Carrega as regras de vários epics com poucas requisições (até 50 por chamada).
+        Retorna quantos epics foram guardados.
+        """
+        epics = list(dict.fromkeys(epics))
+        guardados = 0
+        for i in range(0, len(epics), MAX_EPICS_POR_CONSULTA):
+            for epic, instrumento in self.api.consultar_regras_epics(epics[i:i + MAX_EPICS_POR_CONSULTA]).items():
+                self.guardar(('regras', epic), instrumento, self.ttl_regras)
+                guardados += 1
+        return guardados
+
+    def ao_evento_operacao(self, evento: Dict):
+        """
+        Ouvinte do RastreadorOperacoes: ajusta o saldo em cache sem esperar a API.
+        No encerramento soma o último P&L; em qualquer mudança de posição agenda a leitura real.
+        """
+        if evento['tipo'] not in ('confirmada', 'encerrada'):
+            return
+        if evento['tipo'] == 'encerrada' and evento.get('profit') is not None:
+            with self._lock:
+                item = self._valores.get('saldo')
+                if item is not None:
+                    saldo = copy.deepcopy(item[0])
+                    try:
+                        saldo['accounts'][0]['balance']['balance'] += float(evento['profit'])
+                        self._valores['saldo'] = (saldo, item[1])
+                    except (KeyError, IndexError, TypeError, ValueError):
+                        pass
+        self.invalidar('saldo')
+        self._agendar('saldo', self.api.saldo, self.ttl_saldo)
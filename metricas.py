@@ -0,0 +1,263 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+from latencia import Histograma
+from logs import obter_logger
+
+PORTA_METRICAS = 9464  # /metrics (Prometheus), /metrics.json e /perfil em 127.0.0.1
+log = obter_logger('MÉTRICAS')
+
+# Resultado de uma medição em andamento: quem mede pode marcar erro sem lançar exceção
+class Medicao:
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.erro = False
+
+# Métricas por função ou etapa: chamadas, erros, tempo acumulado e percentis (ms)
+class RegistroMetricas:
+    """
+    Leve o bastante para ficar ligado sempre: uma medição custa dois perf_counter() e um
+    append sob lock. Nos processos da varredura o registro do filho é zerado no início de
+    cada tarefa e as amostras voltam junto com o resultado (drenar/mesclar).
+    """
+    def __init__(self, max_amostras: int = 5000):
+        self.max_amostras = max_amostras
+        self.perfil = None  # PerfilAmostragem opcional, exposto em /perfil
+        self._metricas = {}  # nome -> {'chamadas', 'erros', 'total_ms', 'histograma', 'pendente'}
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def _metrica(self, nome: str) -> Dict:
+        metrica = self._metricas.get(nome)
+        if metrica is None:
+            metrica = self._metricas[nome] = {'chamadas': 0, 'erros': 0, 'total_ms': 0.0,
+                                              'histograma': Histograma(self.max_amostras), 'pendente': None}
+        return metrica
+
+    def registrar(self, nome: str, duracao_ms: float, erro: bool = False):
+        with self._lock:
+            metrica = self._metrica(nome)
+            metrica['chamadas'] += 1
+            metrica['erros'] += int(erro)
+            metrica['total_ms'] += duracao_ms
+            metrica['histograma'].adicionar(duracao_ms)
+            # Parte ainda não drenada (processos filhos)
+            pendente = metrica['pendente']
+            if pendente is None:
+                pendente = metrica['pendente'] = {'chamadas': 0, 'erros': 0, 'total_ms': 0.0, 'amostras': []}
+            pendente['chamadas'] += 1
+            pendente['erros'] += int(erro)
+            pendente['total_ms'] += duracao_ms
+            if len(pendente['amostras']) < self.max_amostras:
+                pendente['amostras'].append(duracao_ms)
+
+    @contextmanager
+    def medir(self, nome: str):
+        medicao = Medicao(nome)
+        t0 = time.perf_counter()
+        try:
+            yield medicao
+        except BaseException:
+            medicao.erro = True
+            raise
+        finally:
+            self.registrar(nome, (time.perf_counter() - t0) * 1000, medicao.erro)
+
+    def cronometrado(self, nome: Optional[str] = None):
+        """
+        Decorator: @cronometrado() usa 'modulo.funcao' como nome.
+        """
+        def decorar(funcao: Callable):
+            rotulo = nome or f'{funcao.__module__}.{funcao.__name__}'
+
+            @functools.wraps(funcao)
+            def envolvida(*args, **kwargs):
+                with self.medir(rotulo):
+                    return funcao(*args, **kwargs)
+            return envolvida
+        return decorar
+
+    def limpar(self):
+        with self._lock:
+            self._metricas.clear()
+
+    def drenar(self) -> Dict[str, Dict]:
+        """
+        Amostras registradas desde o último drenar(), para mandar a outro processo.
+        """
+        with self._lock:
+            dados = {}
+            for nome, metrica in self._metricas.items():
+                if metrica['pendente'] is not None:
+                    dados[nome] = metrica['pendente']
+                    metrica['pendente'] = None
+            return dados
+
+    def mesclar(self, dados: Dict[str, Dict]):
+        with self._lock:
+            for nome, item in dados.items():
+                metrica = self._metrica(nome)
+                metrica['chamadas'] += item['chamadas']
+                metrica['erros'] += item['erros']
+                metrica['total_ms'] += item['total_ms']
+                for duracao_ms in item['amostras']:
+                    metrica['histograma'].adicionar(duracao_ms)
+
+    def resumo(self) -> Dict[str, Dict]:
+        """
+        {nome: {'chamadas', 'erros', 'total_ms', 'n', 'p50', 'p95', 'p99', 'max'}}.
+        """
+        resultado = {}
+        with self._lock:  # o histograma não pode mudar enquanto é ordenado
+            for nome, m in sorted(self._metricas.items()):
+                resultado[nome] = {'chamadas': m['chamadas'], 'erros': m['erros'], 'total_ms': m['total_ms']}
+                resultado[nome].update(m['histograma'].resumo())
+        return resultado
+
+    def prometheus(self) -> str:
+        linhas = [
+            '# HELP lucelo_duracao_ms Tempo por chamada (ms), percentis das últimas amostras.',
+            '# TYPE lucelo_duracao_ms summary',
+        ]
+        erros = ['# HELP lucelo_erros_total Chamadas que terminaram em erro.', '# TYPE lucelo_erros_total counter']
+        for nome, r in self.resumo().items():
+            rotulo = nome.replace('\\', '\\\\').replace('"', '\\"')
+            for quantil, chave in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')):
+                linhas.append(f'lucelo_duracao_ms{{funcao="{rotulo}",quantile="{quantil}"}} {r[chave]}')
+            linhas.append(f'lucelo_duracao_ms_sum{{funcao="{rotulo}"}} {r["total_ms"]}')
+            linhas.append(f'lucelo_duracao_ms_count{{funcao="{rotulo}"}} {r["chamadas"]}')
+            erros.append(f'lucelo_erros_total{{funcao="{rotulo}"}} {r["erros"]}')
+        return '\n'.join(linhas + erros) + '\n'
+
+    def imprimir_resumo(self, top: int = 10):
+        # As mais caras primeiro (tempo acumulado)
+        itens = sorted(self.resumo().items(), key=lambda item: item[1]['total_ms'], reverse=True)[:top]
+        linhas = ["Tempo acumulado por função/etapa:"]
+        for nome, r in itens:
+            linhas.append(f"  {nome:<40} {r['chamadas']:>7}x  total={r['total_ms'] / 1000:8.2f} s  p50={r['p50']:8.2f} ms  p99={r['p99']:8.2f} ms  erros={r['erros']}")
+        if self.perfil is not None:
+            linhas.append(f"Perfil ({self.perfil.amostras} amostras), tempo próprio:")
+            for item in self.perfil.top(5):
+                linhas.append(f"  {item['funcao']:<40} {item['percentual']:5.1f}%")
+        log.info('\n'.join(linhas), extra={'dados': dict(itens)})
+
+    def servir(self, porta: int = PORTA_METRICAS, host: str = '127.0.0.1'):
+        """
+        Sobe o endpoint HTTP local numa thread daemon. Retorna False se a porta estiver ocupada.
+        """
+        # Import aqui: o servidor HTTP só é carregado por quem liga o endpoint
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        registro = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith('/metrics.json'):
+                    corpo, tipo = json.dumps(registro.resumo(), default=str), 'application/json; charset=utf-8'
+                elif self.path.startswith('/metrics'):
+                    corpo, tipo = registro.prometheus(), 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path.startswith('/perfil') and registro.perfil is not None:
+                    corpo, tipo = registro.perfil.pilhas_dobradas(), 'text/plain; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                dados = corpo.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+        try:
+            self._servidor = ThreadingHTTPServer((host, porta), Manipulador)
+        except OSError as e:
+            log.warning(f"Não foi possível abrir {host}:{porta}: {e}")
+            return False
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        log.info(f"Em http://{host}:{porta}/metrics (Prometheus) e /metrics.json")
+        return True
+
+    def _apos_fork(self):
+        # No filho de um fork: lock novo (o do pai pode ter sido copiado travado), sem servidor nem perfil
+        self._lock = threading.Lock()
+        self._servidor = None
+        self.perfil = None
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+        if self.perfil is not None:
+            self.perfil.parar()
+
+# Profiler por amostragem (opcional): pilhas de todas as threads deste processo a cada `intervalo`
+class PerfilAmostragem:
+    """
+    Custo proporcional à frequência, não ao número de chamadas; serve para achar onde o
+    tempo vai sob carga real. Não enxerga os processos filhos da varredura (para eles
+    valem as métricas). pilhas_dobradas() sai no formato do flamegraph.pl.
+    """
+    def __init__(self, intervalo: float = 0.01, max_profundidade: int = 40):
+        self.intervalo = intervalo
+        self.max_profundidade = max_profundidade
+        self.amostras = 0
+        self._pilhas = Counter()  # 'raiz;...;folha' -> amostras
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._stop_event.set()
+
+    def _run(self):
+        proprio = threading.get_ident()
+        while not self._stop_event.wait(self.intervalo):
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                pilha = []
+                while frame is not None and len(pilha) < self.max_profundidade:
+                    codigo = frame.f_code
+                    pilha.append(f'{os.path.basename(codigo.co_filename)}:{codigo.co_name}')
+                    frame = frame.f_back
+                with self._lock:
+                    self._pilhas[';'.join(reversed(pilha))] += 1
+            with self._lock:
+                self.amostras += 1
+
+    def pilhas_dobradas(self) -> str:
+        with self._lock:
+            return ''.join(f'{pilha} {n}\n' for pilha, n in self._pilhas.most_common())
+
+    def top(self, n: int = 15) -> List[Dict]:
+        """
+        Funções com mais amostras no topo da pilha (tempo próprio, não inclusivo).
+        """
+        proprias = Counter()
+        with self._lock:
+            for pilha, quantidade in self._pilhas.items():
+                proprias[pilha.rsplit(';', 1)[-1]] += quantidade
+            total = sum(self._pilhas.values()) or 1
+        return [{'funcao': f, 'amostras': q, 'percentual': 100 * q / total} for f, q in proprias.most_common(n)]
+
+# Registro global do processo: use medir()/cronometrado() daqui
+metricas = RegistroMetricas()
+medir = metricas.medir
+cronometrado = metricas.cronometrado
+os.register_at_fork(after_in_child=metricas._apos_fork)
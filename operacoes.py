@@ -0,0 +1,230 @@
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from logs import obter_logger
+
+log = obter_logger('OPERAÇÕES')
+
+# Acompanhamento de operações em background: o loop de análise nunca espera uma operação fechar
+class RastreadorOperacoes:
+    """
+    Uma thread segue todas as operações registradas com acompanhar(): confirma a ordem
+    (/confirms), acompanha o P&L pela foto compartilhada de posições (CachePosicoes) e
+    detecta o encerramento. Os ouvintes recebem eventos (dicts) com 'tipo':
+      'confirmada'  - ordem aceita, com 'deal_id' definitivo
+      'rejeitada'   - ordem recusada pela corretora (ou sem confirmação dentro do prazo)
+      'pnl'         - lucro/prejuízo mudou ('profit', 'price')
+      'encerrada'   - posição saiu da lista de abertas (stop, take ou manual)
+    Os ouvintes rodam na thread do rastreador: devem ser rápidos.
+    Ordem sem confirmação após `periodos_pendente` períodos é conciliada com as posições
+    abertas: se a posição existe vira 'confirmada', senão 'rejeitada' (o epic fica livre).
+    """
+    def __init__(self, api, periodo: float = 5.0, periodos_pendente: int = 12):
+        self.api = api
+        self.periodo = periodo
+        self.prazo_pendente = periodos_pendente * periodo
+        self._operacoes: Dict[str, Dict] = {}  # chave (referência da ordem ou pedido na fila) -> estado
+        self._ouvintes: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._acordar = threading.Event()  # nova operação: confirma sem esperar o período
+        self._seq = itertools.count()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def adicionar_ouvinte(self, funcao: Callable[[Dict], None]):
+        with self._lock:
+            self._ouvintes.append(funcao)
+
+    def iniciar(self):
+        self._stop_event.clear()
+        if not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._stop_event.set()
+        self._acordar.set()
+
+    def _registrar(self, chave: str, referencia: Optional[str], epic, direcao, status: str, dados: Dict) -> Dict:
+        operacao = {
+            'chave': chave,
+            'referencia': referencia,
+            'deal_id': None,
+            'epic': epic,
+            'direcao': direcao,
+            'status': status,
+            'profit': None,
+            'price': None,
+            'aberta_em': time.time(),
+            'pendente_desde': time.time(),
+            'vista_aberta': False,
+            'dados': dados
+        }
+        with self._lock:
+            self._operacoes[chave] = operacao
+        self.api.cache_posicoes().solicitar_atualizacao()
+        self.iniciar()
+        self._acordar.set()
+        return operacao
+
+    def acompanhar(self, referencia: str, epic: Optional[str] = None, direcao: Optional[str] = None, **dados) -> Dict:
+        """
+        Registra uma ordem enviada (dealReference ou dealId) e retorna imediatamente.
+        `dados` extras (stop, take, lote...) vão junto nos eventos.
+        """
+        return self._registrar(referencia, referencia, epic, direcao, 'PENDENTE', dados)
+
+    def acompanhar_pedido(self, futuro, epic: Optional[str] = None, direcao: Optional[str] = None, **dados) -> Dict:
+        """
+        Registra uma ordem ainda na fila do DespachoOrdens (Future). O epic já conta como
+        em operação; a confirmação vem do próprio despacho, sem nova consulta a /confirms.
+        """
+        operacao = self._registrar(f'pedido-{next(self._seq)}', None, epic, direcao, 'ENVIANDO', dados)
+        futuro.add_done_callback(lambda f: self._pedido_concluido(operacao, f))
+        return operacao
+
+    def _pedido_concluido(self, operacao: Dict, futuro):
+        # Roda na thread do despacho: toda mudança de estado passa pelo lock do rastreador
+        try:
+            resultado = futuro.result()
+        except Exception as e:
+            self._alterar(operacao, status='REJEITADA')
+            self._emitir('rejeitada', operacao, motivo=str(e))
+            self._remover(operacao)
+            return
+        self._alterar(operacao, referencia=resultado['referencia'])
+        if resultado['status'] == 'SEM_CONFIRMACAO' or not self._aplicar_confirmacao(operacao, resultado['confirmacao'], resultado['tempos']):
+            # Sem confirmação ou com status desconhecido: o rastreador tenta /confirms de novo
+            # e, passado o prazo, concilia com as posições abertas
+            self._alterar(operacao, status='PENDENTE', pendente_desde=time.time())
+        if self._alterar(operacao)['status'] == 'REJEITADA':
+            self._remover(operacao)
+        self.api.cache_posicoes().solicitar_atualizacao()
+        self._acordar.set()
+
+    def _alterar(self, operacao: Dict, **campos) -> Dict:
+        """
+        Aplica `campos` sob o lock e devolve uma cópia do estado (sem campos: só lê).
+        """
+        with self._lock:
+            operacao.update(campos)
+            return dict(operacao)
+
+    def _remover(self, operacao: Dict):
+        with self._lock:
+            self._operacoes.pop(operacao['chave'], None)
+
+    def abertas(self) -> List[Dict]:
+        with self._lock:
+            return [dict(op) for op in self._operacoes.values()]
+
+    def em_operacao(self, epic: str) -> bool:
+        with self._lock:
+            return any(op['epic'] == epic for op in self._operacoes.values())
+
+    def _emitir(self, tipo: str, operacao: Dict, **extras):
+        with self._lock:
+            evento = {
+                'tipo': tipo,
+                'referencia': operacao['referencia'],
+                'deal_id': operacao['deal_id'],
+                'epic': operacao['epic'],
+                'direcao': operacao['direcao'],
+                'profit': operacao['profit'],
+                'price': operacao['price'],
+                'dados': operacao['dados'],
+                'timestamp': time.time()
+            }
+            ouvintes = list(self._ouvintes)
+        evento.update(extras)
+        for ouvinte in ouvintes:
+            try:
+                ouvinte(evento)
+            except Exception as e:
+                log.error(f"Erro no ouvinte de '{tipo}': {e}")
+
+    def _confirmar(self, operacao: Dict):
+        inicio = time.time()
+        confirmacao = self.api.consultar_ordem(operacao['referencia'])
+        # Instantes da chamada /confirms, para quem mede latência
+        self._aplicar_confirmacao(operacao, confirmacao, {'confirmacao_inicio': inicio, 'confirmacao_fim': time.time()})
+
+    def _aplicar_confirmacao(self, operacao: Dict, confirmacao: Dict, tempos: Dict) -> bool:
+        """
+        Aplica a resposta de /confirms. Retorna False se ela ainda não diz nada (status desconhecido).
+        """
+        detalhes = confirmacao.get('detalhes') or {}
+        status = detalhes.get('dealStatus')
+        if status == 'REJECTED':
+            self._alterar(operacao, status='REJEITADA')
+            self._emitir('rejeitada', operacao, motivo=detalhes.get('reason'), **tempos)
+            return True
+        deals = detalhes.get('affectedDeals') or []
+        deal_id = (deals[0].get('dealId') if deals else None) or detalhes.get('dealId')
+        if status == 'ACCEPTED' or deal_id:
+            self._alterar(operacao, deal_id=deal_id or operacao['referencia'], status='ABERTA', aberta_em=time.time(),
+                          price=confirmacao.get('price') or detalhes.get('level'))
+            self._emitir('confirmada', operacao, detalhes=detalhes, **tempos)
+            return True
+        return False
+
+    def _conciliar(self, operacao: Dict, posicoes) -> bool:
+        # Confirmação perdida: a posição aberta com a referência da ordem decide o desfecho
+        referencia = operacao['referencia']
+        pos = posicoes.obter(deal_id=referencia) if referencia else {'status': 'NOT_FOUND'}
+        if pos['status'] == 'OPEN':
+            p = pos['detalhes'].get('position', pos['detalhes'])
+            self._alterar(operacao, deal_id=p.get('dealId') or referencia, status='ABERTA', aberta_em=time.time(),
+                          price=pos.get('price'))
+            self._emitir('confirmada', operacao, conciliada=True)
+            return False
+        self._alterar(operacao, status='REJEITADA')
+        self._emitir('rejeitada', operacao, motivo=f'sem confirmação em {self.prazo_pendente:.0f}s')
+        return True
+
+    def _verificar(self, operacao: Dict, posicoes) -> bool:
+        """
+        Atualiza uma operação; retorna True quando ela terminou (sai do rastreador).
+        """
+        estado = self._alterar(operacao)
+        if estado['status'] == 'PENDENTE':
+            if time.time() - estado['pendente_desde'] > self.prazo_pendente:
+                return self._conciliar(operacao, posicoes)
+            if estado['referencia']:
+                self._confirmar(operacao)
+            estado = self._alterar(operacao)
+        if estado['status'] == 'REJEITADA':
+            return True
+        if estado['status'] != 'ABERTA':
+            return False
+        pos = posicoes.obter(deal_id=estado['deal_id'])
+        if pos['status'] != 'OPEN':
+            pos = posicoes.obter(deal_id=estado['referencia'])
+        if pos['status'] == 'OPEN':
+            self._alterar(operacao, vista_aberta=True)
+            if pos.get('profit') != estado['profit']:
+                self._alterar(operacao, profit=pos.get('profit'), price=pos.get('price') or estado['price'])
+                self._emitir('pnl', operacao)
+            return False
+        if pos['status'] == 'NOT_FOUND' and (estado['vista_aberta'] or time.time() - estado['aberta_em'] > 3 * self.periodo):
+            self._alterar(operacao, status='ENCERRADA')
+            self._emitir('encerrada', operacao)
+            return True
+        return False
+
+    def _run(self):
+        posicoes = self.api.cache_posicoes()
+        while not self._stop_event.is_set():
+            with self._lock:
+                operacoes = list(self._operacoes.values())
+            for operacao in operacoes:
+                try:
+                    terminou = self._verificar(operacao, posicoes)
+                except Exception as e:
+                    log.warning(f"Erro ao verificar {operacao['referencia']}: {e}")
+                    continue
+                if terminou:
+                    self._remover(operacao)
+            self._acordar.wait(self.periodo)
+            self._acordar.clear()
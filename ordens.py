@@ -0,0 +1,117 @@
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# Prioridade na fila de envio: fechar antes de ajustar, ajustar antes de abrir
+PRIORIDADE_FECHAMENTO = 0
+PRIORIDADE_ALTERACAO = 1
+PRIORIDADE_ENTRADA = 2
+
+# Despacho de ordens: fila de envio no ritmo da corretora + confirmações em paralelo
+class DespachoOrdens:
+    """
+    Aceita quantas ordens vierem (entradas, fechamentos, alterações de stop/take) e devolve
+    um Future para cada. Uma thread envia em sequência (o agendador da API segura o ritmo
+    de 1 ordem a cada 0,1 s) e cada dealReference é confirmado em /confirms num pool de
+    threads, sem atrasar o envio da próxima ordem.
+    O Future resolve com {'tipo', 'referencia', 'deal_id', 'status', 'resposta',
+    'confirmacao', 'tempos'}; status é o dealStatus (ACCEPTED/REJECTED) ou 'SEM_CONFIRMACAO'.
+    """
+    def __init__(self, api, max_confirmacoes: int = 8, tentativas_confirmacao: int = 5, intervalo_confirmacao: float = 0.2):
+        self.api = api
+        self.tentativas_confirmacao = tentativas_confirmacao
+        self.intervalo_confirmacao = intervalo_confirmacao
+        self._fila = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._confirmacoes = ThreadPoolExecutor(max_workers=max_confirmacoes)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def iniciar(self):
+        self._stop_event.clear()
+        if not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._stop_event.set()
+        self._fila.put((-1, next(self._seq), None))  # acorda a thread de envio
+        self._confirmacoes.shutdown(wait=False)
+
+    def pendentes(self) -> int:
+        return self._fila.qsize()
+
+    def _enfileirar(self, prioridade: int, tipo: str, enviar: Callable[[], Optional[Dict]],
+                    ao_concluir: Optional[Callable[[Future], None]]) -> Future:
+        futuro = Future()
+        if ao_concluir is not None:
+            futuro.add_done_callback(ao_concluir)
+        self.iniciar()
+        self._fila.put((prioridade, next(self._seq), (tipo, enviar, futuro, time.time())))
+        return futuro
+
+    def enviar(self, epic, direcao, tamanho, stop=None, limit=None, ao_concluir=None) -> Future:
+        return self._enfileirar(PRIORIDADE_ENTRADA, 'entrada',
+                                lambda: self.api.enviar_ordem(epic, direcao, tamanho, stop=stop, limit=limit), ao_concluir)
+
+    def fechar(self, deal_id, ao_concluir=None) -> Future:
+        return self._enfileirar(PRIORIDADE_FECHAMENTO, 'fechamento', lambda: self.api.fechar_posicao(deal_id), ao_concluir)
+
+    def alterar(self, deal_id, stop=None, limit=None, ao_concluir=None) -> Future:
+        return self._enfileirar(PRIORIDADE_ALTERACAO, 'alteracao',
+                                lambda: self.api.alterar_posicao(deal_id, stop=stop, limit=limit), ao_concluir)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            _, _, item = self._fila.get()
+            if item is None:
+                continue
+            tipo, enviar, futuro, enfileirada_em = item
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            tempos = {'fila_inicio': enfileirada_em, 'envio_inicio': time.time()}
+            try:
+                resposta = enviar()
+            except Exception as e:
+                futuro.set_exception(e)
+                continue
+            tempos['envio_fim'] = time.time()
+            referencia = (resposta or {}).get('dealReference') or (resposta or {}).get('dealId')
+            if not referencia:
+                futuro.set_exception(Exception(f'Ordem ({tipo}) sem dealReference na resposta: {resposta}'))
+                continue
+            try:
+                self._confirmacoes.submit(self._confirmar, tipo, referencia, resposta, tempos, futuro)
+            except RuntimeError as e:  # pool encerrado
+                futuro.set_exception(e)
+
+    def _confirmar(self, tipo: str, referencia: str, resposta: Dict, tempos: Dict, futuro: Future):
+        try:
+            tempos['confirmacao_inicio'] = time.time()
+            confirmacao = {'status': 'UNKNOWN'}
+            status = 'SEM_CONFIRMACAO'
+            for tentativa in range(self.tentativas_confirmacao):
+                confirmacao = self.api.consultar_ordem(referencia)
+                status = (confirmacao.get('detalhes') or {}).get('dealStatus')
+                if status in ('ACCEPTED', 'REJECTED'):
+                    break
+                time.sleep(self.intervalo_confirmacao)
+            else:
+                status = 'SEM_CONFIRMACAO'
+            tempos['confirmacao_fim'] = time.time()
+            detalhes = confirmacao.get('detalhes') or {}
+            deals = detalhes.get('affectedDeals') or []
+            futuro.set_result({
+                'tipo': tipo,
+                'referencia': referencia,
+                'deal_id': (deals[0].get('dealId') if deals else None) or detalhes.get('dealId'),
+                'status': status,
+                'resposta': resposta,
+                'confirmacao': confirmacao,
+                'tempos': tempos
+            })
+        except Exception as e:
+            futuro.set_exception(e)
@@ -1,5 +1,8 @@
 import threading
 import time
+from logs import obter_logger
+
+log = obter_logger('PACIENCIA')
 
 class Paciencia:
     def __init__(self, get_entrada_executada, trocar_par_callback, get_par_atual, get_proximo_par, tempo_minutos=15):
@@ -23,11 +26,11 @@ class Paciencia:
     def _run(self):
         while not self._stop_event.is_set():
             par = self.get_par_atual()
-            print(f'[PACIENCIA] Iniciando timer de {self.tempo_minutos} minutos para o par {par}...')
+            log.info(f'Iniciando timer de {self.tempo_minutos} minutos para o par {par}...')
             tempo_restante = self.tempo_minutos * 60
             while tempo_restante > 0 and not self._stop_event.is_set():
                 if self.get_entrada_executada():
-                    print(f'[PACIENCIA] Entrada executada em {par}, resetando timer.')
+                    log.info(f'Entrada executada em {par}, resetando timer.')
                     break
                 time.sleep(5)
                 tempo_restante -= 5
@@ -35,7 +38,7 @@ class Paciencia:
                 # Timer acabou sem entrada
                 if not self.get_entrada_executada():
                     proximo = self.get_proximo_par()
-                    print(f'[PACIENCIA] Volume fraco em {par}, pulando para o próximo ativo: {proximo}')
+                    log.info(f'Volume fraco em {par}, pulando para o próximo ativo: {proximo}')
                     self.trocar_par_callback()
             # Aguarda um pouco antes de reiniciar o ciclo
             time.sleep(2) 
\ No newline at end of file
@@ -1,33 +1,108 @@
+import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from metricas import cronometrado, medir
+
+# Pivôs vetorizados sobre arrays NumPy (extremos em janela centrada)
+def calcular_pivos(high: np.ndarray, low: np.ndarray, lookback: int = 5) -> Dict[str, List[int]]:
+    """
+    Topo em i: high[i] é o máximo de high[i - lookback:i + lookback + 1] (fundo: mínimo de low).
+    NaN é ignorado na janela, como no max()/min() do pandas.
+    """
+    janela = 2 * lookback + 1
+    if len(high) < janela:
+        return {'topos': [], 'fundos': []}
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    max_v = sliding_window_view(np.where(np.isnan(high), -np.inf, high), janela).max(axis=1)
+    min_v = sliding_window_view(np.where(np.isnan(low), np.inf, low), janela).min(axis=1)
+    centro = slice(lookback, len(high) - lookback)
+    topos = np.flatnonzero(high[centro] == max_v) + lookback
+    fundos = np.flatnonzero(low[centro] == min_v) + lookback
+    return {'topos': topos.tolist(), 'fundos': fundos.tolist()}
 
 # Função utilitária para identificar pivôs (topos e fundos)
+@cronometrado()
 def encontrar_pivos(df: pd.DataFrame, lookback: int = 5) -> Dict[str, List[int]]:
     """
     Retorna índices de topos e fundos no gráfico.
     """
-    topos = []
-    fundos = []
-    for i in range(lookback, len(df) - lookback):
-        max_v = df['high'].iloc[i - lookback:i + lookback + 1].max()
-        min_v = df['low'].iloc[i - lookback:i + lookback + 1].min()
-        if df['high'].iloc[i] == max_v:
-            topos.append(i)
-        if df['low'].iloc[i] == min_v:
-            fundos.append(i)
-    return {'topos': topos, 'fundos': fundos}
+    return calcular_pivos(df['high'].to_numpy(), df['low'].to_numpy(), lookback)
+
+# Estatísticas com a mesma semântica do pandas (ignora NaN, desvio amostral)
+def _std(valores: np.ndarray) -> float:
+    return float(np.nanstd(valores, ddof=1)) if np.count_nonzero(~np.isnan(valores)) > 1 else float('nan')
+
+def _max(valores: np.ndarray) -> float:
+    return float(np.nanmax(valores)) if not np.all(np.isnan(valores)) else float('nan')
+
+def _min(valores: np.ndarray) -> float:
+    return float(np.nanmin(valores)) if not np.all(np.isnan(valores)) else float('nan')
+
+def _mean(valores: np.ndarray) -> float:
+    return float(np.nanmean(valores)) if not np.all(np.isnan(valores)) else float('nan')
+
+# Contexto compartilhado: tudo que os detectores derivam do DataFrame, calculado uma vez
+class ContextoPadrao:
+    """
+    Arrays OHLC, pivôs (por lookback) e estatísticas de janelas do fim do DataFrame, sob
+    demanda e em cache. Os detectores leem daqui em vez de fatiar o DataFrame cada um; a
+    mesma janela (ex.: a consolidação da bandeira e da flâmula) é calculada uma vez só.
+    """
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.n = len(df)
+        self.open = df['open'].to_numpy(dtype=np.float64)
+        self.high = df['high'].to_numpy(dtype=np.float64)
+        self.low = df['low'].to_numpy(dtype=np.float64)
+        self.close = df['close'].to_numpy(dtype=np.float64)
+        self._pivos = {}
+        self._estatisticas = {}
+
+    def pivos(self, lookback: int = 5) -> Dict[str, List[int]]:
+        if lookback not in self._pivos:
+            self._pivos[lookback] = calcular_pivos(self.high, self.low, lookback)
+        return self._pivos[lookback]
+
+    def ultimos(self, coluna: str, n: int, ate: int = 0) -> np.ndarray:
+        """
+        As n barras de `coluna` que terminam `ate` barras antes da última (view, sem cópia).
+        """
+        fim = self.n - ate
+        return getattr(self, coluna)[max(0, fim - n):fim]
+
+    def _estatistica(self, nome: str, funcao: Callable, coluna: str, n: int, ate: int) -> float:
+        chave = (nome, coluna, n, ate)
+        if chave not in self._estatisticas:
+            self._estatisticas[chave] = funcao(self.ultimos(coluna, n, ate))
+        return self._estatisticas[chave]
+
+    def std(self, coluna: str, n: int, ate: int = 0) -> float:
+        return self._estatistica('std', _std, coluna, n, ate)
+
+    def max(self, coluna: str, n: int, ate: int = 0) -> float:
+        return self._estatistica('max', _max, coluna, n, ate)
+
+    def min(self, coluna: str, n: int, ate: int = 0) -> float:
+        return self._estatistica('min', _min, coluna, n, ate)
+
+    def mean(self, coluna: str, n: int, ate: int = 0) -> float:
+        return self._estatistica('mean', _mean, coluna, n, ate)
 
 # Detecta triângulo (simples, para início)
-def detectar_triangulo(df: pd.DataFrame) -> Dict:
-    pivos = encontrar_pivos(df, lookback=5)
+def detectar_triangulo(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    pivos = ctx.pivos(lookback=5)
     topos = pivos['topos']
     fundos = pivos['fundos']
     if len(topos) < 2 or len(fundos) < 2:
         return {'status': False}
     # Verifica convergência de linhas de tendência
     # (Aperfeiçoar: regressão linear, ângulo, distância entre linhas)
-    ultimos_topos = df['high'].iloc[topos[-2:]].values
-    ultimos_fundos = df['low'].iloc[fundos[-2:]].values
+    ultimos_topos = ctx.high[topos[-2:]]
+    ultimos_fundos = ctx.low[fundos[-2:]]
     if ultimos_topos[1] < ultimos_topos[0] and ultimos_fundos[1] > ultimos_fundos[0]:
         return {
             'status': True,
@@ -38,33 +113,35 @@ def detectar_triangulo(df: pd.DataFrame) -> Dict:
     return {'status': False}
 
 # Detecta bandeira (flag)
-def detectar_bandeira(df: pd.DataFrame) -> Dict:
+def detectar_bandeira(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
     # Critério: forte movimento (mastro) seguido de consolidação inclinada
     n = 20
-    if len(df) < n + 10:
+    if ctx.n < n + 10:
         return {'status': False}
-    mastro = df['close'].iloc[-n-10:-10]
-    consolidacao = df['close'].iloc[-10:]
-    if abs(mastro[-1] - mastro[0]) > 2 * consolidacao.std():
-        inclinacao = consolidacao[-1] - consolidacao[0]
+    mastro = ctx.ultimos('close', n, ate=10)
+    if abs(mastro[-1] - mastro[0]) > 2 * ctx.std('close', 10):
         direcao = 'Alta' if mastro[-1] > mastro[0] else 'Baixa'
         return {
             'status': True,
             'tipo': 'Bandeira',
             'direcao': direcao,
-            'pontos': {'inicio_mastro': len(df)-n-10, 'fim_mastro': len(df)-10, 'consolidacao': (len(df)-10, len(df)-1)}
+            'pontos': {'inicio_mastro': ctx.n-n-10, 'fim_mastro': ctx.n-10, 'consolidacao': (ctx.n-10, ctx.n-1)}
         }
     return {'status': False}
 
 # Detecta OCO (Ombro-Cabeça-Ombro)
-def detectar_oco(df: pd.DataFrame) -> Dict:
-    pivos = encontrar_pivos(df, lookback=5)
+def detectar_oco(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    pivos = ctx.pivos(lookback=5)
     topos = pivos['topos']
     if len(topos) < 3:
         return {'status': False}
     # Padrão: topo-esquerda < topo-central > topo-direita (simples)
     h, c, d = topos[-3:]
-    v_h, v_c, v_d = df['high'].iloc[[h, c, d]]
+    v_h, v_c, v_d = ctx.high[[h, c, d]]
     if v_c > v_h and v_c > v_d and abs(v_h - v_d) / v_c < 0.05:
         return {
             'status': True,
@@ -75,30 +152,34 @@ def detectar_oco(df: pd.DataFrame) -> Dict:
     return {'status': False}
 
 # Detecta retângulo (consolidação)
-def detectar_retangulo(df: pd.DataFrame) -> Dict:
+def detectar_retangulo(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
     n = 20
-    if len(df) < n:
+    if ctx.n < n:
         return {'status': False}
-    max_v = df['high'].iloc[-n:].max()
-    min_v = df['low'].iloc[-n:].min()
+    max_v = ctx.max('high', n)
+    min_v = ctx.min('low', n)
     if (max_v - min_v) / min_v < 0.01:  # amplitude pequena
         return {
             'status': True,
             'tipo': 'Retângulo',
             'direcao': 'Lateral',
-            'pontos': {'max': max_v, 'min': min_v, 'inicio': len(df)-n, 'fim': len(df)-1}
+            'pontos': {'max': max_v, 'min': min_v, 'inicio': ctx.n-n, 'fim': ctx.n-1}
         }
     return {'status': False}
 
 # Triângulo Ascendente
-def detectar_triangulo_ascendente(df: pd.DataFrame) -> Dict:
-    pivos = encontrar_pivos(df, lookback=5)
+def detectar_triangulo_ascendente(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    pivos = ctx.pivos(lookback=5)
     topos = pivos['topos']
     fundos = pivos['fundos']
     if len(topos) < 2 or len(fundos) < 2:
         return {'status': False}
-    ultimos_topos = df['high'].iloc[topos[-2:]].values
-    ultimos_fundos = df['low'].iloc[fundos[-2:]].values
+    ultimos_topos = ctx.high[topos[-2:]]
+    ultimos_fundos = ctx.low[fundos[-2:]]
     if abs(ultimos_topos[1] - ultimos_topos[0]) < 1e-5 and ultimos_fundos[1] > ultimos_fundos[0]:
         return {
             'status': True,
@@ -109,14 +190,16 @@ def detectar_triangulo_ascendente(df: pd.DataFrame) -> Dict:
     return {'status': False}
 
 # Triângulo Descendente
-def detectar_triangulo_descendente(df: pd.DataFrame) -> Dict:
-    pivos = encontrar_pivos(df, lookback=5)
+def detectar_triangulo_descendente(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    pivos = ctx.pivos(lookback=5)
     topos = pivos['topos']
     fundos = pivos['fundos']
     if len(topos) < 2 or len(fundos) < 2:
         return {'status': False}
-    ultimos_topos = df['high'].iloc[topos[-2:]].values
-    ultimos_fundos = df['low'].iloc[fundos[-2:]].values
+    ultimos_topos = ctx.high[topos[-2:]]
+    ultimos_fundos = ctx.low[fundos[-2:]]
     if ultimos_topos[1] < ultimos_topos[0] and abs(ultimos_fundos[1] - ultimos_fundos[0]) < 1e-5:
         return {
             'status': True,
@@ -127,33 +210,36 @@ def detectar_triangulo_descendente(df: pd.DataFrame) -> Dict:
     return {'status': False}
 
 # Flâmula (Pennant)
-def detectar_flamula(df: pd.DataFrame) -> Dict:
+def detectar_flamula(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
     n = 20
-    if len(df) < n + 10:
+    if ctx.n < n + 10:
         return {'status': False}
-    mastro = df['close'].iloc[-n-10:-10]
-    consolidacao = df['close'].iloc[-10:]
-    if abs(mastro[-1] - mastro[0]) > 2 * consolidacao.std():
+    mastro = ctx.ultimos('close', n, ate=10)
+    if abs(mastro[-1] - mastro[0]) > 2 * ctx.std('close', 10):
         # Flâmula: consolidação curta e inclinada, menor que bandeira
-        if consolidacao.max() - consolidacao.min() < (mastro.max() - mastro.min()) * 0.3:
+        if ctx.max('close', 10) - ctx.min('close', 10) < (ctx.max('close', n, ate=10) - ctx.min('close', n, ate=10)) * 0.3:
             direcao = 'Alta' if mastro[-1] > mastro[0] else 'Baixa'
             return {
                 'status': True,
                 'tipo': 'Flâmula',
                 'direcao': direcao,
-                'pontos': {'inicio_mastro': len(df)-n-10, 'fim_mastro': len(df)-10, 'consolidacao': (len(df)-10, len(df)-1)}
+                'pontos': {'inicio_mastro': ctx.n-n-10, 'fim_mastro': ctx.n-10, 'consolidacao': (ctx.n-10, ctx.n-1)}
             }
     return {'status': False}
 
 # Cunha de Alta (Rising Wedge)
-def detectar_cunha_alta(df: pd.DataFrame) -> Dict:
-    pivos = encontrar_pivos(df, lookback=5)
+def detectar_cunha_alta(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    pivos = ctx.pivos(lookback=5)
     topos = pivos['topos']
     fundos = pivos['fundos']
     if len(topos) < 2 or len(fundos) < 2:
         return {'status': False}
-    ultimos_topos = df['high'].iloc[topos[-2:]].values
-    ultimos_fundos = df['low'].iloc[fundos[-2:]].values
+    ultimos_topos = ctx.high[topos[-2:]]
+    ultimos_fundos = ctx.low[fundos[-2:]]
     if ultimos_topos[1] > ultimos_topos[0] and ultimos_fundos[1] > ultimos_fundos[0] and (ultimos_topos[1] - ultimos_topos[0]) < (ultimos_fundos[1] - ultimos_fundos[0]):
         return {
             'status': True,
@@ -164,14 +250,16 @@ def detectar_cunha_alta(df: pd.DataFrame) -> Dict:
     return {'status': False}
 
 # Cunha de Baixa (Falling Wedge)
-def detectar_cunha_baixa(df: pd.DataFrame) -> Dict:
-    pivos = encontrar_pivos(df, lookback=5)
+def detectar_cunha_baixa(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    pivos = ctx.pivos(lookback=5)
     topos = pivos['topos']
     fundos = pivos['fundos']
     if len(topos) < 2 or len(fundos) < 2:
         return {'status': False}
-    ultimos_topos = df['high'].iloc[topos[-2:]].values
-    ultimos_fundos = df['low'].iloc[fundos[-2:]].values
+    ultimos_topos = ctx.high[topos[-2:]]
+    ultimos_fundos = ctx.low[fundos[-2:]]
     if ultimos_topos[1] < ultimos_topos[0] and ultimos_fundos[1] < ultimos_fundos[0] and abs(ultimos_topos[1] - ultimos_topos[0]) < abs(ultimos_fundos[1] - ultimos_fundos[0]):
         return {
             'status': True,
@@ -182,14 +270,16 @@ def detectar_cunha_baixa(df: pd.DataFrame) -> Dict:
     return {'status': False}
 
 # Canal de Alta
-def detectar_canal_alta(df: pd.DataFrame) -> Dict:
-    pivos = encontrar_pivos(df, lookback=5)
+def detectar_canal_alta(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    pivos = ctx.pivos(lookback=5)
     topos = pivos['topos']
     fundos = pivos['fundos']
     if len(topos) < 2 or len(fundos) < 2:
         return {'status': False}
-    ultimos_topos = df['high'].iloc[topos[-2:]].values
-    ultimos_fundos = df['low'].iloc[fundos[-2:]].values
+    ultimos_topos = ctx.high[topos[-2:]]
+    ultimos_fundos = ctx.low[fundos[-2:]]
     if ultimos_topos[1] > ultimos_topos[0] and ultimos_fundos[1] > ultimos_fundos[0]:
         return {
             'status': True,
@@ -200,14 +290,16 @@ def detectar_canal_alta(df: pd.DataFrame) -> Dict:
     return {'status': False}
 
 # Canal de Baixa
-def detectar_canal_baixa(df: pd.DataFrame) -> Dict:
-    pivos = encontrar_pivos(df, lookback=5)
+def detectar_canal_baixa(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    pivos = ctx.pivos(lookback=5)
     topos = pivos['topos']
     fundos = pivos['fundos']
     if len(topos) < 2 or len(fundos) < 2:
         return {'status': False}
-    ultimos_topos = df['high'].iloc[topos[-2:]].values
-    ultimos_fundos = df['low'].iloc[fundos[-2:]].values
+    ultimos_topos = ctx.high[topos[-2:]]
+    ultimos_fundos = ctx.low[fundos[-2:]]
     if ultimos_topos[1] < ultimos_topos[0] and ultimos_fundos[1] < ultimos_fundos[0]:
         return {
             'status': True,
@@ -218,12 +310,14 @@ def detectar_canal_baixa(df: pd.DataFrame) -> Dict:
     return {'status': False}
 
 # Topo Duplo
-def detectar_topo_duplo(df: pd.DataFrame) -> Dict:
-    pivos = encontrar_pivos(df, lookback=5)
+def detectar_topo_duplo(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    pivos = ctx.pivos(lookback=5)
     topos = pivos['topos']
     if len(topos) < 2:
         return {'status': False}
-    v1, v2 = df['high'].iloc[topos[-2:]]
+    v1, v2 = ctx.high[topos[-2:]]
     if abs(v1 - v2) / v1 < 0.01:
         return {
             'status': True,
@@ -234,12 +328,14 @@ def detectar_topo_duplo(df: pd.DataFrame) -> Dict:
     return {'status': False}
 
 # Fundo Duplo
-def detectar_fundo_duplo(df: pd.DataFrame) -> Dict:
-    pivos = encontrar_pivos(df, lookback=5)
+def detectar_fundo_duplo(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    pivos = ctx.pivos(lookback=5)
     fundos = pivos['fundos']
     if len(fundos) < 2:
         return {'status': False}
-    v1, v2 = df['low'].iloc[fundos[-2:]]
+    v1, v2 = ctx.low[fundos[-2:]]
     if abs(v1 - v2) / v1 < 0.01:
         return {
             'status': True,
@@ -250,30 +346,34 @@ def detectar_fundo_duplo(df: pd.DataFrame) -> Dict:
     return {'status': False}
 
 # Cup and Handle (Xícara com Alça)
-def detectar_cup_handle(df: pd.DataFrame) -> Dict:
+def detectar_cup_handle(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
     n = 30
-    if len(df) < n + 10:
+    if ctx.n < n + 10:
         return {'status': False}
-    min_v = df['low'].iloc[-n-10:-10].min()
-    max_v = df['high'].iloc[-n-10:-10].max()
-    alca = df['close'].iloc[-10:]
-    if (df['close'].iloc[-n-10] > min_v and df['close'].iloc[-10] > min_v and max_v - min_v > 2 * alca.std() and alca.mean() > min_v):
+    min_v = ctx.min('low', n, ate=10)
+    max_v = ctx.max('high', n, ate=10)
+    if (ctx.close[-n-10] > min_v and ctx.close[-10] > min_v and max_v - min_v > 2 * ctx.std('close', 10)
+            and ctx.mean('close', 10) > min_v):
         return {
             'status': True,
             'tipo': 'Cup and Handle',
             'direcao': 'Alta',
-            'pontos': {'inicio': len(df)-n-10, 'fundo': min_v, 'alca': (len(df)-10, len(df)-1)}
+            'pontos': {'inicio': ctx.n-n-10, 'fundo': min_v, 'alca': (ctx.n-10, ctx.n-1)}
         }
     return {'status': False}
 
 # OCO Invertido
-def detectar_oco_invertido(df: pd.DataFrame) -> Dict:
-    pivos = encontrar_pivos(df, lookback=5)
+def detectar_oco_invertido(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    pivos = ctx.pivos(lookback=5)
     fundos = pivos['fundos']
     if len(fundos) < 3:
         return {'status': False}
     h, c, d = fundos[-3:]
-    v_h, v_c, v_d = df['low'].iloc[[h, c, d]]
+    v_h, v_c, v_d = ctx.low[[h, c, d]]
     if v_c < v_h and v_c < v_d and abs(v_h - v_d) / v_c < 0.05:
         return {
             'status': True,
@@ -284,41 +384,88 @@ def detectar_oco_invertido(df: pd.DataFrame) -> Dict:
     return {'status': False}
 
 # Engolfo de Alta/Baixa (candlestick)
-def detectar_engolfo(df: pd.DataFrame) -> Dict:
-    if len(df) < 2:
+def detectar_engolfo(df: pd.DataFrame, ctx: Optional[ContextoPadrao] = None) -> Dict:
+    if ctx is None:
+        ctx = ContextoPadrao(df)
+    if ctx.n < 2:
         return {'status': False}
-    o1, c1 = df['open'].iloc[-2], df['close'].iloc[-2]
-    o2, c2 = df['open'].iloc[-1], df['close'].iloc[-1]
+    o1, c1 = ctx.open[-2], ctx.close[-2]
+    o2, c2 = ctx.open[-1], ctx.close[-1]
     if c1 < o1 and c2 > o2 and c2 > o1 and o2 < c1:
         return {
             'status': True,
             'tipo': 'Engolfo de Alta',
             'direcao': 'Alta',
-            'pontos': {'candle1': len(df)-2, 'candle2': len(df)-1}
+            'pontos': {'candle1': ctx.n-2, 'candle2': ctx.n-1}
         }
     if c1 > o1 and c2 < o2 and c2 < o1 and o2 > c1:
         return {
             'status': True,
             'tipo': 'Engolfo de Baixa',
             'direcao': 'Baixa',
-            'pontos': {'candle1': len(df)-2, 'candle2': len(df)-1}
+            'pontos': {'candle1': ctx.n-2, 'candle2': ctx.n-1}
         }
     return {'status': False}
 
-# Função principal: retorna todos os padrões detectados
-def detectar_padroes(df: pd.DataFrame) -> List[Dict]:
-    padroes = []
-    funcoes = [
-        detectar_triangulo, detectar_triangulo_ascendente, detectar_triangulo_descendente,
-        detectar_bandeira, detectar_flamula,
-        detectar_oco, detectar_oco_invertido,
-        detectar_retangulo, detectar_cunha_alta, detectar_cunha_baixa,
-        detectar_canal_alta, detectar_canal_baixa,
-        detectar_topo_duplo, detectar_fundo_duplo,
-        detectar_cup_handle, detectar_engolfo
-    ]
-    for func in funcoes:
-        resultado = func(df)
-        if resultado.get('status'):
+# Registro de detectores: (função, confiança base). A ordem de registro é a ordem de execução.
+DETECTORES: List[Dict] = []
+
+def registrar_detector(func: Optional[Callable] = None, confianca: float = 0.5, nome: Optional[str] = None):
+    """
+    Registra um detector f(df, ctx) -> Dict. Pode ser usado direto ou como decorator:
+    @registrar_detector(confianca=0.6). O detector deve ler do ctx (arrays e pivôs já
+    calculados) em vez de percorrer o DataFrame inteiro.
+    """
+    def registrar(f):
+        DETECTORES.append({'funcao': f, 'confianca': confianca, 'nome': nome or f.__name__})
+        return f
+    return registrar(func) if func is not None else registrar
+
+for _func, _confianca in [
+    (detectar_triangulo, 0.55), (detectar_triangulo_ascendente, 0.65), (detectar_triangulo_descendente, 0.65),
+    (detectar_bandeira, 0.6), (detectar_flamula, 0.6),
+    (detectar_oco, 0.75), (detectar_oco_invertido, 0.75),
+    (detectar_retangulo, 0.45), (detectar_cunha_alta, 0.6), (detectar_cunha_baixa, 0.6),
+    (detectar_canal_alta, 0.5), (detectar_canal_baixa, 0.5),
+    (detectar_topo_duplo, 0.7), (detectar_fundo_duplo, 0.7),
+    (detectar_cup_handle, 0.65), (detectar_engolfo, 0.4)
+]:
+    registrar_detector(_func, confianca=_confianca)
+
+# Pipeline: contexto montado uma vez, detectores registrados rodam sobre ele
+class PipelinePadroes:
+    """
+    modo='primeiro': para no primeiro detector que encontrar padrão (ordem de registro).
+    modo='todos': roda todos e retorna os padrões na ordem de registro; ordenar=True
+    ordena por confiança (maior primeiro).
+    """
+    def __init__(self, detectores: Optional[List[Dict]] = None):
+        # Sem lista própria usa o registro global, incluindo plugins registrados depois
+        self.detectores = DETECTORES if detectores is None else detectores
+
+    def executar(self, df: pd.DataFrame, modo: str = 'todos', ctx: Optional[ContextoPadrao] = None,
+                 ordenar: bool = False) -> List[Dict]:
+        if modo not in ('primeiro', 'todos'):
+            raise ValueError(f"Modo inválido: {modo}")
+        if ctx is None:
+            ctx = ContextoPadrao(df)
+        padroes = []
+        for detector in self.detectores:
+            with medir(f"padrao.{detector['nome']}"):
+                resultado = detector['funcao'](df, ctx)
+            if not resultado.get('status'):
+                continue
+            resultado.setdefault('confianca', detector['confianca'])
+            if modo == 'primeiro':
+                return [resultado]
             padroes.append(resultado)
-    return padroes 
\ No newline at end of file
+        if ordenar:
+            padroes.sort(key=lambda p: p['confianca'], reverse=True)
+        return padroes
+
+_pipeline = PipelinePadroes()
+
+# Função principal: retorna os padrões detectados
+@cronometrado()
+def detectar_padroes(df: pd.DataFrame, modo: str = 'todos', ordenar: bool = False) -> List[Dict]:
+    return _pipeline.executar(df, modo=modo, ordenar=ordenar)
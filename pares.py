@@ -0,0 +1,24 @@
+# Mapeamento símbolo -> epic real Capital.com (apenas para envio de ordem)
+SYMBOL_TO_EPIC = {
+    'EURUSD': 'EURUSD',
+    'GBPUSD': 'GBPUSD',
+    'USDJPY': 'USDJPY',
+    'EURJPY': 'EURJPY',
+    'GBPJPY': 'GBPJPY',
+    'BTCUSD': 'BTCUSD',
+    'ETHUSD': 'ETHUSD',
+    # Adicione outros conforme necessário
+}
+
+# Pares padrão para análise (usados para TradingView e análise)
+PARES_PADRAO = [
+    'EURUSD', 'GBPUSD', 'USDJPY', 'EURJPY', 'GBPJPY', 'BTCUSD', 'ETHUSD'
+]
+
+# Abertura da sessão diária por par (fuso, HH:MM): ancora as barras H4/D1 montadas a partir de M1.
+# Forex vira o dia às 17:00 de Nova York; cripto negocia 24/7 e vira à meia-noite UTC.
+SESSAO_PADRAO = ('America/New_York', '17:00')
+SESSOES = {
+    'BTCUSD': ('UTC', '00:00'),
+    'ETHUSD': ('UTC', '00:00'),
+}
@@ -0,0 +1,37 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Marco zero: o primeiro módulo do projeto importado (lucelo importa este antes de tudo)
+INICIO = time.perf_counter()
+
+# Relatório de tempo de partida: cada etapa com o instante desde INICIO e sua duração
+class RelatorioPartida:
+    def __init__(self, inicio: float = INICIO):
+        self.inicio = inicio
+        self.etapas = []  # (nome, segundos desde o início, duração ou None)
+        self._lock = threading.Lock()
+
+    def marcar(self, etapa: str, duracao: float = None) -> float:
+        decorrido = time.perf_counter() - self.inicio
+        with self._lock:
+            if not any(nome == etapa for nome, _, _ in self.etapas):
+                self.etapas.append((etapa, decorrido, duracao))
+        return decorrido
+
+    @contextmanager
+    def medir(self, etapa: str):
+        # Só registra se a etapa terminar sem erro
+        t0 = time.perf_counter()
+        yield
+        self.marcar(etapa, time.perf_counter() - t0)
+
+    def imprimir(self):
+        with self._lock:
+            etapas = sorted(self.etapas, key=lambda e: e[1])
+        from logs import obter_logger  # aqui e não no topo: INICIO tem de ser o primeiro instante
+        linhas = ["Tempo de partida:"]
+        for nome, decorrido, duracao in etapas:
+            detalhe = f" (levou {duracao*1000:.0f} ms)" if duracao is not None else ''
+            linhas.append(f"  +{decorrido*1000:8.0f} ms  {nome}{detalhe}")
+        obter_logger('PARTIDA').info('\n'.join(linhas))
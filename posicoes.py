@@ -0,0 +1,107 @@
+import threading
+import time
+from typing import Dict, List, Optional
+from capital_api import indexar_posicoes, extrair_lista_posicoes
+from logs import obter_logger
+
+log = obter_logger('POSIÇÕES')
+
+# Foto compartilhada das posições abertas: um poller, leituras O(1) por dealId ou epic
+class CachePosicoes:
+    """
+    Uma única thread baixa /positions a cada `periodo` segundos e reconstrói os índices;
+    qualquer número de monitores lê daqui sem gerar requisições. O custo na API é
+    constante, não cresce com o número de operações abertas.
+    """
+    def __init__(self, api, periodo: float = 5.0):
+        self.api = api
+        self.periodo = periodo
+        self.atualizado_em = 0.0
+        self.erro = None  # última falha do poller (None se a última atualização deu certo)
+        self._por_deal: Dict[str, Dict] = {}
+        self._por_epic: Dict[str, List[Dict]] = {}
+        self._lista: List[Dict] = []
+        self._cond = threading.Condition()
+        self._pedido = threading.Event()  # pede uma atualização antes do período
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def iniciar(self):
+        self._stop_event.clear()
+        if not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._stop_event.set()
+        self._pedido.set()
+
+    def atualizar(self):
+        """
+        Baixa as posições agora e troca os índices de uma vez (leitores nunca veem meio termo).
+        """
+        data = self.api.baixar_posicoes()
+        por_deal, por_epic = indexar_posicoes(data)
+        lista = extrair_lista_posicoes(data)
+        with self._cond:
+            self._por_deal, self._por_epic, self._lista = por_deal, por_epic, lista
+            self.atualizado_em = time.time()
+            self.erro = None
+            self._cond.notify_all()
+
+    def solicitar_atualizacao(self):
+        """
+        Antecipa a próxima atualização (ex.: logo após enviar ou fechar uma ordem).
+        """
+        self._pedido.set()
+
+    def aguardar_atualizacao(self, timeout: Optional[float] = None) -> bool:
+        """
+        Bloqueia até a próxima atualização concluída. Retorna False se o tempo acabar.
+        """
+        with self._cond:
+            anterior = self.atualizado_em
+            return self._cond.wait_for(lambda: self.atualizado_em > anterior, timeout)
+
+    def _garantir_primeira(self):
+        # Antes da primeira foto, quem lê espera por ela
+        if self.atualizado_em == 0.0:
+            self.solicitar_atualizacao()
+            self.aguardar_atualizacao(timeout=self.api.timeout)
+
+    def obter(self, deal_id: Optional[str] = None, epic: Optional[str] = None) -> Dict:
+        """
+        Mesmo formato de CapitalAPI.consultar_posicao_aberta: status 'OPEN' ou 'NOT_FOUND'.
+        """
+        self._garantir_primeira()
+        with self._cond:
+            if deal_id and deal_id in self._por_deal:
+                return self._por_deal[deal_id]
+            if epic and self._por_epic.get(epic):
+                return self._por_epic[epic][0]
+            if self.atualizado_em == 0.0:
+                return {'status': 'UNKNOWN', 'erro': self.erro}
+        return {'status': 'NOT_FOUND'}
+
+    def por_epic(self, epic: str) -> List[Dict]:
+        self._garantir_primeira()
+        with self._cond:
+            return list(self._por_epic.get(epic, []))
+
+    def listar(self) -> List[Dict]:
+        """
+        Mesmo formato de CapitalAPI.listar_posicoes_abertas.
+        """
+        self._garantir_primeira()
+        with self._cond:
+            return list(self._lista)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.atualizar()
+            except Exception as e:
+                self.erro = str(e)
+                log.warning(f"Erro ao atualizar posições: {e}")
+            self._pedido.wait(self.periodo)
+            self._pedido.clear()
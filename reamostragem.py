@@ -0,0 +1,238 @@
+import itertools
+import threading
+import numpy as np
+import pandas as pd
+from dateutil import tz
+from typing import Dict, Optional
+from barras import COLUNAS, SerieBarras, segundos_intervalo
+
+SEGUNDOS_BASE = 60  # barras base: M1
+
+def derivavel(intervalo) -> bool:
+    """
+    True para os tempos gráficos que dá para montar a partir de M1 e que dividem o dia
+    (M5, M15, M30, H1, H4, D1...). Semanal e mensal não.
+    """
+    try:
+        segundos = segundos_intervalo(intervalo)
+    except ValueError:
+        return False
+    return SEGUNDOS_BASE < segundos <= 86400 and 86400 % segundos == 0
+
+# Âncora das barras: abertura da sessão diária, no fuso da sessão
+class Sessao:
+    """
+    O dia de negociação começa na abertura da sessão no fuso dela (segue o horário de verão
+    de lá); barras de N minutos/horas contam N em tempo corrido a partir dessa abertura e a
+    última do dia é cortada na abertura seguinte. Na volta do horário de verão a hora
+    repetida vira duas barras H1 (como o pandas.resample), e o dia D1 tem 25h. O rótulo de
+    cada barra é o instante de abertura, no mesmo relógio dos dados. fuso=None: sem fuso,
+    dia a partir da meia-noite do próprio relógio dos dados. fuso_dados=None: relógio local
+    da máquina (o tvDatafeed devolve os tempos assim).
+    """
+    def __init__(self, fuso: Optional[str] = None, abertura: str = '00:00', fuso_dados=None):
+        self.fuso = fuso
+        self.abertura = pd.Timedelta(f'{abertura}:00')
+        self.fuso_dados = fuso_dados if fuso_dados is not None else tz.tzlocal()
+
+    def _instantes(self, tempos) -> pd.DatetimeIndex:
+        indice = pd.DatetimeIndex(np.asarray(tempos, dtype='datetime64[ns]'))
+        if self.fuso is None:
+            return indice
+        # Hora repetida na volta do horário de verão do relógio dos dados: assume o horário padrão
+        return indice.tz_localize(self.fuso_dados, ambiguous=False, nonexistent='shift_forward').tz_convert(self.fuso)
+
+    def _relogio_dados(self, instantes: pd.DatetimeIndex) -> np.ndarray:
+        if self.fuso is None:
+            return instantes.values
+        return instantes.tz_convert(self.fuso_dados).tz_localize(None).values
+
+    def _aberturas(self, instantes: pd.DatetimeIndex, dias: int = 0) -> pd.DatetimeIndex:
+        # Abertura do dia de negociação de cada instante (+ `dias`), no relógio de parede da sessão
+        parede = instantes if self.fuso is None else instantes.tz_localize(None)
+        aberturas = (parede - self.abertura).floor('D') + self.abertura + pd.Timedelta(days=dias)
+        if self.fuso is None:
+            return aberturas
+        # Abertura repetida: a primeira; inexistente: o instante em que o relógio pula
+        return aberturas.tz_localize(self.fuso, ambiguous=np.ones(len(aberturas), dtype=bool),
+                                     nonexistent='shift_forward')
+
+    def inicios(self, tempos, segundos: int) -> np.ndarray:
+        """
+        Abertura (datetime64[ns]) da barra de `segundos` que contém cada tempo.
+        """
+        instantes = self._instantes(tempos)
+        aberturas = self._aberturas(instantes)
+        if segundos < 86400:
+            passo = pd.Timedelta(seconds=segundos)
+            aberturas = aberturas + (instantes - aberturas) // passo * passo
+        return self._relogio_dados(aberturas)
+
+    def fins(self, inicios, segundos: int) -> np.ndarray:
+        """
+        Abertura (datetime64[ns]) da barra seguinte à que abre em cada um de `inicios`.
+        """
+        instantes = self._instantes(inicios)
+        seguintes = self._aberturas(instantes, dias=1)
+        if segundos < 86400:
+            seguintes = seguintes.where(seguintes < instantes + pd.Timedelta(seconds=segundos),
+                                        instantes + pd.Timedelta(seconds=segundos))
+        return self._relogio_dados(seguintes)
+
+def reamostrar(df: pd.DataFrame, intervalo, sessao: Optional[Sessao] = None) -> pd.DataFrame:
+    """
+    Reamostra de uma vez um DataFrame OHLCV (M1 ou menor), com o mesmo alinhamento do
+    Reamostrador. A última barra sai parcial se o período dela ainda não terminou.
+    """
+    sessao = sessao or Sessao()
+    if df is None or len(df) == 0:
+        return pd.DataFrame(columns=COLUNAS, index=pd.DatetimeIndex([], name='datetime'))
+    grupos = sessao.inicios(df.index.values, segundos_intervalo(intervalo))
+    agregado = df.reindex(columns=COLUNAS).groupby(grupos, sort=True).agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    agregado.index = pd.DatetimeIndex(agregado.index, name='datetime')
+    return agregado
+
+def _juntar(a, b):
+    # Barra OHLCV a seguida de b (a pode ser None)
+    if a is None:
+        return list(b)
+    return [a[0], max(a[1], b[1]), min(a[2], b[2]), b[3], a[4] + b[4]]
+
+# Tempos gráficos de um par montados incrementalmente a partir das M1 (ou de ticks)
+class Reamostrador:
+    """
+    Cada tempo gráfico registrado grava na própria SerieBarras. Cada M1 que chega (nova ou
+    atualização da M1 em formação) atualiza a barra em formação de todos eles em O(1):
+    agregado das M1 já fechadas do período + a M1 atual. A última barra de cada série fica
+    parcial até chegar uma M1 do período seguinte (ver parcial()).
+    """
+    def __init__(self, sessao: Optional[Sessao] = None):
+        self.sessao = sessao or Sessao()
+        self._estados = {}  # intervalo -> estado da barra em formação
+        self._m1_ticks = None  # M1 em formação montada de ticks: [tempo, o, h, l, c, v]
+        self._lock = threading.RLock()
+
+    def registrar(self, intervalo, serie: SerieBarras, base: Optional[SerieBarras] = None) -> bool:
+        """
+        Passa a montar `serie` a partir das M1. Se a série já tem histórico (ex.: baixado uma
+        vez da rede), a última barra precisa estar alinhada à sessão e `base` precisa ter as M1
+        do período dela inteiro, que refazem a barra em formação. Retorna False se não der
+        para derivar (quem chamou continua buscando esse tempo gráfico na rede).
+        """
+        if not derivavel(intervalo):
+            return False
+        segundos = segundos_intervalo(intervalo)
+        estado = {'serie': serie, 'segundos': segundos, 'inicio': None, 'fim': None, 'fechadas': None,
+                  'tempo_m1': None, 'm1': None, 'alteradas': 0}
+        ultimo = serie.ultimo_tempo()
+        with self._lock:
+            if ultimo is None:
+                self._estados[intervalo] = estado
+                return True
+            if base is None or len(base) == 0 or self.sessao.inicios([ultimo], segundos)[0] != ultimo:
+                return False
+            tempos, valores = base.arrays()
+            if tempos[0] > ultimo or tempos[-1] < ultimo:
+                return False
+            desde = int(np.searchsorted(tempos, ultimo, side='left'))
+            self._processar(estado, tempos[desde:], valores[desde:])
+            self._estados[intervalo] = estado
+            return True
+
+    def registrado(self, intervalo) -> bool:
+        return intervalo in self._estados
+
+    def descartar(self, intervalo=None):
+        """
+        Para de derivar `intervalo` (ou todos): a base ficou com lacuna e precisa ressemear.
+        """
+        with self._lock:
+            if intervalo is None:
+                self._estados.clear()
+            else:
+                self._estados.pop(intervalo, None)
+
+    def _processar(self, estado: Dict, tempos: np.ndarray, valores: np.ndarray) -> int:
+        # M1 anteriores à última vista são ignoradas (a mesma M1 de novo é atualização)
+        if estado['tempo_m1'] is not None:
+            desde = int(np.searchsorted(tempos, estado['tempo_m1'], side='left'))
+            tempos, valores = tempos[desde:], valores[desde:]
+        if len(tempos) == 0:
+            return 0
+        if len(tempos) <= 2 and estado['inicio'] is not None and tempos[0] >= estado['inicio'] and tempos[-1] < self._fim(estado):
+            # Streaming: M1 dentro do período em formação não recalcula o alinhamento (fusos custam caro)
+            inicios = itertools.repeat(estado['inicio'])
+        else:
+            inicios = self.sessao.inicios(tempos, estado['segundos'])
+        alteradas = 0
+        for tempo, inicio, m1 in zip(tempos, inicios, valores.tolist()):
+            if tempo != estado['tempo_m1'] and estado['m1'] is not None:
+                # M1 anterior fechou: entra no agregado do período dela
+                estado['fechadas'] = _juntar(estado['fechadas'], estado['m1'])
+            if inicio != estado['inicio']:
+                estado['inicio'], estado['fim'], estado['fechadas'] = inicio, None, None
+            estado['tempo_m1'], estado['m1'] = tempo, m1
+            if estado['serie'].anexar(inicio, _juntar(estado['fechadas'], m1)):
+                alteradas += 1
+        estado['alteradas'] += alteradas
+        return alteradas
+
+    def _fim(self, estado: Dict) -> np.datetime64:
+        # Abertura do período seguinte, calculada uma vez por período
+        if estado['fim'] is None:
+            estado['fim'] = self.sessao.fins([estado['inicio']], estado['segundos'])[0]
+        return estado['fim']
+
+    def adicionar_barras(self, tempos, valores) -> Dict[object, int]:
+        """
+        M1 em ordem (tempos datetime64, valores n x 5 OHLCV). Retorna {intervalo: barras alteradas}.
+        """
+        tempos = np.asarray(tempos, dtype='datetime64[ns]')
+        valores = np.asarray(valores, dtype=np.float64).reshape(len(tempos), len(COLUNAS))
+        with self._lock:
+            return {intervalo: self._processar(estado, tempos, valores) for intervalo, estado in self._estados.items()}
+
+    def sincronizar(self, base: SerieBarras) -> Dict[object, int]:
+        """
+        Processa as M1 da série base que ainda não foram vistas, inclusive a em formação.
+        """
+        return self.adicionar_barras(*base.arrays())
+
+    def adicionar_cotacao(self, tempo, preco: float, volume: float = 1.0) -> Dict[object, int]:
+        """
+        Tick (ex.: cotação do streaming) -> M1 em formação -> tempos gráficos registrados.
+        volume=1 por tick dá o volume em ticks, como o dos feeds de forex.
+        """
+        minuto = np.datetime64(pd.Timestamp(tempo).floor('min').to_datetime64(), 'ns')
+        with self._lock:
+            m1 = self._m1_ticks
+            if m1 is None or minuto > m1[0]:
+                m1 = self._m1_ticks = [minuto, preco, preco, preco, preco, volume]
+            elif minuto == m1[0]:
+                m1[2], m1[3], m1[4] = max(m1[2], preco), min(m1[3], preco), preco
+                m1[5] += volume
+            else:
+                return {}
+            return self.adicionar_barras([m1[0]], [m1[1:]])
+
+    def alteradas(self, intervalo) -> int:
+        """
+        Barras do intervalo alteradas desde a última consulta (zera o contador).
+        """
+        with self._lock:
+            estado = self._estados.get(intervalo)
+            if estado is None:
+                return 0
+            alteradas, estado['alteradas'] = estado['alteradas'], 0
+            return alteradas
+
+    def parcial(self, intervalo) -> bool:
+        """
+        True se a última barra do intervalo ainda não recebeu a última M1 do período.
+        """
+        with self._lock:
+            estado = self._estados.get(intervalo)
+            if estado is None or estado['inicio'] is None:
+                return False
+            return estado['tempo_m1'] + np.timedelta64(SEGUNDOS_BASE, 's') < self._fim(estado)
@@ -0,0 +1,558 @@
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import math
+import random
+import struct
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Optional
+from urllib.parse import urlparse, parse_qs
+from agendador import BaldeTokens, LIMITES
+
+# Servidor local que imita a API da Capital.com (REST + WebSocket) para testes de carga e benchmark.
+# Uso: python servidor_simulado.py --porta 8765, e no bot:
+#   CAPITAL_BASE_URL=http://127.0.0.1:8765 CAPITAL_STREAM_URL=ws://127.0.0.1:8765/connect
+
+PRECOS_INICIAIS = {
+    'EURUSD': 1.08, 'GBPUSD': 1.27, 'USDJPY': 150.0, 'EURJPY': 162.0,
+    'GBPJPY': 190.0, 'BTCUSD': 60000.0, 'ETHUSD': 3000.0
+}
+SEGUNDOS_RESOLUCAO = {'MINUTE': 60, 'MINUTE_5': 300, 'MINUTE_15': 900, 'MINUTE_30': 1800,
+                      'HOUR': 3600, 'HOUR_4': 14400, 'DAY': 86400, 'WEEK': 604800}
+GUID_WEBSOCKET = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'  # RFC 6455
+MAX_EPICS_STREAMING = 40
+
+# Preços sintéticos: passeio aleatório geométrico por epic, um tick a cada `passo` segundos
+class MercadoSimulado:
+    def __init__(self, precos: Optional[Dict[str, float]] = None, volatilidade: float = 0.0002,
+                 passo: float = 0.1, spread: float = 0.00005, semente: Optional[int] = None):
+        self.precos = dict(precos or PRECOS_INICIAIS)  # preço médio por epic
+        self.volatilidade = volatilidade  # desvio por segundo, relativo
+        self.passo = passo
+        self.spread = spread
+        self._aleatorio = random.Random(semente)
+        self._ouvintes = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def adicionar_ouvinte(self, funcao):
+        with self._lock:
+            self._ouvintes.append(funcao)
+
+    def remover_ouvinte(self, funcao):
+        with self._lock:
+            if funcao in self._ouvintes:
+                self._ouvintes.remove(funcao)
+
+    def cotacao(self, epic: str):
+        with self._lock:
+            meio = self.precos[epic]
+        return meio * (1 - self.spread / 2), meio * (1 + self.spread / 2)
+
+    def iniciar(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._stop_event.set()
+
+    def _run(self):
+        desvio = self.volatilidade * math.sqrt(self.passo)
+        while not self._stop_event.wait(self.passo):
+            agora = time.time()
+            with self._lock:
+                for epic in self.precos:
+                    self.precos[epic] *= math.exp(self._aleatorio.gauss(0.0, desvio) - desvio * desvio / 2)
+                ouvintes = list(self._ouvintes)
+            for ouvinte in ouvintes:
+                try:
+                    ouvinte(agora)
+                except Exception:
+                    pass
+
+# Estado da conta simulada: sessões, posições, confirmações e saldo
+class CorretoraSimulada:
+    def __init__(self, mercado: MercadoSimulado, saldo: float = 10000.0, validade_sessao: float = 600.0,
+                 limites: bool = True, min_lote: float = 0.01):
+        self.mercado = mercado
+        self.saldo = saldo
+        self.validade_sessao = validade_sessao
+        self.limites = limites
+        self.min_lote = min_lote
+        self.sessoes = {}      # cst -> {'token', 'ultimo_uso', 'baldes'}
+        self.posicoes = {}     # dealId -> posição
+        self.confirmacoes = {} # dealReference -> confirmação
+        self.contadores = {'requisicoes': 0, '429': 0, '401': 0, 'ordens': 0}
+        self._balde_sessao = self._balde('sessao')
+        self._seq = itertools.count(1)
+        self._lock = threading.RLock()
+        mercado.adicionar_ouvinte(self._verificar_stops)
+
+    # --- sessões e limites ---
+    def criar_sessao(self):
+        with self._lock:
+            if self.limites and not self._consumir(self._balde_sessao):
+                return None
+            cst = uuid.uuid4().hex
+            self.sessoes[cst] = {
+                'token': uuid.uuid4().hex,
+                'ultimo_uso': time.time(),
+                'baldes': {nome: self._balde(nome) for nome in ('geral', 'ordem', 'posicoes_demo')}
+            }
+            return cst, self.sessoes[cst]['token']
+
+    def validar_sessao(self, cst: Optional[str], token: Optional[str]) -> bool:
+        with self._lock:
+            sessao = self.sessoes.get(cst)
+            if sessao is None or sessao['token'] != token or time.time() - sessao['ultimo_uso'] > self.validade_sessao:
+                return False
+            sessao['ultimo_uso'] = time.time()
+            return True
+
+    def expirar_sessoes(self):
+        """
+        Invalida todas as sessões (testa a renovação automática do cliente).
+        """
+        with self._lock:
+            self.sessoes.clear()
+
+    @staticmethod
+    def _balde(nome: str) -> BaldeTokens:
+        # Um token de folga: o jitter da rede aproxima requisições que o cliente espaçou certo
+        taxa, capacidade = LIMITES[nome]
+        return BaldeTokens(taxa, capacidade + 1)
+
+    def _consumir(self, balde: BaldeTokens) -> bool:
+        if balde.espera(time.monotonic()) > 0:
+            return False
+        balde.consumir()
+        return True
+
+    def dentro_do_limite(self, cst: str, metodo: str, caminho: str) -> bool:
+        if not self.limites:
+            return True
+        with self._lock:
+            baldes = self.sessoes[cst]['baldes']
+            nomes = ['geral']
+            if '/positions' in caminho and metodo in ('POST', 'PUT', 'DELETE'):
+                nomes.append('ordem')
+                if metodo == 'POST':
+                    nomes.append('posicoes_demo')
+            if any(baldes[nome].espera(time.monotonic()) > 0 for nome in nomes):
+                return False
+            for nome in nomes:
+                baldes[nome].consumir()
+            return True
+
+    # --- mercado e conta ---
+    def instrumento(self, epic: str) -> Dict:
+        bid, ofr = self.mercado.cotacao(epic)
+        pip = 0.01 if 'JPY' in epic else (1.0 if epic in ('BTCUSD', 'ETHUSD') else 0.0001)
+        return {
+            'instrument': {'epic': epic, 'name': epic, 'type': 'CURRENCIES', 'currency': 'USD',
+                           'minDealSize': self.min_lote, 'pip': pip, 'pipValue': 0.10},
+            'dealingRules': {'minDealSize': {'unit': 'POINTS', 'value': self.min_lote}},
+            'snapshot': {'marketStatus': 'TRADEABLE', 'bid': bid, 'offer': ofr}
+        }
+
+    def _upl(self, posicao: Dict) -> float:
+        bid, ofr = self.mercado.cotacao(posicao['epic'])
+        if posicao['direction'] == 'BUY':
+            return (bid - posicao['level']) * posicao['size']
+        return (posicao['level'] - ofr) * posicao['size']
+
+    def contas(self) -> Dict:
+        with self._lock:
+            upl = sum(self._upl(p) for p in self.posicoes.values())
+            return {'accounts': [{
+                'accountId': 'SIMULADA', 'accountName': 'Conta simulada', 'preferred': True,
+                'accountType': 'CFD', 'currency': 'USD',
+                'balance': {'balance': self.saldo, 'deposit': self.saldo, 'profitLoss': upl, 'available': self.saldo + upl}
+            }]}
+
+    def listar_posicoes(self) -> Dict:
+        with self._lock:
+            posicoes = []
+            for p in self.posicoes.values():
+                bid, ofr = self.mercado.cotacao(p['epic'])
+                posicoes.append({
+                    'position': dict({k: p[k] for k in ('dealId', 'dealReference', 'direction', 'size', 'level',
+                                                        'stopLevel', 'limitLevel', 'createdDate', 'currency')},
+                                     upl=self._upl(p)),
+                    'market': {'epic': p['epic'], 'instrumentName': p['epic'], 'bid': bid, 'offer': ofr}
+                })
+            return {'positions': posicoes}
+
+    def _confirmar(self, status: str, dados: Dict, afetados=None, motivo: Optional[str] = None) -> str:
+        referencia = f'o_{next(self._seq):08d}'
+        confirmacao = {
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'status': dados.get('status', 'OPEN'),
+            'dealStatus': status,
+            'dealReference': referencia,
+            'affectedDeals': afetados or []
+        }
+        confirmacao.update({k: v for k, v in dados.items() if k != 'status'})
+        if motivo:
+            confirmacao['reason'] = motivo
+        self.confirmacoes[referencia] = confirmacao
+        return referencia
+
+    def abrir(self, corpo: Dict) -> str:
+        with self._lock:
+            self.contadores['ordens'] += 1
+            epic = corpo.get('epic')
+            direcao = corpo.get('direction')
+            tamanho = float(corpo.get('size') or 0)
+            if epic not in self.mercado.precos or direcao not in ('BUY', 'SELL') or tamanho < self.min_lote:
+                return self._confirmar('REJECTED', {'epic': epic, 'status': 'REJECTED'}, motivo='INVALID_REQUEST')
+            bid, ofr = self.mercado.cotacao(epic)
+            deal_id = f'sim-{uuid.uuid4().hex[:12]}'
+            nivel = ofr if direcao == 'BUY' else bid
+            referencia = self._confirmar('ACCEPTED', {'epic': epic, 'dealId': deal_id, 'level': nivel, 'size': tamanho,
+                                                      'direction': direcao, 'status': 'OPEN'},
+                                         afetados=[{'dealId': deal_id, 'status': 'OPENED'}])
+            self.posicoes[deal_id] = {
+                'dealId': deal_id, 'dealReference': referencia, 'epic': epic, 'direction': direcao,
+                'size': tamanho, 'level': nivel, 'stopLevel': corpo.get('stopLevel'),
+                'limitLevel': corpo.get('limitLevel'), 'createdDate': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'currency': 'USD'
+            }
+            return referencia
+
+    def alterar(self, deal_id: str, corpo: Dict) -> Optional[str]:
+        with self._lock:
+            posicao = self.posicoes.get(deal_id)
+            if posicao is None:
+                return None
+            if 'stopLevel' in corpo:
+                posicao['stopLevel'] = corpo['stopLevel']
+            if 'limitLevel' in corpo:
+                posicao['limitLevel'] = corpo['limitLevel']
+            return self._confirmar('ACCEPTED', {'epic': posicao['epic'], 'dealId': deal_id, 'status': 'OPEN'},
+                                   afetados=[{'dealId': deal_id, 'status': 'AMENDED'}])
+
+    def fechar(self, deal_id: str) -> Optional[str]:
+        with self._lock:
+            posicao = self.posicoes.pop(deal_id, None)
+            if posicao is None:
+                return None
+            lucro = self._upl(posicao)
+            self.saldo += lucro
+            return self._confirmar('ACCEPTED', {'epic': posicao['epic'], 'dealId': deal_id, 'profit': lucro,
+                                                'status': 'CLOSED'},
+                                   afetados=[{'dealId': deal_id, 'status': 'FULLY_CLOSED'}])
+
+    def _verificar_stops(self, agora: float):
+        # Stop e take executados pelo "servidor", como na corretora
+        with self._lock:
+            for deal_id, p in list(self.posicoes.items()):
+                bid, ofr = self.mercado.cotacao(p['epic'])
+                preco = bid if p['direction'] == 'BUY' else ofr
+                stop, take = p.get('stopLevel'), p.get('limitLevel')
+                sinal = 1 if p['direction'] == 'BUY' else -1
+                if (stop is not None and sinal * (preco - stop) <= 0) or (take is not None and sinal * (preco - take) >= 0):
+                    self.fechar(deal_id)
+
+# Conexão WebSocket (RFC 6455, só o necessário: frames de texto, ping/pong e close)
+class ConexaoWebSocket:
+    def __init__(self, arquivo_leitura, arquivo_escrita):
+        self.leitura = arquivo_leitura
+        self.escrita = arquivo_escrita
+        self._lock = threading.Lock()
+        self.aberta = True
+
+    def enviar(self, texto: str, opcode: int = 0x1):
+        dados = texto.encode('utf-8')
+        cabecalho = bytes([0x80 | opcode])
+        if len(dados) < 126:
+            cabecalho += bytes([len(dados)])
+        elif len(dados) < 65536:
+            cabecalho += bytes([126]) + struct.pack('>H', len(dados))
+        else:
+            cabecalho += bytes([127]) + struct.pack('>Q', len(dados))
+        with self._lock:
+            if not self.aberta:
+                return
+            try:
+                self.escrita.write(cabecalho + dados)
+                self.escrita.flush()
+            except OSError:
+                self.aberta = False
+
+    def receber(self):
+        """
+        (opcode, texto) do próximo frame; (None, None) se a conexão caiu.
+        """
+        try:
+            b1, b2 = self.leitura.read(2)
+            tamanho = b2 & 0x7F
+            if tamanho == 126:
+                tamanho = struct.unpack('>H', self.leitura.read(2))[0]
+            elif tamanho == 127:
+                tamanho = struct.unpack('>Q', self.leitura.read(8))[0]
+            mascara = self.leitura.read(4) if b2 & 0x80 else b'\0\0\0\0'
+            dados = bytearray(self.leitura.read(tamanho))
+            for i in range(len(dados)):
+                dados[i] ^= mascara[i % 4]
+            return b1 & 0x0F, dados.decode('utf-8', errors='replace')
+        except (ValueError, OSError, struct.error):
+            return None, None
+
+# Tratamento HTTP: uma instância por requisição (conexões keep-alive reaproveitam a thread)
+class ManipuladorSimulado(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def simulado(self):
+        return self.server.simulado
+
+    def _atrasar(self):
+        # Latência de rede/servidor: gaussiana truncada em zero
+        latencia = self.simulado.latencia_ms
+        if latencia > 0:
+            time.sleep(max(0.0, self.simulado.aleatorio.gauss(latencia, self.simulado.jitter_ms)) / 1000)
+
+    def _responder(self, codigo: int, corpo: Dict, cabecalhos: Optional[Dict] = None):
+        dados = json.dumps(corpo).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _corpo(self) -> Dict:
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        if not tamanho:
+            return {}
+        try:
+            return json.loads(self.rfile.read(tamanho))
+        except ValueError:
+            return {}
+
+    def _tratar(self, metodo: str):
+        corretora = self.simulado.corretora
+        url = urlparse(self.path)
+        caminho = url.path.rstrip('/')
+        if metodo == 'GET' and caminho == '/connect' and self.headers.get('Upgrade', '').lower() == 'websocket':
+            return self._websocket()
+        corpo = self._corpo()
+        self._atrasar()
+        with corretora._lock:
+            corretora.contadores['requisicoes'] += 1
+        if caminho == '/api/v1/session' and metodo == 'POST':
+            if not self.headers.get('X-CAP-API-KEY') or not corpo.get('identifier') or not corpo.get('password'):
+                return self._responder(401, {'errorCode': 'error.invalid.details'})
+            tokens = corretora.criar_sessao()
+            if tokens is None:
+                corretora.contadores['429'] += 1
+                return self._responder(429, {'errorCode': 'error.too-many.requests'})
+            return self._responder(200, {'accountType': 'CFD', 'currentAccountId': 'SIMULADA'},
+                                   {'CST': tokens[0], 'X-SECURITY-TOKEN': tokens[1]})
+        cst = self.headers.get('CST')
+        if not corretora.validar_sessao(cst, self.headers.get('X-SECURITY-TOKEN')):
+            corretora.contadores['401'] += 1
+            return self._responder(401, {'errorCode': 'error.invalid.session.token'})
+        if not corretora.dentro_do_limite(cst, metodo, caminho):
+            corretora.contadores['429'] += 1
+            return self._responder(429, {'errorCode': 'error.too-many.requests'}, {'Retry-After': '1'})
+        partes = caminho.split('/')[3:]  # depois de /api/v1
+        if metodo == 'GET' and partes == ['ping']:
+            return self._responder(200, {'status': 'OK'})
+        if metodo == 'GET' and partes == ['accounts']:
+            return self._responder(200, corretora.contas())
+        if metodo == 'GET' and partes[:1] == ['markets']:
+            if len(partes) == 2:
+                if partes[1] not in corretora.mercado.precos:
+                    return self._responder(404, {'errorCode': 'error.not-found.epic'})
+                return self._responder(200, corretora.instrumento(partes[1]))
+            epics = [e for e in parse_qs(url.query).get('epics', [''])[0].split(',') if e in corretora.mercado.precos]
+            return self._responder(200, {'marketDetails': [corretora.instrumento(e) for e in epics[:50]]})
+        if partes[:1] == ['positions']:
+            if metodo == 'GET' and len(partes) == 1:
+                return self._responder(200, corretora.listar_posicoes())
+            if metodo == 'POST' and len(partes) == 1:
+                return self._responder(200, {'dealReference': corretora.abrir(corpo)})
+            if metodo in ('PUT', 'DELETE') and len(partes) == 2:
+                referencia = corretora.alterar(partes[1], corpo) if metodo == 'PUT' else corretora.fechar(partes[1])
+                if referencia is None:
+                    return self._responder(404, {'errorCode': 'error.not-found.dealId'})
+                return self._responder(200, {'dealReference': referencia})
+        if metodo == 'GET' and partes[:1] == ['confirms'] and len(partes) == 2:
+            confirmacao = corretora.confirmacoes.get(partes[1])
+            if confirmacao is None:
+                return self._responder(404, {'errorCode': 'error.not-found.dealReference'})
+            return self._responder(200, confirmacao)
+        return self._responder(404, {'errorCode': 'error.not-found'})
+
+    def do_GET(self):
+        self._tratar('GET')
+
+    def do_POST(self):
+        self._tratar('POST')
+
+    def do_PUT(self):
+        self._tratar('PUT')
+
+    def do_DELETE(self):
+        self._tratar('DELETE')
+
+    # --- WebSocket de cotações ---
+    def _websocket(self):
+        chave = self.headers.get('Sec-WebSocket-Key', '')
+        aceite = base64.b64encode(hashlib.sha1((chave + GUID_WEBSOCKET).encode()).digest()).decode()
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', aceite)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        conexao = ConexaoWebSocket(self.rfile, self.wfile)
+        corretora = self.simulado.corretora
+        mercado = corretora.mercado
+        cotacoes = set()
+        barras = {}  # (epic, resolução) -> barra em formação {'t', 'o', 'h', 'l', 'c'}
+        lock = threading.Lock()
+
+        def ao_tick(agora):
+            with lock:
+                epics_cotacao = list(cotacoes)
+                chaves_barras = list(barras)
+            for epic in epics_cotacao:
+                bid, ofr = mercado.cotacao(epic)
+                conexao.enviar(json.dumps({'status': 'OK', 'destination': 'quote', 'payload': {
+                    'epic': epic, 'product': 'CFD', 'bid': bid, 'bidQty': 1000000.0, 'ofr': ofr,
+                    'ofrQty': 1000000.0, 'timestamp': int(agora * 1000)}}))
+            for epic, resolucao in chaves_barras:
+                bid, _ = mercado.cotacao(epic)
+                segundos = SEGUNDOS_RESOLUCAO.get(resolucao, 60)
+                inicio = int(agora // segundos * segundos * 1000)
+                with lock:
+                    barra = barras.get((epic, resolucao))
+                    if barra is None:
+                        continue
+                    if barra.get('t') != inicio:
+                        barra.update({'t': inicio, 'o': bid, 'h': bid, 'l': bid, 'c': bid})
+                    barra.update({'h': max(barra['h'], bid), 'l': min(barra['l'], bid), 'c': bid})
+                    payload = dict(barra, resolution=resolucao, epic=epic, type='classic', priceType='bid')
+                conexao.enviar(json.dumps({'status': 'OK', 'destination': 'ohlc.event', 'payload': payload}))
+
+        mercado.adicionar_ouvinte(ao_tick)
+        try:
+            while conexao.aberta:
+                opcode, texto = conexao.receber()
+                if opcode is None or opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    conexao.enviar(texto, opcode=0xA)
+                    continue
+                if opcode != 0x1:
+                    continue
+                try:
+                    mensagem = json.loads(texto)
+                except ValueError:
+                    continue
+                destino = mensagem.get('destination')
+                resposta = {'status': 'OK', 'destination': destino, 'correlationId': mensagem.get('correlationId'), 'payload': {}}
+                if not corretora.validar_sessao(mensagem.get('cst'), mensagem.get('securityToken')):
+                    resposta.update({'status': 'ERROR', 'payload': {'errorCode': 'error.invalid.session.token'}})
+                    conexao.enviar(json.dumps(resposta))
+                    continue
+                payload = mensagem.get('payload') or {}
+                epics = [e for e in payload.get('epics', []) if e in mercado.precos]
+                with lock:
+                    if destino == 'marketData.subscribe':
+                        cotacoes.update(epics)
+                    elif destino == 'marketData.unsubscribe':
+                        cotacoes.difference_update(epics)
+                    elif destino == 'OHLCMarketData.subscribe':
+                        for resolucao in payload.get('resolutions', ['MINUTE']):
+                            for epic in epics:
+                                barras.setdefault((epic, resolucao), {})
+                    elif destino == 'OHLCMarketData.unsubscribe':
+                        for resolucao in payload.get('resolutions', ['MINUTE']):
+                            for epic in epics:
+                                barras.pop((epic, resolucao), None)
+                    total = len(cotacoes | {epic for epic, _ in barras})
+                if total > MAX_EPICS_STREAMING:
+                    resposta.update({'status': 'ERROR', 'payload': {'errorCode': 'error.max.subscriptions'}})
+                elif destino in ('marketData.subscribe', 'OHLCMarketData.subscribe'):
+                    resposta['payload'] = {'subscriptions': {epic: 'PROCESSING' for epic in epics}}
+                conexao.enviar(json.dumps(resposta))
+        finally:
+            conexao.aberta = False
+            mercado.remover_ouvinte(ao_tick)
+
+# Servidor completo: HTTP + WebSocket na mesma porta, mercado e corretora simulados
+class ServidorSimulado:
+    """
+    latencia_ms/jitter_ms: atraso de cada resposta REST. limites=True aplica os limites
+    documentados (429 ao estourar). semente torna preços e latências reproduzíveis.
+    """
+    def __init__(self, host: str = '127.0.0.1', porta: int = 0, latencia_ms: float = 40.0, jitter_ms: float = 10.0,
+                 limites: bool = True, validade_sessao: float = 600.0, saldo: float = 10000.0,
+                 volatilidade: float = 0.0002, semente: Optional[int] = None):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.aleatorio = random.Random(semente)
+        self.mercado = MercadoSimulado(volatilidade=volatilidade, semente=semente)
+        self.corretora = CorretoraSimulada(self.mercado, saldo=saldo, validade_sessao=validade_sessao, limites=limites)
+        self._http = ThreadingHTTPServer((host, porta), ManipuladorSimulado)
+        self._http.daemon_threads = True
+        self._http.simulado = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, porta = self._http.server_address[:2]
+        return f'http://{host}:{porta}'
+
+    @property
+    def stream_url(self) -> str:
+        host, porta = self._http.server_address[:2]
+        return f'ws://{host}:{porta}/connect'
+
+    def iniciar(self):
+        self.mercado.iniciar()
+        self._thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.mercado.parar()
+        self._http.shutdown()
+        self._http.server_close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor local que simula a API da Capital.com')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--latencia', type=float, default=40.0, help='latência média das respostas (ms)')
+    parser.add_argument('--jitter', type=float, default=10.0, help='desvio da latência (ms)')
+    parser.add_argument('--sem-limites', action='store_true', help='não responder 429')
+    parser.add_argument('--semente', type=int, default=None)
+    args = parser.parse_args()
+    servidor = ServidorSimulado(args.host, args.porta, args.latencia, args.jitter, limites=not args.sem_limites,
+                                semente=args.semente).iniciar()
+    print(f"[SIMULADO] REST em {servidor.base_url} | WebSocket em {servidor.stream_url}")
+    print(f"[SIMULADO] No bot: CAPITAL_BASE_URL={servidor.base_url} CAPITAL_STREAM_URL={servidor.stream_url}")
+    try:
+        while True:
+            time.sleep(10)
+            c = servidor.corretora.contadores
+            print(f"[SIMULADO] Requisições: {c['requisicoes']} | Ordens: {c['ordens']} | 429: {c['429']} | 401: {c['401']} | Posições: {len(servidor.corretora.posicoes)}")
+    except KeyboardInterrupt:
+        servidor.parar()
@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+from agendador import PRIORIDADE_MONITORAMENTO
+from logs import obter_logger
+
+ARQUIVO_SESSAO = '.capital_sessao.json'
+log = obter_logger('SESSÃO')
+VALIDADE_SESSAO = 540  # a Capital.com expira a sessão após 10 min sem uso; margem de 1 min
+
+# Ciclo de vida da sessão REST (CST + X-SECURITY-TOKEN) de uma CapitalAPI
+class GerenciadorSessao:
+    """
+    Uma sessão por processo, compartilhada por todas as threads da CapitalAPI, e entre
+    processos pelo arquivo de tokens: um restart (ou outro processo) reaproveita tokens
+    ainda válidos sem novo POST /session. Um 401 renova a sessão uma única vez, mesmo
+    com várias threads recebendo 401 ao mesmo tempo. Uma thread faz ping em
+    /api/v1/ping quando a sessão fica ociosa, para ela não expirar.
+    """
+    def __init__(self, api, arquivo: str = ARQUIVO_SESSAO, ping_segundos: float = 300, validade: float = VALIDADE_SESSAO):
+        self.api = api
+        self.arquivo = arquivo
+        self.ping_segundos = ping_segundos
+        self.validade = validade
+        self._lock = threading.RLock()
+        self._ultimo_uso = 0.0
+        self._ultimo_salvo = 0.0
+        self._stop_event = threading.Event()
+        self._thread_ping = None
+
+    def _identidade(self) -> str:
+        # Tokens de outra conta ou ambiente (demo/real) não servem
+        return f'{self.api.base_url}|{self.api.email}'
+
+    def _ler_arquivo(self):
+        try:
+            with open(self.arquivo, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _salvar(self):
+        dados = {
+            'identidade': self._identidade(),
+            'cst': self.api.cst,
+            'x_security_token': self.api.x_security_token,
+            'ultimo_uso': self._ultimo_uso
+        }
+        temporario = f'{self.arquivo}.{os.getpid()}.tmp'
+        try:
+            # Tokens dão acesso à conta: o arquivo já nasce legível só pelo dono (0600)
+            with os.fdopen(os.open(temporario, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+                json.dump(dados, f)
+            os.replace(temporario, self.arquivo)  # troca atômica: leitores nunca veem arquivo pela metade
+            self._ultimo_salvo = time.time()
+        except OSError as e:
+            log.warning(f"Não foi possível salvar os tokens: {e}")
+
+    def _carregar_cache(self, exceto=None) -> bool:
+        dados = self._ler_arquivo()
+        if not dados or dados.get('identidade') != self._identidade() or not dados.get('cst'):
+            return False
+        if dados['cst'] == exceto or time.time() - dados.get('ultimo_uso', 0) > self.validade:
+            return False
+        self.api.cst = dados['cst']
+        self.api.x_security_token = dados.get('x_security_token')
+        self._ultimo_uso = dados['ultimo_uso']
+        self._ultimo_salvo = time.time()
+        return True
+
+    def _autenticar(self):
+        self.api.criar_sessao()
+        self._ultimo_uso = time.time()
+        self._salvar()
+
+    def garantir(self):
+        """
+        Garante tokens: os da memória, os do arquivo se ainda válidos, ou uma sessão nova.
+        """
+        if self.api.cst:
+            return
+        with self._lock:
+            if not self.api.cst:
+                if self._carregar_cache():
+                    log.info('Sessão anterior reaproveitada (sem novo login).')
+                else:
+                    self._autenticar()
+            self._iniciar_ping()
+
+    def reautenticar(self, cst_usado):
+        """
+        Chamado após 401 numa requisição feita com cst_usado. Só a primeira thread renova;
+        as demais encontram o token novo e apenas repetem a requisição.
+        """
+        with self._lock:
+            if self.api.cst and self.api.cst != cst_usado:
+                return
+            # Outro processo pode já ter renovado a sessão
+            if self._carregar_cache(exceto=cst_usado):
+                return
+            log.info('Sessão expirada, autenticando de novo...')
+            self._autenticar()
+
+    def registrar_uso(self):
+        self._ultimo_uso = time.time()
+        # Regrava o arquivo no máximo 1x por minuto, só para manter 'ultimo_uso' em dia
+        if self._ultimo_uso - self._ultimo_salvo > 60:
+            with self._lock:
+                self._salvar()
+
+    def _iniciar_ping(self):
+        if self.ping_segundos and (self._thread_ping is None or not self._thread_ping.is_alive()):
+            self._stop_event.clear()
+            self._thread_ping = threading.Thread(target=self._run_ping, daemon=True)
+            self._thread_ping.start()
+
+    def parar(self):
+        self._stop_event.set()
+
+    def _run_ping(self):
+        while not self._stop_event.wait(min(self.ping_segundos, 30)):
+            # Só pinga se a sessão ficou ociosa; requisições normais já a mantêm viva
+            if time.time() - self._ultimo_uso < self.ping_segundos:
+                continue
+            try:
+                resp = self.api._requisitar('GET', '/api/v1/ping', prioridade=PRIORIDADE_MONITORAMENTO)
+                if resp.status_code != 200:
+                    log.warning(f"Ping falhou: {resp.status_code} - {resp.text}")
+            except Exception as e:
+                log.warning(f"Erro no ping: {e}")
@@ -1,64 +1,103 @@
-import json
-import time
+import threading
 from capital_api import CapitalAPI
+from operacoes import RastreadorOperacoes
+from ordens import DespachoOrdens
+from logs import obter_logger
 
-# Carregar config
-with open('capital_config.json', 'r') as f:
-    config = json.load(f)
+log = obter_logger('SETUP')
 
 # Autenticação e setup
 class CapitalSetup:
-    def __init__(self):
-        self.api = CapitalAPI()
-        self.api.autenticar()
-        self.saldo = self.api.saldo()['accounts'][0]['balance']['balance']
-        print(f"[SETUP] Autenticado na conta demo Capital.com. Saldo: ${self.saldo:.2f}")
+    """
+    Criar não acessa a rede: a sessão é aberta na primeira chamada da API (ou em iniciar())
+    e o saldo é lido no primeiro acesso a `saldo`.
+    """
+    def __init__(self, api=None):
+        self.api = api or CapitalAPI()
+        self._saldo = None
         self.meta_percent = 1.0  # Meta diária de 1%
-        self.meta_lucro = self.saldo * (self.meta_percent / 100)
-        print(f"[SETUP] Meta diária de lucro: ${self.meta_lucro:.2f}")
-        self.operando = False
+        # Fila de envio de ordens com confirmação em paralelo
+        self.despacho = DespachoOrdens(self.api)
+        # Acompanha as operações abertas em background (thread sobe na primeira ordem)
+        self.rastreador = RastreadorOperacoes(self.api)
+        self.rastreador.adicionar_ouvinte(self._ao_evento_operacao)
+        self.rastreador.adicionar_ouvinte(self.api.metadados.ao_evento_operacao)
+
+    def iniciar(self):
+        """
+        Abre a sessão e carrega o saldo agora (ex.: em background enquanto o resto sobe).
+        """
+        self.api.autenticar()
+        log.info(f"Autenticado na conta demo Capital.com. Saldo: ${self.saldo:.2f}")
+        log.info(f"Meta diária de lucro: ${self.meta_lucro:.2f}")
+        return self
+
+    @property
+    def saldo(self):
+        if self._saldo is None:
+            self._saldo = self.api.metadados.saldo()['accounts'][0]['balance']['balance']
+        return self._saldo
+
+    @property
+    def meta_lucro(self):
+        return self.saldo * (self.meta_percent / 100)
 
     def entrar_operacao(self, epic, direction, preco_entrada, stop_pips=20, rr=2.0):
-        if self.operando:
-            print("[SETUP] Já em operação, aguardando resultado...")
-            return
-        print(f"[SETUP] Entrando em operação: {direction} | Epic: {epic} | Preço: {preco_entrada}")
-        regras = self.api.consultar_regras_epic(epic)
+        """
+        Envia a ordem e retorna sem esperar: o rastreador acompanha a operação em background.
+        Várias operações podem ficar abertas ao mesmo tempo, uma por epic.
+        """
+        if self.rastreador.em_operacao(epic):
+            log.info(f"Já em operação em {epic}, aguardando resultado...")
+            return None
+        log.info(f"Entrando em operação: {direction} | Epic: {epic} | Preço: {preco_entrada}")
+        regras = self.api.metadados.regras(epic)
         lote_min = regras.get('minDealSize', 0.001)
-        # Enviar ordem
-        resposta = self.api.enviar_ordem(epic, direction, lote_min)
-        print(f"[SETUP] Ordem enviada! Resposta: {resposta}")
-        self.operando = True
-        deal_id = resposta.get('dealId') or resposta.get('dealReference')
-        # Monitorar até stop win/loss
-        self.monitorar_operacao(deal_id, preco_entrada, direction, stop_pips, rr)
+        # Enviar ordem (fila do despacho; a confirmação chega pelo rastreador)
+        futuro = self.despacho.enviar(epic, direction, lote_min)
+        log.info(f"Ordem na fila de envio ({self.despacho.pendentes()} na fila).")
+        return self.rastreador.acompanhar_pedido(futuro, epic=epic, direcao=direction, preco_entrada=preco_entrada,
+                                                 stop_pips=stop_pips, rr=rr)
+
+    @property
+    def operando(self):
+        return bool(self.rastreador.abertas())
+
+    def _ao_evento_operacao(self, evento):
+        if evento['tipo'] == 'confirmada':
+            log.info(f"Operação {evento['deal_id']} confirmada ({evento['epic']} {evento['direcao']}).")
+        elif evento['tipo'] == 'rejeitada':
+            log.warning(f"Ordem {evento['referencia']} rejeitada: {evento.get('motivo')}")
+        elif evento['tipo'] == 'pnl' and evento['profit'] is not None:
+            # P&L muda a cada leitura: no máximo uma linha a cada 30 s por epic
+            log.info(f"[{evento['epic']}] Lucro/Prejuízo atual: {evento['profit']}",
+                     extra={'chave_limite': ('pnl', evento['epic']), 'intervalo': 30})
+        elif evento['tipo'] == 'encerrada':
+            log.info(f"Operação {evento['deal_id']} encerrada ({evento['epic']}). Último P&L: {evento['profit']}")
+
+# Instância global para integração, criada no primeiro uso
+_capital_setup = None
+_lock_setup = threading.Lock()
 
-    def monitorar_operacao(self, deal_id, preco_entrada, direction, stop_pips, rr):
-        print(f"[SETUP] Monitorando operação {deal_id}...")
-        while True:
-            pos = self.api.consultar_ordem(deal_id)
-            if pos['status'] == 'CLOSED':
-                print(f"[SETUP] Operação encerrada. Detalhes: {pos}")
-                break
-            # Consultar lucro/prejuízo em tempo real
-            pos_aberta = self.api.consultar_posicao_aberta(deal_id=deal_id)
-            if pos_aberta and pos_aberta.get('profit') is not None:
-                print(f"[SETUP] Lucro/Prejuízo atual: {pos_aberta['profit']}")
-            else:
-                print(f"[SETUP] Operação aberta. Aguardando... (status: {pos['status']})")
-            time.sleep(30)
-        self.operando = False
-        print("[SETUP] Pronto para nova operação!")
+def obter_setup():
+    global _capital_setup
+    with _lock_setup:
+        if _capital_setup is None:
+            _capital_setup = CapitalSetup()
+        return _capital_setup
 
-# Instância global para integração
-capital_setup = CapitalSetup()
+def __getattr__(nome):
+    # Compatibilidade: `setup.capital_setup` continua funcionando, mas só cria no primeiro acesso
+    if nome == 'capital_setup':
+        return obter_setup()
+    raise AttributeError(f"module 'setup' has no attribute '{nome}'")
 
 def executar_entrada(epic, direction, preco_entrada, stop_pips=20, rr=2.0):
-    capital_setup.entrar_operacao(epic, direction, preco_entrada, stop_pips, rr)
+    obter_setup().entrar_operacao(epic, direction, preco_entrada, stop_pips, rr)
 
 def exibir_posicoes_abertas():
     print("\n[SETUP] Posições abertas na conta:")
-    posicoes = capital_setup.api.listar_posicoes_abertas()
+    posicoes = obter_setup().api.listar_posicoes_abertas()
     if not posicoes:
         print("Nenhuma posição aberta no momento.")
         return
@@ -0,0 +1,68 @@
+import threading
+import time
+from agendador import PRIORIDADE_MONITORAMENTO, PRIORIDADE_NORMAL, PRIORIDADE_ORDEM, AgendadorRequisicoes
+
+def _em_paralelo(agendador: AgendadorRequisicoes, pedidos, atraso: float = 0.02):
+    # Cada pedido (nome, método, caminho, prioridade) numa thread, na ordem dada; devolve a ordem de saída
+    saidas = []
+    lock = threading.Lock()
+
+    def pedir(nome, metodo, caminho, prioridade):
+        agendador.aguardar(metodo, caminho, prioridade)
+        with lock:
+            saidas.append(nome)
+
+    threads = []
+    for pedido in pedidos:
+        thread = threading.Thread(target=pedir, args=pedido, daemon=True)
+        thread.start()
+        threads.append(thread)
+        time.sleep(atraso)
+    return threads, saidas
+
+def test_baldes_do_endpoint():
+    agendador = AgendadorRequisicoes(demo=True)
+    assert agendador.baldes_do_endpoint('GET', '/api/v1/positions') == ['geral']
+    assert agendador.baldes_do_endpoint('POST', '/api/v1/positions') == ['geral', 'ordem', 'posicoes_demo']
+    assert agendador.baldes_do_endpoint('DELETE', '/api/v1/positions/abc') == ['geral', 'ordem']
+    assert agendador.baldes_do_endpoint('POST', '/api/v1/session') == ['geral', 'sessao']
+    assert 'posicoes_demo' not in AgendadorRequisicoes(demo=False).baldes_do_endpoint('POST', '/api/v1/positions')
+
+def test_limite_de_ordens():
+    agendador = AgendadorRequisicoes(limites={'geral': (100.0, 100), 'ordem': (10.0, 1)})
+    inicio = time.monotonic()
+    for _ in range(4):
+        agendador.aguardar('POST', '/api/v1/positions')
+    # 1 ordem a cada 0,1 s: a primeira sai na hora, as outras três esperam
+    assert 0.25 <= time.monotonic() - inicio < 1.0
+
+def test_prioridade_depois_ordem_de_chegada():
+    agendador = AgendadorRequisicoes(limites={'geral': (100.0, 100)})
+    agendador.pausar(0.3)
+    threads, saidas = _em_paralelo(agendador, [
+        ('poll', 'GET', '/api/v1/positions', PRIORIDADE_MONITORAMENTO),
+        ('saldo', 'GET', '/api/v1/accounts', PRIORIDADE_NORMAL),
+        ('ordem', 'POST', '/api/v1/positions', PRIORIDADE_ORDEM),
+        ('regras', 'GET', '/api/v1/markets/EURUSD', PRIORIDADE_NORMAL),
+    ])
+    for thread in threads:
+        thread.join(2)
+    assert saidas == ['ordem', 'saldo', 'regras', 'poll']
+    estatisticas = agendador.estatisticas()
+    assert estatisticas['na_fila'] == 0
+    assert estatisticas['esperas'][PRIORIDADE_ORDEM]['quantidade'] == 1
+
+def test_balde_vazio_so_segura_quem_usa_ele():
+    agendador = AgendadorRequisicoes(limites={'geral': (100.0, 100), 'ordem': (100.0, 1), 'posicoes_demo': (1.0, 1)})
+    agendador.aguardar('POST', '/api/v1/positions')  # esvazia o limite da demo
+    threads, saidas = _em_paralelo(agendador, [
+        ('ordem', 'POST', '/api/v1/positions', PRIORIDADE_ORDEM),
+        ('consulta', 'GET', '/api/v1/accounts', PRIORIDADE_NORMAL),
+        ('fechar', 'DELETE', '/api/v1/positions/abc', PRIORIDADE_NORMAL),
+    ])
+    threads[1].join(0.5)
+    threads[2].join(0.5)
+    # A ordem parada no limite da demo não trava a consulta nem o fechamento
+    assert saidas == ['consulta', 'fechar']
+    threads[0].join(2)
+    assert saidas == ['consulta', 'fechar', 'ordem']
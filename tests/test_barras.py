@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from barras import COLUNAS, CacheBarras, SerieBarras, segundos_intervalo
+
+def _df(inicio: str, n: int, freq: str = '15min', base: float = 1.0) -> pd.DataFrame:
+    indice = pd.date_range(inicio, periods=n, freq=freq, name='datetime')
+    valores = base + np.arange(n, dtype=np.float64)[:, None] + np.zeros((1, len(COLUNAS)))
+    return pd.DataFrame(valores, index=indice, columns=COLUNAS)
+
+# Feed falso no formato do TvDatafeed: devolve as últimas n_bars de um histórico que cresce
+class FeedFalso:
+    def __init__(self, historico: pd.DataFrame):
+        self.historico = historico
+        self.pedidos = []
+
+    def get_hist(self, symbol, exchange, interval, n_bars):
+        self.pedidos.append(n_bars)
+        return self.historico.tail(n_bars)
+
+def test_segundos_intervalo():
+    assert segundos_intervalo('15') == 900
+    assert segundos_intervalo('4H') == 4 * 3600
+    assert segundos_intervalo('1D') == 86400
+    with pytest.raises(ValueError):
+        segundos_intervalo('x')
+
+def test_anexar_atualiza_em_formacao_e_ignora_antigas():
+    serie = SerieBarras(4)
+    t0, t1 = np.datetime64('2026-01-01T00:00'), np.datetime64('2026-01-01T00:15')
+    assert serie.anexar(t0, np.ones(5))
+    assert serie.anexar(t1, np.ones(5))
+    assert not serie.anexar(t1, np.ones(5))  # mesmos valores: nada mudou
+    assert serie.anexar(t1, np.full(5, 2.0))  # barra em formação atualizada
+    assert not serie.anexar(t0, np.full(5, 9.0))  # mais antiga que a última
+    assert len(serie) == 2
+    assert serie.dataframe()['close'].tolist() == [1.0, 2.0]
+
+def test_buffer_circular_contiguo_e_sem_copia():
+    serie = SerieBarras(5)
+    df = _df('2026-01-01', 13)
+    assert serie.mesclar(df) == 13
+    assert len(serie) == 5
+    ultimas = serie.dataframe()
+    pd.testing.assert_frame_equal(ultimas, df.tail(5), check_freq=False, check_index_type=False)
+    assert serie.dataframe(3).index[0] == df.index[-3]
+    tempos, valores = serie.arrays()
+    assert np.shares_memory(valores, serie._valores)
+    assert serie.ultimo_tempo() == df.index.values[-1]
+
+def test_mesclar_so_a_partir_da_ultima():
+    serie = SerieBarras(10)
+    df = _df('2026-01-01', 6)
+    serie.mesclar(df.iloc[:4])
+    # A última (em formação) volta com outro valor e chegam duas novas
+    df.iloc[3] = 99.0
+    assert serie.mesclar(df) == 3
+    assert serie.dataframe()['close'].tolist()[-3:] == [99.0, 5.0, 6.0]
+
+def test_limpar():
+    serie = SerieBarras(3)
+    serie.mesclar(_df('2026-01-01', 3))
+    serie.limpar()
+    assert len(serie) == 0 and serie.ultimo_tempo() is None
+    serie.mesclar(_df('2026-02-01', 2))
+    assert len(serie) == 2
+
+def test_cache_busca_so_as_barras_novas():
+    historico = _df('2026-01-01', 300)
+    feed = FeedFalso(historico.iloc[:200])
+    cache = CacheBarras(feed, capacidade=100, barras_incremento=5)
+    cache._barras_faltando = lambda serie, intervalo, n_bars: cache.barras_incremento
+    assert cache.atualizar('EURUSD', '15', 100) == 100
+    feed.historico = historico.iloc[:203]
+    assert cache.atualizar('EURUSD', '15', 100) == 3  # a última vista voltou igual: só as 3 novas
+    assert feed.pedidos == [100, 5]
+    pd.testing.assert_frame_equal(cache.obter('EURUSD', '15', 100, atualizar=False), historico.iloc[103:203],
+                                  check_freq=False, check_index_type=False)
+
+def test_cache_refaz_backfill_na_lacuna():
+    historico = _df('2026-01-01', 400)
+    feed = FeedFalso(historico.iloc[:100])
+    cache = CacheBarras(feed, capacidade=100, barras_incremento=5)
+    cache._barras_faltando = lambda serie, intervalo, n_bars: cache.barras_incremento
+    cache.atualizar('EURUSD', '15', 100)
+    # Lacuna maior que o incremento, mas o backfill encosta: série contínua
+    feed.historico = historico.iloc[:150]
+    cache.atualizar('EURUSD', '15', 100)
+    assert feed.pedidos == [100, 5, 100]
+    tempos, _ = cache.serie('EURUSD', '15').arrays()
+    assert (np.diff(tempos) == np.timedelta64(15, 'm')).all()
+    # Nem o backfill encosta: a série recomeça em vez de ficar com buraco
+    feed.historico = historico
+    cache.atualizar('EURUSD', '15', 100)
+    df = cache.obter('EURUSD', '15', 100, atualizar=False)
+    assert df.index[0] == historico.index[300] and len(df) == 100
+
+def test_barras_faltando_pelo_relogio_local():
+    cache = CacheBarras(None, barras_incremento=5)
+    serie = SerieBarras(10)
+    agora = pd.Timestamp.now().floor('min')
+    serie.anexar((agora - pd.Timedelta(minutes=45)).to_datetime64(), np.ones(5))
+    assert cache._barras_faltando(serie, '15', 1000) == 5  # 3 barras + 2 de folga
+    serie.limpar()
+    serie.anexar((agora - pd.Timedelta(hours=20)).to_datetime64(), np.ones(5))
+    assert cache._barras_faltando(serie, '15', 1000) == 82
+    assert cache._barras_faltando(serie, '15', 50) == 50
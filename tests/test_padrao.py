@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+import padrao
+from padrao import ContextoPadrao, PipelinePadroes, detectar_bandeira, detectar_flamula, detectar_padroes
+
+def _df(n: int = 120, semente: int = 5) -> pd.DataFrame:
+    close = 1.1 + np.random.default_rng(semente).normal(0, 1e-3, n).cumsum()
+    close[17] = np.nan
+    return pd.DataFrame({'open': np.roll(close, 1), 'high': close + 5e-4, 'low': close - 5e-4, 'close': close})
+
+@pytest.mark.parametrize('coluna, n, ate', [('close', 10, 0), ('close', 20, 10), ('high', 20, 0), ('low', 30, 10),
+                                            ('close', 200, 0), ('close', 110, 5)])
+def test_estatisticas_iguais_ao_pandas(coluna, n, ate):
+    df = _df()
+    ctx = ContextoPadrao(df)
+    janela = df[coluna].iloc[max(0, len(df) - ate - n):len(df) - ate]
+    np.testing.assert_array_equal(ctx.ultimos(coluna, n, ate), janela.to_numpy())
+    np.testing.assert_allclose(ctx.std(coluna, n, ate), janela.std())
+    assert ctx.max(coluna, n, ate) == janela.max()
+    assert ctx.min(coluna, n, ate) == janela.min()
+    np.testing.assert_allclose(ctx.mean(coluna, n, ate), janela.mean())
+
+def test_janela_calculada_uma_vez(monkeypatch):
+    calculos = []
+    std = padrao._std
+    monkeypatch.setattr(padrao, '_std', lambda valores: calculos.append(len(valores)) or std(valores))
+    ctx = ContextoPadrao(_df())
+    detectar_bandeira(ctx.df, ctx)
+    detectar_flamula(ctx.df, ctx)
+    # Bandeira e flâmula dividem o desvio da consolidação
+    assert calculos == [10]
+
+def test_modos_do_pipeline():
+    df = _df(300, semente=11)
+    todos = detectar_padroes(df)
+    assert todos
+    assert detectar_padroes(df, modo='primeiro') == todos[:1]
+    ordenados = detectar_padroes(df, ordenar=True)
+    assert [p['confianca'] for p in ordenados] == sorted((p['confianca'] for p in todos), reverse=True)
+    with pytest.raises(ValueError):
+        PipelinePadroes().executar(df, modo='x')
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+from barras import COLUNAS, SerieBarras
+from reamostragem import Reamostrador, Sessao, reamostrar
+
+FOREX = Sessao('America/New_York', '17:00', fuso_dados='UTC')
+CRIPTO = Sessao('UTC', '00:00', fuso_dados='UTC')
+AGREGACAO = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+# Volta do horário de verão de Nova York: 2026-11-01 02:00 EDT -> 01:00 EST (06:00 UTC)
+VOLTA_VERAO = ('2026-10-30 12:00', '2026-11-03 12:00')
+IDA_VERAO = ('2026-03-06 12:00', '2026-03-10 12:00')
+SEM_TROCA = ('2026-10-05 00:00', '2026-10-09 00:00')
+
+def _m1(inicio: str, fim: str, semente: int = 1) -> pd.DataFrame:
+    # M1 em UTC com minutos faltando: um buraco de meia hora, minutos soltos e um fim de semana curto
+    indice = pd.date_range(inicio, fim, freq='min', inclusive='left', name='datetime')
+    close = 1.1 + np.random.default_rng(semente).normal(0, 1e-4, len(indice)).cumsum()
+    df = pd.DataFrame({'open': np.roll(close, 1), 'high': close + 2e-4, 'low': close - 2e-4, 'close': close,
+                       'volume': np.arange(len(indice)) % 7 + 1.0}, index=indice)
+    df.iloc[0, 0] = close[0]
+    faltando = np.zeros(len(df), dtype=bool)
+    faltando[300:330] = True
+    faltando[1000::97] = True
+    faltando[3000:3400] = True
+    return df[~faltando]
+
+def _incremental(df: pd.DataFrame, intervalo, sessao: Sessao) -> pd.DataFrame:
+    # Uma M1 por vez, cada uma chegando antes parcial (em formação) e depois fechada
+    reamostrador = Reamostrador(sessao)
+    serie = SerieBarras(len(df))
+    reamostrador.registrar(intervalo, serie)
+    valores = df[COLUNAS].to_numpy()
+    for tempo, m1 in zip(df.index.values, valores):
+        parcial = [m1[0], max(m1[0], m1[3]), min(m1[0], m1[3]), m1[3], 0.0]
+        reamostrador.adicionar_barras([tempo], [parcial])
+        reamostrador.adicionar_barras([tempo], [m1])
+    return serie.dataframe().copy()
+
+def _pandas(df: pd.DataFrame, regra: str, fuso: str, **kwargs) -> pd.DataFrame:
+    local = df.tz_localize('UTC').tz_convert(fuso)
+    agregado = local.resample(regra, **kwargs).agg(AGREGACAO).dropna(subset=['open'])
+    agregado.index = agregado.index.tz_convert('UTC').tz_localize(None)
+    return agregado
+
+def _pandas_diario(df: pd.DataFrame, fuso: str, abertura: str) -> pd.DataFrame:
+    # O '1D' do pandas é dia de calendário e ignora offset: desloca o relógio de parede pela abertura
+    parede = df.index.tz_localize('UTC').tz_convert(fuso).tz_localize(None) - pd.Timedelta(abertura)
+    agregado = df.set_axis(parede).resample('1D').agg(AGREGACAO).dropna(subset=['open'])
+    rotulos = agregado.index.tz_localize(None) + pd.Timedelta(abertura)
+    agregado.index = rotulos.tz_localize(fuso).tz_convert('UTC').tz_localize(None)
+    return agregado
+
+def _comparar(obtido: pd.DataFrame, esperado: pd.DataFrame):
+    assert obtido.index.equals(pd.DatetimeIndex(esperado.index)), obtido.index.symmetric_difference(esperado.index)
+    np.testing.assert_allclose(obtido[COLUNAS].to_numpy(), esperado[COLUNAS].to_numpy())
+
+@pytest.mark.parametrize('periodo', [VOLTA_VERAO, IDA_VERAO, SEM_TROCA])
+@pytest.mark.parametrize('sessao', [FOREX, CRIPTO, Sessao(None)], ids=['forex', 'cripto', 'sem_fuso'])
+@pytest.mark.parametrize('intervalo', ['5', '15', '30', '1H', '4H', '1D'])
+def test_incremental_igual_ao_lote(intervalo, sessao, periodo):
+    df = _m1(*periodo)
+    _comparar(_incremental(df, intervalo, sessao), reamostrar(df, intervalo, sessao))
+
+@pytest.mark.parametrize('periodo', [VOLTA_VERAO, IDA_VERAO, SEM_TROCA])
+@pytest.mark.parametrize('intervalo, regra', [('5', '5min'), ('15', '15min'), ('1H', '1h')])
+def test_intradia_igual_ao_pandas(intervalo, regra, periodo):
+    # Barras de até 1h contam em tempo corrido: iguais ao resample do pandas mesmo na troca de horário
+    df = _m1(*periodo)
+    _comparar(reamostrar(df, intervalo, FOREX), _pandas(df, regra, 'America/New_York'))
+
+@pytest.mark.parametrize('periodo', [VOLTA_VERAO, IDA_VERAO, SEM_TROCA])
+def test_diario_igual_ao_pandas(periodo):
+    df = _m1(*periodo)
+    _comparar(reamostrar(df, '1D', FOREX), _pandas_diario(df, 'America/New_York', '17h'))
+    _comparar(reamostrar(df, '1D', CRIPTO), _pandas(df, '1D', 'UTC'))
+
+def test_h4_igual_ao_pandas_sem_troca_de_horario():
+    # O pandas conta o H4 em tempo corrido desde o primeiro dia; a sessão reancora às 17:00 todo dia,
+    # então os dois só coincidem enquanto não há troca de horário
+    df = _m1(*SEM_TROCA)
+    _comparar(reamostrar(df, '4H', FOREX), _pandas(df, '4h', 'America/New_York', offset='17h'))
+    _comparar(reamostrar(df, '4H', CRIPTO), _pandas(df, '4h', 'UTC'))
+
+def test_hora_repetida_vira_duas_barras_h1():
+    df = _m1(*VOLTA_VERAO)
+    rotulos = reamostrar(df, '1H', FOREX).index
+    # 01:00 EDT (05:00 UTC) e 01:00 EST (06:00 UTC): nenhuma das duas dobrada na hora seguinte
+    assert pd.Timestamp('2026-11-01 05:00') in rotulos
+    assert pd.Timestamp('2026-11-01 06:00') in rotulos
+    assert (rotulos[1:] - rotulos[:-1]).min() == pd.Timedelta(hours=1)
+
+def test_dias_da_troca_de_horario():
+    volta = reamostrar(_m1(*VOLTA_VERAO), '1D', FOREX).index
+    assert list(volta) == list(pd.DatetimeIndex(['2026-10-29 21:00', '2026-10-30 21:00', '2026-10-31 21:00',
+                                                 '2026-11-01 22:00', '2026-11-02 22:00']))
+    h4 = reamostrar(_m1(*VOLTA_VERAO), '4H', FOREX).index
+    # Dia de 25h: a última barra H4 do dia (16:00 EST) é cortada na abertura das 17:00
+    assert pd.Timestamp('2026-11-01 21:00') in h4 and pd.Timestamp('2026-11-01 22:00') in h4
+
+def test_fins_da_sessao():
+    inicios = np.array(['2026-11-01 21:00', '2026-10-31 21:00', '2026-11-01 05:00'], dtype='datetime64[ns]')
+    assert list(FOREX.fins(inicios[:1], 4 * 3600)) == [np.datetime64('2026-11-01 22:00', 'ns')]
+    assert list(FOREX.fins(inicios[1:2], 86400)) == [np.datetime64('2026-11-01 22:00', 'ns')]
+    assert list(FOREX.fins(inicios[2:], 3600)) == [np.datetime64('2026-11-01 06:00', 'ns')]
+
+def test_parcial_ate_a_ultima_m1_do_periodo():
+    reamostrador = Reamostrador(FOREX)
+    serie = SerieBarras(10)
+    reamostrador.registrar('15', serie)
+    tempos = pd.date_range('2026-11-01 05:45', periods=15, freq='min').values
+    reamostrador.adicionar_barras(tempos[:14], np.ones((14, 5)))
+    assert reamostrador.parcial('15')
+    reamostrador.adicionar_barras(tempos[14:], np.ones((1, 5)))
+    assert not reamostrador.parcial('15')
+    assert serie.dataframe()['volume'].iloc[-1] == 15
+
+def test_registrar_com_historico_refaz_a_barra_em_formacao():
+    df = _m1(*VOLTA_VERAO)
+    lote = reamostrar(df, '1H', FOREX)
+    base = SerieBarras(len(df))
+    base.mesclar(df.iloc[:2000])
+    serie = SerieBarras(200)
+    serie.mesclar(reamostrar(df.iloc[:2000], '1H', FOREX).iloc[:-1])
+    reamostrador = Reamostrador(FOREX)
+    # Última barra da série desalinhada da sessão: não deriva
+    desalinhada = SerieBarras(10)
+    desalinhada.anexar(np.datetime64('2026-10-30 12:30'), np.ones(5))
+    assert not reamostrador.registrar('1H', desalinhada, base)
+    assert reamostrador.registrar('1H', serie, base)
+    reamostrador.adicionar_barras(df.index.values[2000:], df[COLUNAS].to_numpy()[2000:])
+    _comparar(serie.dataframe(), lote)
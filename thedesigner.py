@@ -1,13 +1,21 @@
-import time
-from tvDatafeed import TvDatafeed, Interval
+from tvDatafeed import Interval
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 from rich.live import Live
 from rich.style import Style
+from rich.segment import Segment
 import pandas as pd
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from central import CentralDados
+from chapeleiro import Pressao
+from logs import obter_logger
 
 console = Console()
+log = obter_logger('THEDESIGNER')
 
 # Função para desenhar uma vela estilizada no terminal
 def desenhar_vela(open_, high, low, close, largura=7, altura=20):
@@ -18,50 +26,248 @@ def desenhar_vela(open_, high, low, close, largura=7, altura=20):
     corpo_base = min(open_, close)
     # Proporção
     escala = (maximo - minimo) / (altura - 1) if (maximo - minimo) != 0 else 1
-    grid = [' ' * largura for _ in range(altura)]
-    # Pavio superior
-    for i in range(altura):
-        preco = maximo - i * escala
-        if preco <= high and preco >= corpo_topo:
-            grid[i] = ' ' * (largura // 2) + '│' + ' ' * (largura - largura // 2 - 1)
-    # Corpo
     cor = 'red' if close < open_ else 'green'
+    # Três tipos de linha, montados uma vez; uma passada decide qual vai em cada altura
+    pavio = ' ' * (largura // 2) + '│' + ' ' * (largura - largura // 2 - 1)
+    corpo = ' ' * (largura // 2 - 1) + '█' * 3 + ' ' * (largura - (largura // 2 + 2))
+    vazio = ' ' * largura
+    linhas = []
     for i in range(altura):
         preco = maximo - i * escala
-        if preco <= corpo_topo and preco >= corpo_base:
-            grid[i] = ' ' * (largura // 2 - 1) + '█' * 3 + ' ' * (largura - (largura // 2 + 2))
-    # Pavio inferior
-    for i in range(altura):
-        preco = maximo - i * escala
-        if preco < corpo_base and preco >= low:
-            grid[i] = ' ' * (largura // 2) + '│' + ' ' * (largura - largura // 2 - 1)
-    # Montar texto
-    linhas = []
-    for i, linha in enumerate(grid):
-        if corpo_topo >= maximo - i * escala >= corpo_base:
-            linhas.append(Text(linha, style=cor))
+        if corpo_base <= preco <= corpo_topo:
+            linhas.append(Text(corpo, style=cor))
+        elif corpo_topo <= preco <= high or low <= preco < corpo_base:
+            linhas.append(Text(pavio, style='white'))
         else:
-            linhas.append(Text(linha, style='white'))
+            linhas.append(Text(vazio, style='white'))
     return linhas
 
-def mostrar_vela_em_tempo_real(par: str, timeframe: Interval = Interval.in_1_minute, delay: int = 1):
-    tv = TvDatafeed()
+def mostrar_vela_em_tempo_real(par: str, timeframe: Interval = Interval.in_1_minute, delay: int = 1,
+                               central: Optional[CentralDados] = None, seguir_par: Optional[Callable[[], str]] = None):
+    if central is None:
+        central = CentralDados()
+        central.iniciar()
+    assinatura = central.assinar(timeframe, n_bars=2, periodo=delay, par=par, seguir_par=seguir_par)
     with Live(refresh_per_second=4, console=console) as live:
+        live.update(Panel("Aguardando dados...", title="TheDesigner"))
+        desenhada = None  # (par, O, H, L, C) no painel: evento repetido não redesenha
         while True:
+            evento = assinatura.proximo(timeout=delay * 10)
+            if evento is None or evento['tipo'] == 'cotacao':
+                continue
+            if evento['tipo'] == 'erro':
+                live.update(Panel(f"Erro: {evento['erro']}", title="TheDesigner"))
+                continue
             try:
-                df = tv.get_hist(symbol=par, exchange='FX', interval=timeframe, n_bars=2)
-                if df is None or len(df) < 2:
+                df = evento['df']
+                if len(df) < 2:
                     live.update(Panel("Aguardando dados...", title="TheDesigner"))
-                    time.sleep(delay)
                     continue
                 open_ = df['open'].iloc[-1]
                 high = df['high'].iloc[-1]
                 low = df['low'].iloc[-1]
                 close = df['close'].iloc[-1]
+                if desenhada == (evento['par'], open_, high, low, close):
+                    continue
+                desenhada = (evento['par'], open_, high, low, close)
                 linhas = desenhar_vela(open_, high, low, close)
                 texto = Text.assemble(*linhas)
-                painel = Panel(texto, title=f"{par} - Vela Atual", subtitle=f"O: {open_:.5f} H: {high:.5f} L: {low:.5f} C: {close:.5f}")
+                painel = Panel(texto, title=f"{evento['par']} - Vela Atual", subtitle=f"O: {open_:.5f} H: {high:.5f} L: {low:.5f} C: {close:.5f}")
                 live.update(painel)
             except Exception as e:
                 live.update(Panel(f"Erro: {e}", title="TheDesigner"))
-            time.sleep(delay) 
\ No newline at end of file
+
+# Painéis já renderizados lado a lado: o quadro só junta linhas prontas, sem refazer o layout
+class _Grade:
+    def __init__(self, paineis: List[List[List[Segment]]], largura: int):
+        self.paineis = paineis  # por painel: linhas de segmentos, todas com `largura` colunas
+        self.largura = largura
+
+    def __rich_console__(self, console, options):
+        por_linha = max(1, (options.max_width + 1) // (self.largura + 1))
+        for inicio in range(0, len(self.paineis), por_linha):
+            grupo = self.paineis[inicio:inicio + por_linha]
+            for i in range(max(len(linhas) for linhas in grupo)):
+                for j, linhas in enumerate(grupo):
+                    if j:
+                        yield Segment(' ')
+                    if i < len(linhas):
+                        yield from linhas[i]
+                    else:
+                        yield Segment(' ' * self.largura)
+                yield Segment.line()
+
+# Painel de vários pares: vela atual, pressão (soma do chapeleiro) e P&L das posições abertas
+class PainelSimbolos:
+    """
+    Uma assinatura por par na central, todas numa fila só, e uma thread que aplica os eventos
+    ao estado em memória; outra thread desenha a `fps` quadros por segundo, independente do
+    ritmo dos dados. Cada par guarda o próprio painel já renderizado e só é refeito quando
+    algum valor dele muda; quadro sem mudança não redesenha nada. P&L vem do CachePosicoes
+    compartilhado (nenhuma requisição a mais).
+    """
+    def __init__(self, central: CentralDados, pares: List[str], timeframe: Interval = Interval.in_1_minute,
+                 periodo: float = 1.0, fps: float = 4.0, posicoes=None, epics: Optional[Dict[str, str]] = None,
+                 seguir_par: Optional[Callable[[], str]] = None, altura_vela: int = 10, largura: int = 26):
+        self.central = central
+        self.pares = list(pares)
+        self.timeframe = timeframe
+        self.periodo = periodo
+        self.fps = fps
+        self.posicoes = posicoes  # CachePosicoes opcional
+        self.epics = epics or {}  # par -> epic da corretora (padrão: o próprio par)
+        self.seguir_par = seguir_par  # destaca o par ativo
+        self.altura_vela = altura_vela
+        self.largura = largura
+        self.quadros = 0  # quadros efetivamente redesenhados
+        self._estado = {par: {'vela': None, 'hora': None, 'preco': None, 'variacao': None, 'pressao': 0.0,
+                              'pnl': None, 'posicoes': 0, 'erro': None} for par in self.pares}
+        self._pressoes = {par: Pressao() for par in self.pares}  # só a thread de coleta mexe
+        self._paineis = {}  # par -> linhas do painel já renderizadas
+        self._sujos = set(self.pares)  # pares cujo painel precisa ser remontado
+        self._ativo = None
+        self._posicoes_em = 0.0  # atualizado_em do CachePosicoes já aplicado
+        self._lock = threading.Lock()
+        self._fila = queue.Queue(maxsize=100 * max(1, len(self.pares)))
+        self._assinaturas = []
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def iniciar(self):
+        self._stop_event.clear()
+        self._assinaturas = [self.central.assinar(self.timeframe, n_bars=2, periodo=self.periodo, par=par, fila=self._fila)
+                             for par in self.pares]
+        self._threads = [threading.Thread(target=self._coletar, daemon=True),
+                         threading.Thread(target=self._desenhar, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def parar(self):
+        self._stop_event.set()
+        for assinatura in self._assinaturas:
+            assinatura.cancelar()
+
+    def _alterar(self, par: str, **valores):
+        # Marca o par para redesenho só se algum valor mudou de fato
+        with self._lock:
+            estado = self._estado[par]
+            if any(estado[chave] != valor for chave, valor in valores.items()):
+                estado.update(valores)
+                self._sujos.add(par)
+
+    def aplicar(self, evento: Dict):
+        """
+        Aplica um evento da central ('barra', 'cotacao' ou 'erro') ao estado do par.
+        """
+        par = evento.get('par')
+        if par not in self._estado:
+            return
+        if evento['tipo'] == 'erro':
+            self._alterar(par, erro=evento['erro'])
+            return
+        pressao = self._pressoes[par]
+        if evento['tipo'] == 'cotacao':
+            preco = evento['bid']
+            variacao = pressao.atualizar(preco, fonte='cotacao')
+            self._alterar(par, preco=preco, variacao=variacao, pressao=pressao.soma, erro=None)
+            return
+        df = evento['df']
+        if len(df) == 0:
+            return
+        vela = (df['open'].iloc[-1], df['high'].iloc[-1], df['low'].iloc[-1], df['close'].iloc[-1])
+        if vela == self._estado[par]['vela']:
+            return
+        if evento.get('cotacoes_ao_vivo'):
+            # Streaming conectado: preço e pressão vêm das cotações, a barra só redesenha a vela
+            self._alterar(par, vela=vela, hora=df.index[-1].strftime('%H:%M'), erro=None)
+            return
+        anterior = df['close'].iloc[-2] if len(df) > 1 else None
+        variacao = pressao.atualizar(vela[3], anterior, fonte='barra')
+        self._alterar(par, vela=vela, hora=df.index[-1].strftime('%H:%M'), preco=vela[3], variacao=variacao,
+                      pressao=pressao.soma, erro=None)
+
+    def _atualizar_pnl(self):
+        # Só relê quando o cache trouxe uma foto nova
+        if self.posicoes is None or self.posicoes.atualizado_em in (0.0, self._posicoes_em):
+            return
+        self._posicoes_em = self.posicoes.atualizado_em
+        pnl = {}
+        for posicao in self.posicoes.listar():
+            total, quantidade = pnl.get(posicao['epic'], (0.0, 0))
+            pnl[posicao['epic']] = (total + (posicao['lucro_prejuizo'] or 0.0), quantidade + 1)
+        for par in self.pares:
+            total, quantidade = pnl.get(self.epics.get(par, par), (None, 0))
+            self._alterar(par, pnl=total, posicoes=quantidade)
+
+    def _coletar(self):
+        while not self._stop_event.is_set():
+            try:
+                evento = self._fila.get(timeout=1.0)
+            except queue.Empty:
+                evento = None
+            try:
+                if evento is not None:
+                    self.aplicar(evento)
+                self._atualizar_pnl()
+            except Exception as e:
+                log.warning(f"Erro ao aplicar evento: {e}")
+
+    def _montar_painel(self, par: str, estado: Dict, ativo: bool) -> Panel:
+        linhas = []
+        if estado['vela'] is not None:
+            linhas.extend(desenhar_vela(*estado['vela'], altura=self.altura_vela))
+        else:
+            linhas.append(Text("Aguardando dados...", style='dim'))
+        if estado['preco'] is not None:
+            variacao = estado['variacao'] or 0.0
+            cor = 'green' if variacao > 0 else ('red' if variacao < 0 else 'yellow')
+            seta = '▲' if variacao > 0 else ('▼' if variacao < 0 else '►')
+            linhas.append(Text(f"{estado['preco']:.5f} {seta} {variacao:+.5f}", style=cor))
+            soma = estado['pressao']
+            linhas.append(Text(f"Pressão {soma:+.5f}", style='green' if soma > 0 else ('red' if soma < 0 else 'white')))
+        if estado['posicoes']:
+            pnl = estado['pnl'] or 0.0
+            linhas.append(Text(f"P&L {pnl:+.2f} ({estado['posicoes']})", style='bold green' if pnl >= 0 else 'bold red'))
+        if estado['erro']:
+            linhas.append(Text(f"Erro: {estado['erro']}"[:40], style='red'))
+        texto = Text('\n').join(linhas)
+        return Panel(texto, title=f"[bold]{par}[/bold]" if ativo else par, subtitle=estado['hora'],
+                     border_style='yellow' if ativo else 'blue', width=self.largura)
+
+    def quadro(self) -> Optional[_Grade]:
+        """
+        Remonta só os painéis dos pares que mudaram. Retorna None se nada mudou desde o último quadro.
+        """
+        ativo = None
+        if self.seguir_par is not None:
+            try:
+                ativo = self.seguir_par()
+            except Exception:
+                ativo = self._ativo
+        with self._lock:
+            if ativo != self._ativo:
+                self._sujos.update(par for par in (ativo, self._ativo) if par in self._estado)
+                self._ativo = ativo
+            if not self._sujos:
+                return None
+            sujos, self._sujos = self._sujos, set()
+            paineis = {par: self._montar_painel(par, self._estado[par], par == ativo) for par in sujos}
+        opcoes = console.options.update(width=self.largura)
+        for par, painel in paineis.items():
+            self._paineis[par] = console.render_lines(painel, opcoes, pad=True)
+        return _Grade([self._paineis[par] for par in self.pares], self.largura)
+
+    def _desenhar(self):
+        intervalo = 1.0 / self.fps
+        with Live(console=console, auto_refresh=False) as live:
+            while not self._stop_event.is_set():
+                inicio = time.perf_counter()
+                try:
+                    quadro = self.quadro()
+                    if quadro is not None:
+                        live.update(quadro, refresh=True)
+                        self.quadros += 1
+                except Exception as e:
+                    log.warning(f"Erro ao desenhar o painel: {e}")
+                self._stop_event.wait(max(0.0, intervalo - (time.perf_counter() - inicio)))
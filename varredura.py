@@ -0,0 +1,136 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional
+from tvDatafeed import Interval
+from analise import analisar_par, IndicadoresPar
+from metricas import metricas, medir
+
+def _analisar_cronometrado(par: str, df_m15, df_h4, indicadores=None):
+    # Roda no processo filho: devolve também os instantes (epoch) de início e fim da análise
+    # e as métricas medidas aqui (o registro do filho começa zerado a cada tarefa)
+    metricas.limpar()
+    inicio = time.time()
+    resultado = analisar_par(par, df_m15, df_h4, indicadores)
+    return resultado, inicio, time.time(), metricas.drenar()
+
+# Motor de varredura: todos os pares a cada ciclo, em paralelo
+class Varredura:
+    """
+    Busca os candles de todos os pares em um pool de threads (I/O) e roda a análise
+    em um pool de processos (CPU). Retorna os resultados ordenados por força do sinal.
+    tempo_limite limita o ciclo: pares que não terminarem a tempo ficam para o próximo.
+    Tendência e suporte/resistência vêm de um IndicadoresPar por (par, tempo gráfico), mantido
+    aqui só com as barras novas de cada ciclo; o processo de análise recebe os valores prontos.
+    """
+    def __init__(self, central, pares: List[str], max_threads: int = 8, max_processos: Optional[int] = None,
+                 tempo_limite: float = 45.0, n_bars_m15: int = 700, n_bars_h4: int = 200, latencias=None):
+        self.central = central
+        self.latencias = latencias  # RegistroLatencia opcional: um rastro 'ciclo' por par analisado
+        self.pares = list(pares)
+        self.tempo_limite = tempo_limite
+        self.n_bars_m15 = n_bars_m15
+        self.n_bars_h4 = n_bars_h4
+        self._indicadores = {}  # (par, 'M15' | 'H4') -> IndicadoresPar
+        # Uma busca atrasada do ciclo anterior pode rodar junto com a do ciclo atual do mesmo par
+        self._locks_par = {par: threading.Lock() for par in self.pares}
+        self._threads = ThreadPoolExecutor(max_workers=max_threads)
+        # spawn: quando o pool sobe o processo já tem threads (logs, métricas, central, despacho);
+        # um fork copiaria locks que alguma delas estivesse segurando e o filho travaria
+        self._processos = ProcessPoolExecutor(max_workers=max_processos or os.cpu_count(),
+                                              mp_context=multiprocessing.get_context('spawn'))
+
+    def encerrar(self):
+        self._threads.shutdown(wait=True, cancel_futures=True)
+        self._processos.shutdown(wait=True, cancel_futures=True)
+
+    def _buscar(self, par: str, atualizar: bool = True):
+        inicio = time.time()
+        with medir('varredura.busca_m15'):
+            df_m15 = self.central.obter(par, Interval.in_15_minute, n_bars=self.n_bars_m15, atualizar=atualizar)
+        with medir('varredura.busca_h4'):
+            df_h4 = self.central.obter(par, Interval.in_4_hour, n_bars=self.n_bars_h4, atualizar=atualizar)
+        # Cópias: os DataFrames vão para outro processo e o buffer do cache continua mudando
+        df_m15 = df_m15.copy() if df_m15 is not None else None
+        df_h4 = df_h4.copy() if df_h4 is not None else None
+        indicadores = None
+        if df_m15 is not None and len(df_m15):
+            with medir('varredura.indicadores'), self._locks_par[par]:
+                m15 = self._atualizar_indicadores(par, 'M15', df_m15, self.n_bars_m15)
+                suporte, resistencia = m15.suporte_resistencia()
+                indicadores = {'tendencia': m15.tendencia(), 'tendencia_macro': None,
+                               'suporte': suporte, 'resistencia': resistencia}
+                if df_h4 is not None and len(df_h4) >= 50:
+                    indicadores['tendencia_macro'] = self._atualizar_indicadores(par, 'H4', df_h4, self.n_bars_h4).tendencia()
+        return df_m15, df_h4, indicadores, (inicio, time.time())
+
+    def _atualizar_indicadores(self, par: str, tempo_grafico: str, df, janela: int) -> IndicadoresPar:
+        # Só as barras novas (e a em formação) passam pelo estado; lacuna ou histórico refeito ressemeia.
+        # A janela é a mesma n_bars do df: os valores batem com o ewm sobre o df (e com o backtest)
+        chave = (par, tempo_grafico)
+        indicadores = self._indicadores.get(chave)
+        if indicadores is None or not indicadores.sincronizar(df):
+            indicadores = self._indicadores[chave] = IndicadoresPar.de_dataframe(df, janela=janela)
+        return indicadores
+
+    def executar_ciclo(self, atualizar: bool = True) -> Dict:
+        """
+        Analisa todos os pares e retorna {'sinais': [...], 'resultados': {...}, 'erros': {...}, 'duracao': s}.
+        'sinais' contém só os pares com entrada forte, do mais forte para o mais fraco.
+        atualizar=False analisa só o histórico local (partida a quente, sem rede).
+        """
+        inicio = time.time()
+        prazo = inicio + self.tempo_limite
+        buscas = {self._threads.submit(self._buscar, par, atualizar): par for par in self.pares}
+        analises = {}
+        erros = {}
+        tempos = {}  # par -> {'busca': (início, fim), 'analise': (início, fim), 'ultima_barra': ...}
+        pendentes = set(buscas)
+        # Cada par vai para a análise assim que seus dados chegam
+        while pendentes and time.time() < prazo:
+            prontos, pendentes = wait(pendentes, timeout=max(0.0, prazo - time.time()), return_when='FIRST_COMPLETED')
+            for futuro in prontos:
+                par = buscas[futuro]
+                try:
+                    df_m15, df_h4, indicadores, busca = futuro.result()
+                except Exception as e:
+                    erros[par] = f'Erro ao buscar candles: {e}'
+                    continue
+                if df_m15 is None or len(df_m15) < 200:
+                    erros[par] = 'Candles M15 insuficientes'
+                    continue
+                tempos[par] = {'busca': busca, 'ultima_barra': df_m15.index[-1]}
+                analises[self._processos.submit(_analisar_cronometrado, par, df_m15, df_h4, indicadores)] = par
+        for futuro in pendentes:
+            erros[buscas[futuro]] = 'Tempo limite na busca de candles'
+        resultados = {}
+        concluidas, atrasadas = wait(analises, timeout=max(0.0, prazo - time.time()))
+        for futuro in concluidas:
+            par = analises[futuro]
+            try:
+                resultado, inicio_analise, fim_analise, metricas_filho = futuro.result()
+            except Exception as e:
+                erros[par] = f'Erro na análise: {e}'
+                continue
+            metricas.mesclar(metricas_filho)
+            tempos[par]['analise'] = (inicio_analise, fim_analise)
+            resultado['tempos'] = tempos[par]
+            resultados[par] = resultado
+            if self.latencias is not None:
+                rastro = self.latencias.rastro(par, 'ciclo')
+                rastro.inicio = tempos[par]['busca'][0]
+                rastro.adicionar('busca', *tempos[par]['busca'])
+                # Fila até um processo livre pegar a análise
+                rastro.adicionar('espera_processo', tempos[par]['busca'][1], inicio_analise)
+                rastro.adicionar('analise', inicio_analise, fim_analise)
+                rastro.concluir()
+        for futuro in atrasadas:
+            erros[analises[futuro]] = 'Tempo limite na análise'
+        sinais = sorted(
+            (r for r in resultados.values() if r['direcao']),
+            key=lambda r: r['forca'],
+            reverse=True
+        )
+        return {'sinais': sinais, 'resultados': resultados, 'erros': erros, 'duracao': time.time() - inicio}